@@ -0,0 +1,87 @@
+"""
+Mide el arranque con el catálogo compartido: cuánto tarda importar negocio.py
+y tools.py (sin leer el catálogo) y cuánto la primera consulta de cada módulo,
+que es la que lo carga. Cada caso corre en un proceso nuevo:
+- sin snapshot: la primera consulta parsea el CSV (y deja el snapshot).
+- con snapshot: la primera consulta lo abre con mmap.
+Verifica además que las dos tandas de tools usen el mismo catálogo y que se
+cargue una sola vez. Como referencia, mide lo que costaba antes importar
+tools.py (pd.read_csv del CSV entero, además de la carga de negocio.py).
+
+Uso:
+    python benchmarks/bench_arranque.py [--filas 300000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+from benchmarks.sintetico import generar_catalogo
+
+
+def medir_proceso():
+    """Lo que corre cada proceso hijo: imprime los tiempos como JSON."""
+    inicio = time.perf_counter()
+    import src.negocio as negocio
+    import src.tools as tools
+    importar = time.perf_counter() - inicio
+
+    cargas = []
+    construir = negocio.construir_catalogo
+    negocio.construir_catalogo = lambda *args, **kwargs: cargas.append(1) or construir(*args, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        negocio.find_products.invoke({"search_term": "T-shirt", "color": "black"})
+        primera_negocio = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        tools.get_product_by_sku.invoke({"sku": "100000"})
+        primera_tools = time.perf_counter() - inicio
+    print(json.dumps({"importar": importar, "negocio": primera_negocio, "tools": primera_tools,
+                      "cargas": len(cargas), "compartido": tools.sincronizar().catalogo is negocio.catalogo}))
+
+
+def correr(ruta):
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__), "--hijo"], capture_output=True,
+                            text=True, check=True, env=dict(os.environ, CATALOGO_CSV=ruta))
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=300_000)
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        medir_proceso()
+        return
+
+    carpeta = tempfile.mkdtemp()
+    ruta = os.path.join(carpeta, "catalogo.csv")
+    generar_catalogo(args.filas).to_csv(ruta, index=False)
+
+    inicio = time.perf_counter()
+    pd.read_csv(ruta)
+    antes = time.perf_counter() - inicio
+
+    print(f"{args.filas:,} productos; antes, importar tools.py leía el CSV entero: {antes * 1000:.0f} ms")
+    print(f"{'':14} {'importar ms':>12} {'1ª negocio ms':>14} {'1ª tools ms':>12} {'cargas':>7} {'compartido':>11}")
+    for caso in ("sin snapshot", "con snapshot"):
+        r = correr(ruta)
+        print(f"{caso:14} {r['importar'] * 1000:12.0f} {r['negocio'] * 1000:14.1f} {r['tools'] * 1000:12.1f} "
+              f"{r['cargas']:7} {str(r['compartido']):>11}")
+    shutil.rmtree(carpeta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Mide la búsqueda BM25 de search_products (src/bm25.py) con catálogos de
+distintos tamaños: armado del índice, lectura desde disco y latencia por
+consulta con corte temprano (NRA), contra recorrer las postings completas y
+contra el filtro anterior (tres str.contains sobre columnas en minúscula).
+También verifica que el corte temprano dé los mismos puntajes que el recorrido completo,
+y que el stemming lleve singular y plural a la misma raíz.
+
+Uso:
+    python benchmarks/bench_bm25.py [--tamanos 10000 100000 1000000] [--repeticiones 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.sintetico import generar_catalogo
+from src.bm25 import IndiceBM25, raiz
+
+CONSULTAS = [
+    "jeans", "Hoodie", "black", "leather jacket", "slim fit shirt", "bershka beige hoodie",
+    "trench coats", "vestidos", "pantalones", "oversized t-shirt in white", "wool blend cardigans",
+    "Reclaimed Vintage denim jacket", "skirts", "linen trousers navy",
+]
+
+# Singular y plural que tienen que dar la misma raíz
+PARES_PLURAL = [
+    ("hoodie", "hoodies"), ("hoody", "hoodies"), ("blouse", "blouses"), ("sleeve", "sleeves"),
+    ("traje", "trajes"), ("size", "sizes"), ("dress", "dresses"), ("accessory", "accessories"),
+    ("pantalon", "pantalones"), ("jean", "jeans"), ("shoe", "shoes"), ("vestido", "vestidos"),
+]
+
+
+def exhaustivo(indice, consulta, k):
+    return indice.mejores(indice.puntajes(consulta), k)
+
+
+def filtro_anterior(df, consulta):
+    q = consulta.lower()
+    return df[
+        df["nombre"].str.lower().str.contains(q, na=False) |
+        df["description"].str.lower().str.contains(q, na=False) |
+        df["category"].str.lower().str.contains(q, na=False)
+    ].head(5)
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for consulta in CONSULTAS:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion(consulta)
+        tiempos.append((time.perf_counter() - inicio) / repeticiones)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2] * 1000, tiempos[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    separados = [(a, b, raiz(a), raiz(b)) for a, b in PARES_PLURAL if raiz(a) != raiz(b)]
+    print(f"pares singular/plural con raíz distinta: {len(separados)} de {len(PARES_PLURAL)}")
+    for singular, plural, raiz_singular, raiz_plural in separados:
+        print(f"    {singular} -> {raiz_singular}, {plural} -> {raiz_plural}")
+
+    for n in args.tamanos:
+        df = generar_catalogo(n)
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, "catalogo.csv")
+            df.head(1).to_csv(ruta, index=False)  # solo para la huella del archivo
+
+            inicio = time.perf_counter()
+            indice = IndiceBM25.desde_catalogo(df, ruta)
+            armado = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            indice = IndiceBM25.desde_catalogo(df, ruta)
+            lectura = time.perf_counter() - inicio
+
+            distintos = 0
+            for consulta in CONSULTAS:
+                _, rapidos = indice.buscar(consulta, args.k)
+                _, completos = exhaustivo(indice, consulta, args.k)
+                distintos += not np.allclose(rapidos, completos, rtol=1e-5)
+
+            nra = medir(lambda q: indice.buscar(q, args.k), args.repeticiones)
+            completo = medir(lambda q: exhaustivo(indice, q, args.k), args.repeticiones)
+            anterior = medir(lambda q: filtro_anterior(df, q), 1)
+
+            print(f"{n:>9,} filas: índice armado en {armado:.2f} s, leído de disco en {lectura * 1000:.1f} ms "
+                  f"({len(indice.vocabulario):,} términos, {len(indice.docs):,} postings)")
+            for nombre, (p50, maximo) in (("BM25 corte temprano", nra), ("BM25 completo", completo),
+                                          ("str.contains (antes)", anterior)):
+                print(f"    {nombre:>21}: p50 {p50:8.3f} ms, máx {maximo:8.3f} ms")
+            print(f"    consultas con top-{args.k} distinto al completo: {distintos} de {len(CONSULTAS)}")
+            del indice
+
+
+if __name__ == "__main__":
+    main()
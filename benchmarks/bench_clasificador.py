@@ -0,0 +1,70 @@
+"""
+Evalúa el clasificador local de main2.py con leave-one-out sobre los datasets:
+qué fracción de mensajes se resolvería sin el LLM (bypass), qué tan seguido
+esa decisión coincide exactamente con la del dataset, y la latencia por mensaje.
+Los mensajes cuya llamada original lleva filtros que search_products no acepta
+(color, talle, orden de precio) tienen que ir al LLM: si se resuelven sin él,
+se cuentan como filtros perdidos. Además, mensajes que agregan algo a un
+ejemplo conocido ('busco camperas de lana') tienen que ir al LLM.
+
+Uso:
+    python benchmarks/bench_clasificador.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.clasificador import ClasificadorTools, leer_ejemplos
+
+TOOLS_MAIN2 = {
+    "search_products", "refine_products", "get_product_by_sku", "get_similar_products",
+    "recommend_products", "summarize_product", "business_info", "chat_response",
+}
+# Calificadores que no están en ningún ejemplo: copiar la query del vecino los perdería
+CON_CALIFICADOR = ["busco camperas de lana", "busco camperas impermeables", "busco camperas adidas",
+                   "busco camperas de cuero", "quiero remeras rojas baratas"]
+
+
+def main():
+    ejemplos = leer_ejemplos(tools_validas=TOOLS_MAIN2)
+    resueltos = correctos = perdidos = 0
+    errores = []
+    latencias = []
+    for i, (texto, tool, argumentos) in enumerate(ejemplos):
+        clasificador = ClasificadorTools(ejemplos[:i] + ejemplos[i + 1:])
+        inicio = time.perf_counter()
+        decision = clasificador.decidir(texto)
+        latencias.append(time.perf_counter() - inicio)
+        if decision is None:
+            continue
+        resueltos += 1
+        if argumentos is None:
+            perdidos += 1
+        # Los mensajes de chat_response son libres: alcanza con acertar la tool
+        if decision[0] == tool and (tool == "chat_response" or decision[1] == argumentos):
+            correctos += 1
+        else:
+            errores.append((texto, (tool, argumentos), decision))
+
+    completo = ClasificadorTools(ejemplos)
+    calificadores = [(texto, completo.decidir(texto)) for texto in CON_CALIFICADOR]
+
+    latencias.sort()
+    print(f"{len(ejemplos)} mensajes (leave-one-out)")
+    print(f"sin LLM:   {resueltos} ({resueltos / len(ejemplos):.0%})")
+    print(f"correctos: {correctos} de {resueltos} ({correctos / max(resueltos, 1):.0%})")
+    print(f"filtros perdidos: {perdidos} de {sum(a is None for _, _, a in ejemplos)} mensajes con filtros")
+    print(f"calificadores perdidos: {sum(d is not None for _, d in calificadores)} de {len(calificadores)}")
+    for texto, decision in calificadores:
+        if decision is not None:
+            print(f"  {texto!r}: {decision}")
+    print(f"latencia:  p50 {latencias[len(latencias) // 2] * 1000:.2f} ms, "
+          f"máx {latencias[-1] * 1000:.2f} ms")
+    for texto, esperado, obtenido in errores[:10]:
+        print(f"  {texto!r}: esperado {esperado}, obtenido {obtenido}")
+
+
+if __name__ == "__main__":
+    main()
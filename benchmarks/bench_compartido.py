@@ -0,0 +1,188 @@
+"""
+Verifica que varios procesos worker comparten una sola copia física del
+catálogo (negocio.adjuntar_catalogo) y de sus índices de tools.py (BM25 y
+similitud), y mide cuánto tarda cada uno en adjuntarlos.
+
+Un proceso carga el CSV, deja el snapshot y arma los índices al lado (como
+servidor_mcp con --pool procesos); después se lanzan N workers (spawn) que los
+adjuntan y recorren todas sus páginas. Todos juntos hacen búsquedas
+(search_products) y piden similares (get_similar_products) a la vez. Con
+/proc/<pid>/smaps se suma, por worker, lo que tiene mapeado de esas carpetas:
+si hay una sola copia, cada worker ve todo (Rss) pero la suma de lo
+proporcional (Pss) da una sola copia y nada es privado.
+
+Con --sin-compartir cada worker lee el CSV y arma los índices por su cuenta,
+para comparar la memoria privada y el tiempo de arranque de cada proceso.
+
+Solo Linux (lee /proc). Uso:
+    python benchmarks/bench_compartido.py [--filas 300000] [--workers 4] [--sin-compartir]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import src.negocio as negocio
+import src.tools as tools
+from benchmarks.sintetico import generar_catalogo
+
+# Cada worker hace esta cantidad de búsquedas y de pedidos de similares
+CONSULTAS = 20
+
+
+def arrays_del_catalogo(catalogo):
+    """Todos los arrays del catálogo (los que en un snapshot están mapeados)."""
+    columnas = list(catalogo.db.textos.values()) + [catalogo.indice_nombres.textos]
+    arrays = [catalogo.db.precios, catalogo.indice_nombres.filas, catalogo.indice_nombres.cortes,
+              catalogo.talles.bits, catalogo.colores.codigos]
+    if catalogo.categorias is not None:
+        arrays.append(catalogo.categorias.codigos)
+    if catalogo.skus is not None:
+        arrays += [catalogo.skus.hashes, catalogo.skus.filas]
+    ordenado = catalogo.precios_por_categoria
+    arrays += [ordenado.filas, ordenado.precios, ordenado.cortes]
+    for columna in columnas:
+        arrays += [columna.codigos, columna.buffer, columna.cortes]
+    return arrays
+
+
+def arrays_de_indices(estado):
+    """Los arrays del BM25 y de los vectores de similitud de un EstadoTools."""
+    indice, vectores = estado.indice_bm25(), estado.motor_similitud().vectores
+    return [indice.cortes, indice.docs, indice.impactos] + [getattr(vectores, parte) for parte in vectores.PARTES]
+
+
+def worker(ruta, compartir, consultas, skus, resultados, listo, empezar, terminar):
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        if compartir:
+            negocio.adjuntar_catalogo(ruta)
+        else:
+            negocio.cargar_base_de_datos(ruta, usar_snapshot=False)
+        carga = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        estado = tools.preparar_indices()
+        indices = time.perf_counter() - inicio
+        # Se leen todas las páginas, como si las consultas hubieran recorrido todo
+        for array in arrays_del_catalogo(negocio.catalogo) + arrays_de_indices(estado):
+            np.asarray(array).view(np.uint8).sum()
+        listo.release()
+        # Todos los workers consultan a la vez
+        empezar.wait()
+        busquedas, similares = [], []
+        for consulta, sku in zip(consultas, skus):
+            inicio = time.perf_counter()
+            tools.search_products.invoke({"query": consulta})
+            busquedas.append(time.perf_counter() - inicio)
+            inicio = time.perf_counter()
+            tools.get_similar_products.invoke({"sku": sku})
+            similares.append(time.perf_counter() - inicio)
+    resultados.put((os.getpid(), carga, indices, np.median(busquedas), np.median(similares)))
+    listo.release()
+    terminar.wait()
+
+
+def memoria(pid, carpetas):
+    """(rss, pss, privada) en bytes de lo mapeado desde `carpetas`, y la privada total del proceso."""
+    rss = pss = privada = privada_total = 0
+    dentro = False
+    with open(f"/proc/{pid}/smaps") as f:
+        for linea in f:
+            campos = linea.split()
+            if not campos[0].endswith(":") or "-" in campos[0]:
+                # Encabezado de un mapeo: rango, permisos, ..., ruta del archivo
+                dentro = len(campos) >= 6 and campos[5].startswith(carpetas)
+                continue
+            kb = int(campos[1]) * 1024 if len(campos) > 1 and campos[1].isdigit() else 0
+            if campos[0] in ("Private_Clean:", "Private_Dirty:"):
+                privada_total += kb
+            if not dentro:
+                continue
+            if campos[0] == "Rss:":
+                rss += kb
+            elif campos[0] == "Pss:":
+                pss += kb
+            elif campos[0] in ("Private_Clean:", "Private_Dirty:"):
+                privada += kb
+    return rss, pss, privada, privada_total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=300_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sin-compartir", action="store_true")
+    args = parser.parse_args()
+    compartir = not args.sin_compartir
+
+    carpeta = tempfile.mkdtemp()
+    ruta = os.path.join(carpeta, "catalogo.csv")
+    df = generar_catalogo(args.filas)
+    df.to_csv(ruta, index=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        negocio.cargar_base_de_datos(ruta)
+        if compartir:
+            tools.preparar_indices()
+    carpetas = tuple(os.path.realpath(ruta + sufijo) for sufijo in (".snapshot", ".bm25", ".similitud"))
+    tamano = sum(os.path.getsize(os.path.join(c, f)) for c in carpetas if os.path.isdir(c)
+                 for f in os.listdir(c) if f.endswith(".npy"))
+
+    # Consultas distintas en cada worker, así la caché de consultas no las responde
+    rng = np.random.default_rng(0)
+    nombres = df["nombre"].str.split().str[-4:].str.join(" ").to_numpy()
+    elegidas = rng.choice(len(df), size=(args.workers, CONSULTAS), replace=False)
+
+    contexto = multiprocessing.get_context("spawn")
+    resultados, listo = contexto.Queue(), contexto.Semaphore(0)
+    empezar, terminar = contexto.Event(), contexto.Event()
+    procesos = [contexto.Process(target=worker, args=(ruta, compartir, nombres[filas].tolist(),
+                                                      df["sku"].to_numpy()[filas].astype(str).tolist(),
+                                                      resultados, listo, empezar, terminar))
+                for filas in elegidas]
+    for proceso in procesos:
+        proceso.start()
+    for _ in procesos:
+        listo.acquire()
+    empezar.set()
+    for _ in procesos:
+        listo.acquire()
+    medidas = {pid: resto for pid, *resto in (resultados.get() for _ in procesos)}
+
+    modo = "adjuntando snapshot e índices" if compartir else "cada uno lee el CSV y arma los índices"
+    print(f"{args.filas:,} productos, {args.workers} workers ({modo}); "
+          f"arrays del snapshot e índices: {tamano / 2**20:.1f} MB")
+    print(f"{'pid':>8} {'carga ms':>9} {'índices ms':>11} {'búsqueda ms':>12} {'similares ms':>13} "
+          f"{'rss MB':>8} {'pss MB':>8} {'privada MB':>11} {'privada total MB':>17}")
+    total_pss = total_privada = 0
+    for proceso in procesos:
+        carga, indices, busqueda, similares = medidas[proceso.pid]
+        rss, pss, privada, privada_total = memoria(proceso.pid, carpetas)
+        total_pss += pss
+        total_privada += privada
+        print(f"{proceso.pid:8} {carga * 1000:9.1f} {indices * 1000:11.1f} {busqueda * 1000:12.1f} "
+              f"{similares * 1000:13.1f} {rss / 2**20:8.1f} {pss / 2**20:8.1f} "
+              f"{privada / 2**20:11.1f} {privada_total / 2**20:17.1f}")
+
+    terminar.set()
+    for proceso in procesos:
+        proceso.join()
+
+    if compartir:
+        # Pss reparte cada página entre los que la mapean: una sola copia suma su tamaño
+        una_copia = total_privada == 0 and total_pss <= tamano * 1.05
+        print(f"\nSuma de Pss: {total_pss / 2**20:.1f} MB para {tamano / 2**20:.1f} MB de arrays; "
+              f"privada: {total_privada / 2**20:.1f} MB -> una sola copia física: {una_copia}")
+        if not una_copia:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
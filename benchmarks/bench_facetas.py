@@ -0,0 +1,83 @@
+"""
+Benchmark: color y categoría como códigos enteros (CodigosCategoricos) y
+facetas precalculadas por término (Catalogo.facetas), contra los filtros
+anteriores sobre texto:
+- find_products: color buscado como subcadena en el nombre (índice invertido).
+- refine_products: `==` sobre la columna de color (objetos).
+También mide cuántos colores deduce bien inferir_colores sin la columna color.
+
+Uso:
+    python benchmarks/bench_facetas.py --filas 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import src.negocio as negocio
+from benchmarks.sintetico import generar_catalogo
+
+COLORES = ["black", "navy", "negro", "Grey"]
+TERMINOS = ["T-shirt", "Jeans", "Coat"]
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    cat = generar_catalogo(args.filas)
+    nombres = cat["nombre"].to_numpy()
+    columna = cat["color"].to_numpy(dtype=object)
+
+    inicio = time.perf_counter()
+    inferidos = negocio.inferir_colores(nombres)
+    t_inferir = time.perf_counter() - inicio
+    print(f"Colores deducidos del nombre en {t_inferir:.2f}s: "
+          f"{(inferidos == columna).mean():.2%} iguales a la columna color")
+
+    inicio = time.perf_counter()
+    colores = negocio.CodigosCategoricos(columna, negocio.normalizar_color)
+    talles = negocio.TallesPorFila(cat["talle"].to_numpy())
+    categorias = negocio.CodigosCategoricos(cat["category"].to_numpy())
+    print(f"Códigos armados en {time.perf_counter() - inicio:.2f}s "
+          f"({len(colores.etiquetas)} colores, {len(categorias.etiquetas)} categorías)")
+    inicio = time.perf_counter()
+    indice = negocio.IndiceInvertido(nombres)
+    print(f"Índice de nombres armado en {time.perf_counter() - inicio:.2f}s\n")
+
+    print(f"{'color':8} {'nombre ms':>10} {'== ms':>8} {'códigos ms':>11} {'filas nombre':>13} {'filas código':>13}")
+    for color in COLORES:
+        t_nombre, por_nombre = medir(lambda: indice.buscar(color.lower().strip()), args.repeticiones)
+        t_igual, por_igual = medir(lambda: np.flatnonzero(columna == color), args.repeticiones)
+        t_codigo, por_codigo = medir(lambda: np.flatnonzero(colores.coincide(color)), args.repeticiones)
+        print(f"{color!r:8} {t_nombre:10.1f} {t_igual:8.1f} {t_codigo:11.2f} {len(por_nombre):13,} {len(por_codigo):13,}")
+
+    print(f"\n{'término':10} {'filas':>9} {'recorrer ms':>12} {'códigos ms':>11} {'precalculado ms':>16}")
+    for termino in TERMINOS:
+        filas = indice.buscar(termino.lower())
+        # Antes: contar recorriendo los textos de las filas encontradas
+        t_texto, _ = medir(lambda: (cat["color"].iloc[filas].value_counts(),
+                                    cat["talle"].iloc[filas].str.split(",").explode().value_counts(),
+                                    cat["category"].iloc[filas].value_counts()), args.repeticiones)
+        t_codigos, facetas = medir(lambda: (colores.conteos(filas), talles.conteos(filas),
+                                            categorias.conteos(filas)), args.repeticiones)
+        precalculadas = {termino: facetas}
+        t_memo, _ = medir(lambda: precalculadas[termino], 1000)
+        print(f"{termino:10} {len(filas):9,} {t_texto:12.1f} {t_codigos:11.2f} {t_memo:16.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: find_products con índice invertido vs. el escaneo completo con str.contains.
+
+Uso:
+    python benchmarks/bench_indice.py --filas 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import src.negocio as negocio
+from benchmarks.sintetico import generar_catalogo
+
+CONSULTAS = [
+    {"search_term": "T-shirt"},
+    {"search_term": "Jeans", "sort_by_price": "asc"},
+    {"search_term": "Jacket", "color": "black"},
+    {"search_term": "coat", "color": "beige", "sort_by_price": "desc"},
+    {"search_term": "slim fit"},
+    {"search_term": "dress", "talle": "M"},
+]
+
+
+def filtrar_escaneo(db, search_term="", talle=None, color=None, sort_by_price=None):
+    """Ruta original: copia de la tabla + str.contains sobre toda la columna."""
+    results = db.copy()
+    if search_term:
+        results = results[results['name'].str.lower().str.contains(search_term.lower().strip(), na=False)]
+    if color:
+        results = results[results['name'].str.lower().str.contains(color.lower().strip(), na=False)]
+    if talle:
+        results = results[results['size'].str.lower().str.contains(talle.lower().strip(), na=False)]
+    if sort_by_price:
+        results = results.sort_values(by='price', ascending=(sort_by_price.lower() == 'asc'), kind='stable')
+    return [r for r in results['name'].head(5)]
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    crudo = generar_catalogo(args.filas)
+    db = crudo.rename(columns={"nombre": "name", "precio": "price", "talle": "size", "color": "color_col"})
+    db["price"] = db["price"].str.replace("$", "").str.replace(",", "").astype(float)
+
+    inicio = time.perf_counter()
+    indice = negocio.IndiceInvertido(db["name"])
+    negocio.publicar_catalogo(negocio.Catalogo(db, indice))
+    print(f"Índice armado en {time.perf_counter() - inicio:.2f}s "
+          f"({len(indice.vocabulario)} tokens, {len(db)} filas)\n")
+
+    print(f"{'consulta':70} {'escaneo ms':>11} {'índice ms':>10} {'x':>6}")
+    for consulta in CONSULTAS:
+        t_escaneo, esperado = medir(lambda: filtrar_escaneo(db, **consulta), args.repeticiones)
+        # Sin pasar por la caché de resultados: se mide la consulta en sí
+        sin_cache = negocio.find_products.func.__wrapped__
+        with contextlib.redirect_stdout(io.StringIO()):
+            t_indice, res = medir(lambda: sin_cache(**consulta), args.repeticiones)
+        obtenido = [p["nombre"] for p in res["productos"]]
+        assert obtenido == esperado, f"Resultados distintos para {consulta}"
+        print(f"{str(consulta):70} {t_escaneo:11.1f} {t_indice:10.1f} {t_escaneo / t_indice:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
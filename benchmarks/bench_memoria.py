@@ -0,0 +1,120 @@
+"""
+Benchmark de memoria del catálogo de negocio.py, medido con tracemalloc:
+- Bytes por producto de la TablaCompacta + índice de nombres, contra el
+  DataFrame de objetos anterior (más los nombres en minúsculas del índice).
+- Memoria que reserva cada consulta de find_products (pico por consulta),
+  contra filtrar sobre una copia de la tabla como hacía la versión original.
+
+Con --nombres-unicos cada nombre lleva el SKU, como en el CSV real (donde casi
+no hay nombres repetidos); sin él, los nombres sintéticos se repiten mucho.
+
+Uso:
+    python benchmarks/bench_memoria.py [--filas 300000] [--nombres-unicos]
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import src.negocio as negocio
+from benchmarks.sintetico import generar_catalogo
+
+CONSULTAS = [
+    {"search_term": "T-shirt"},
+    {"search_term": "Jeans", "color": "black", "sort_by_price": "asc"},
+    {"search_term": "Coat", "talle": "M"},
+    {"sort_by_price": "desc"},
+]
+
+
+def medir_retenido(funcion):
+    """(resultado, bytes que quedan reservados, pico) de armar algo con `funcion`."""
+    gc.collect()
+    tracemalloc.start()
+    resultado = funcion()
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, actual, pico
+
+
+def medir_consulta(funcion):
+    """Pico de memoria reservada durante una consulta."""
+    gc.collect()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico
+
+
+def tabla_anterior(ruta):
+    """El catálogo como se guardaba antes: DataFrame de objetos y nombres en minúsculas."""
+    df = negocio.pd.read_csv(ruta, usecols=lambda c: c in negocio.COLUMNAS_CSV, dtype=str, keep_default_na=False)
+    df = df.rename(columns=negocio.COLUMNAS_CSV)
+    df["price"] = negocio.limpiar_precios(df["price"])
+    return df, df["name"].str.lower().to_numpy()
+
+
+def find_anterior(db, search_term="", talle=None, color=None, sort_by_price=None):
+    """Filtrado sobre una copia de la tabla, como la versión original de find_products."""
+    results = db.copy()
+    if search_term:
+        results = results[results["name"].str.lower().str.contains(search_term.lower(), regex=False)]
+    if color:
+        results = results[results["name"].str.lower().str.contains(color.lower(), regex=False)]
+    if talle:
+        results = results[results["size"].str.lower().str.contains(talle.lower(), regex=False)]
+    if sort_by_price:
+        results = results.sort_values("price", ascending=sort_by_price == "asc")
+    return [(r["name"], r["price"]) for _, r in results.head(5).iterrows()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=300_000)
+    parser.add_argument("--nombres-unicos", action="store_true")
+    args = parser.parse_args()
+
+    crudo = generar_catalogo(args.filas)
+    if args.nombres_unicos:
+        crudo["nombre"] = crudo["nombre"] + " " + crudo["sku"]
+    carpeta = tempfile.mkdtemp()
+    ruta = os.path.join(carpeta, "catalogo.csv")
+    crudo.to_csv(ruta, index=False)
+    tamano_csv = os.path.getsize(ruta)
+    del crudo
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        anterior, ret_anterior, pico_anterior = medir_retenido(lambda: tabla_anterior(ruta))
+        catalogo, ret_nuevo, pico_nuevo = medir_retenido(lambda: negocio.construir_catalogo(ruta, usar_snapshot=False))
+    negocio.publicar_catalogo(catalogo)
+    n = len(catalogo.db)
+
+    # La tabla nueva incluye los nombres en minúsculas del índice, como la anterior
+    tabla = catalogo.db.nbytes + catalogo.indice_nombres.textos.nbytes
+    print(f"{n:,} productos, CSV de {tamano_csv / n:.0f} bytes por producto")
+    print(f"{'':30} {'bytes/producto':>15} {'total MB':>9}")
+    print(f"{'DataFrame de objetos':30} {ret_anterior / n:15.0f} {ret_anterior / 2**20:9.1f}")
+    print(f"{'tabla compacta':30} {tabla / n:15.0f} {tabla / 2**20:9.1f}")
+    print(f"{'  + postings, talles, facetas':30} {ret_nuevo / n:15.0f} {ret_nuevo / 2**20:9.1f}")
+    print(f"pico durante la carga: {pico_anterior / 2**20:.1f} MB (solo la tabla anterior), "
+          f"{pico_nuevo / 2**20:.1f} MB (catálogo completo, con el índice)")
+
+    df_anterior = anterior[0]
+    sin_cache = negocio.find_products.func.__wrapped__
+    print(f"\n{'consulta':60} {'copia KB':>9} {'filas KB':>9}")
+    for consulta in CONSULTAS:
+        pico_copia = medir_consulta(lambda: find_anterior(df_anterior, **consulta))
+        pico_filas = medir_consulta(lambda: sin_cache(**consulta))
+        print(f"{str(consulta):60} {pico_copia / 1024:9.0f} {pico_filas / 1024:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Mide la vista de recommend_products (src/recomendaciones.py): armado, costo
+por llamada contra el cálculo anterior (media y máscara sobre todo el
+catálogo), costo de un cambio de precio contra rearmar la vista, y verifica
+que tras muchos cambios la vista sea igual a una armada de cero.
+
+Uso:
+    python benchmarks/bench_recomendaciones.py [--filas 1000000] [--cambios 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.sintetico import generar_catalogo
+from src.recomendaciones import VistaRecomendaciones
+
+
+def recomendar_anterior(df):
+    avg_price = df["precio"].mean()
+    return df[(df["precio"] >= avg_price * 0.8) & (df["precio"] <= avg_price * 1.2)].head(5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--cambios", type=int, default=10_000)
+    parser.add_argument("--llamadas", type=int, default=2_000)
+    args = parser.parse_args()
+
+    df = generar_catalogo(args.filas)
+    df["precio"] = pd.to_numeric(df["precio"].str.replace(r"[$,]", "", regex=True))
+    categorias = df["category"].to_numpy()
+
+    inicio = time.perf_counter()
+    vista = VistaRecomendaciones(categorias, df["precio"].to_numpy())
+    armado = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for _ in range(10):
+        recomendar_anterior(df)
+    anterior = (time.perf_counter() - inicio) / 10
+
+    inicio = time.perf_counter()
+    respuestas = [tuple(vista.recomendar(5)) for _ in range(args.llamadas)]
+    llamada = (time.perf_counter() - inicio) / args.llamadas
+    categorias_por_respuesta = np.mean([len(set(categorias[list(r)])) for r in respuestas])
+
+    rng = np.random.default_rng(0)
+    filas = rng.integers(0, args.filas, args.cambios)
+    nuevos = np.round(rng.gamma(2.0, 20.0, args.cambios) + 5, 2)
+    precios = df["precio"].to_numpy().copy()
+    inicio = time.perf_counter()
+    for fila, precio in zip(filas, nuevos):
+        vista.actualizar_precio(fila, precio)
+        precios[fila] = precio
+    cambio = (time.perf_counter() - inicio) / args.cambios
+
+    de_cero = VistaRecomendaciones(categorias, precios)
+    iguales = all(
+        list(vista.tramo(c)[1][slice(*vista.franja(c))]) == list(de_cero.tramo(c)[1][slice(*de_cero.franja(c))])
+        and abs(vista.sumas[c] - de_cero.sumas[c]) < 1e-6 * de_cero.sumas[c]
+        for c in range(len(vista.sumas))
+    )
+
+    print(f"{args.filas:,} filas: vista armada en {armado:.2f} s")
+    print(f"llamada anterior:   {anterior * 1000:9.3f} ms (siempre los mismos 5)")
+    print(f"llamada con vista:  {llamada * 1000:9.3f} ms, {len(set(respuestas))} respuestas distintas "
+          f"en {args.llamadas}, {categorias_por_respuesta:.1f} categorías por respuesta")
+    print(f"cambio de precio:   {cambio * 1000:9.3f} ms (rearmar la vista: {armado * 1000:.0f} ms)")
+    print(f"igual a una vista armada de cero tras {args.cambios:,} cambios: {iguales}")
+
+
+if __name__ == "__main__":
+    main()
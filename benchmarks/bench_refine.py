@@ -0,0 +1,68 @@
+"""
+Mide refine_products (tools.py) sobre la última búsqueda de la sesión contra
+el refinamiento anterior, que copiaba y filtraba todo el catálogo. Muestra cómo
+escala el costo con el tamaño del resultado de la búsqueda previa.
+
+Uso:
+    python benchmarks/bench_refine.py [--filas 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.sintetico import generar_catalogo
+import src.tools as tools
+
+BUSQUEDAS = ["Reclaimed Vintage", "trench coat", "hoodie", "black"]
+REFINAMIENTOS = [{"color": "black"}, {"max_precio": 30.0}, {"sort_by_price": "asc"}]
+
+
+def refine_anterior(df, color=None, talle=None, max_precio=None, sort_by_price=None):
+    results = df.copy()
+    if color:
+        results = results[results["color"] == color]
+    if talle:
+        results = results[results["talle"] == talle]
+    if max_precio:
+        results = results[results["precio"] <= max_precio]
+    if sort_by_price:
+        results = results.sort_values("precio", ascending=sort_by_price == "asc")
+    return results.head(5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = generar_catalogo(args.filas)
+    df["precio"] = pd.to_numeric(df["precio"].str.replace(r"[$,]", "", regex=True))
+    tools.indexar_catalogo(df)
+    tools.indice_bm25()
+    tools.sesion_actual.set("bench")
+
+    inicio = time.perf_counter()
+    for refinamiento in REFINAMIENTOS:
+        refine_anterior(df, **refinamiento)
+    anterior = (time.perf_counter() - inicio) / len(REFINAMIENTOS)
+    print(f"{args.filas:,} filas; refinamiento anterior (todo el catálogo): {anterior * 1000:.1f} ms")
+
+    for consulta in BUSQUEDAS:
+        tools.search_products.invoke({"query": consulta})
+        tiempos = []
+        for refinamiento in REFINAMIENTOS:
+            inicio = time.perf_counter()
+            tools.refine_products.invoke(refinamiento)
+            tiempos.append(time.perf_counter() - inicio)
+        resultado = len(tools.busquedas_por_sesion["bench"].filas)
+        print(f"  {consulta!r:>20} ({resultado:>7,} filas): primer refine {tiempos[0] * 1000:7.2f} ms, "
+              f"siguientes {sum(tiempos[1:]) / len(tiempos[1:]) * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark del router de main.py: mensajes/s del router original (dict + varias
+regex por mensaje) contra el router compilado de src/intenciones.py, sobre los
+mensajes de usuario de data/dataset.jsonl y data/dataset2.jsonl.
+
+Uso:
+    python benchmarks/bench_router.py --rondas 200
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+from src.intenciones import ROUTER, procesar_intencion_con_memoria
+
+
+def router_original(texto_usuario, sesion):
+    """Copia del procesar_intencion_con_memoria anterior, como referencia."""
+    texto = texto_usuario.lower()
+    saludos = ["hola", "buenas", "qué tal", "hello", "hi", "buenos días", "buenas noches"]
+    if any(texto.startswith(s) for s in saludos) or (len(texto.split()) < 4 and any(s in texto for s in saludos)):
+        return {"tipo": "chat", "respuesta": ROUTER.respuesta_saludo}
+    if re.search(r'\b(hora|horarios?|abierto|cerrado|abren|cierran)\b', texto):
+        return {"tipo": "tool", "json": '{ "name": "get_opening_hours", "arguments": {} }'}
+    if re.search(r'\b(ubicacion|donde|direccion|local|queda|calle)\b', texto):
+        return {"tipo": "tool", "json": '{ "name": "get_location", "arguments": {} }'}
+    if re.search(r'\b(devolucion|cambio|politica|reembolso|devolver)\b', texto):
+        return {"tipo": "tool", "json": '{ "name": "get_return_policy", "arguments": {} }'}
+    mapa = {
+        "remera": "T-shirt", "remeras": "T-shirt", "camiseta": "T-shirt", "camisetas": "T-shirt",
+        "chomba": "T-shirt", "chombas": "T-shirt",
+        "pantalón": "Jeans", "pantalon": "Jeans", "pantalones": "Jeans",
+        "jeans": "Jeans", "jean": "Jeans", "vaquero": "Jeans", "vaqueros": "Jeans",
+        "campera": "Jacket", "camperas": "Jacket", "chaqueta": "Jacket", "chaquetas": "Jacket",
+        "abrigo": "Coat", "abrigos": "Coat", "vestido": "Dress", "vestidos": "Dress",
+    }
+    prod_encontrado = None
+    for k, v in mapa.items():
+        if k in texto:
+            prod_encontrado = v
+            break
+    orden = "None"
+    if "caro" in texto or "cara" in texto: orden = "desc"
+    if "barato" in texto or "barata" in texto: orden = "asc"
+    if prod_encontrado:
+        sesion["last_search_term"] = prod_encontrado
+        return {"tipo": "tool", "json": f"""{{ "name": "find_products", "arguments": {{ "search_term": "{prod_encontrado}", "sort_by_price": "{orden}" }} }}"""}
+    if orden != "None" and sesion["last_search_term"]:
+        prod_memoria = sesion["last_search_term"]
+        return {"tipo": "tool", "json": f"""{{ "name": "find_products", "arguments": {{ "search_term": "{prod_memoria}", "sort_by_price": "{orden}" }} }}"""}
+    return {"tipo": "chat", "respuesta": ROUTER.respuesta_desconocido}
+
+
+def mensajes_de_usuario():
+    mensajes = []
+    for nombre in ("dataset.jsonl", "dataset2.jsonl"):
+        with open(os.path.join(RAIZ, "data", nombre), encoding="utf-8") as f:
+            for linea in f:
+                if linea.strip():
+                    ejemplo = json.loads(linea)
+                    mensajes += [m["content"] for m in ejemplo["messages"] if m["role"] == "user"]
+    return mensajes
+
+
+def medir(router, mensajes, rondas):
+    sesion = {"last_search_term": None}
+    inicio = time.perf_counter()
+    for _ in range(rondas):
+        for mensaje in mensajes:
+            router(mensaje, sesion)
+    return rondas * len(mensajes) / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rondas", type=int, default=200)
+    args = parser.parse_args()
+
+    mensajes = mensajes_de_usuario()
+    antes = medir(router_original, mensajes, args.rondas)
+    despues = medir(procesar_intencion_con_memoria, mensajes, args.rondas)
+    print(f"{len(mensajes)} mensajes x {args.rondas} rondas")
+    print(f"router original:  {antes:12,.0f} mensajes/s")
+    print(f"router compilado: {despues:12,.0f} mensajes/s  ({despues / antes:.1f}x)")
+
+    # Mensajes en los que cambia la decisión (ej: 'jean' dentro de otra palabra, acentos)
+    distintos = []
+    for mensaje in mensajes:
+        a = router_original(mensaje, {"last_search_term": None})
+        b = procesar_intencion_con_memoria(mensaje, {"last_search_term": None})
+        if a != b:
+            distintos.append((mensaje, a.get("json", "chat"), b.get("json", "chat")))
+    print(f"\n{len(distintos)} mensajes con otra decisión:")
+    for mensaje, a, b in distintos[:15]:
+        print(f"  {mensaje!r}:\n    antes:   {a}\n    después: {b}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Cuenta fallas de parseo, llamadas fuera de schema y tokens por llamada a tool
+en main2.py, con y sin la salida restringida por JSON Schema (`format` de Ollama).
+
+Por defecto levanta un servidor local que imita la API /api/chat de Ollama:
+responde con la llamada esperada del dataset y, cuando el pedido no trae
+`format`, le agrega las fallas típicas de un modelo sin restricciones (texto
+antes o después del JSON, diccionarios con comillas simples, nombres de tool
+que no existen). Así se ejercita todo el camino de main2 sin GPU. Con --url
+se mide contra un Ollama real.
+
+Uso (con products_asos.csv en la carpeta actual o en data/, o CATALOGO_CSV apuntando al CSV):
+    python benchmarks/bench_salida_estructurada.py [--mensajes 100] [--ms-token 2]
+    python benchmarks/bench_salida_estructurada.py --url http://localhost:11434 --modelo prueba
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_ollama import ChatOllama
+
+from src.clasificador import leer_ejemplos
+from src.llamada_tool import esquema_llamadas, leer_llamada
+import src.tools as tools
+
+HERRAMIENTAS = [
+    tools.search_products, tools.refine_products, tools.get_product_by_sku, tools.get_similar_products,
+    tools.recommend_products, tools.summarize_product, tools.business_info, tools.chat_response,
+]
+POR_NOMBRE = {h.name: h for h in HERRAMIENTAS}
+
+# Cómo se desvía el servidor simulado cuando no hay schema: (probabilidad, tipo)
+DESVIOS = [(0.25, "prefijo"), (0.15, "cola"), (0.08, "comillas_simples"), (0.04, "tool_inexistente")]
+
+
+def servidor_simulado(esperadas, ms_token, semilla):
+    """Servidor HTTP tipo Ollama; `generados` cuenta los tokens que llegó a enviar."""
+    estado = {"generados": 0}
+    lock = threading.Lock()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            pedido = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            usuario = next(m["content"] for m in reversed(pedido["messages"]) if m["role"] == "user")
+            llamada = esperadas[usuario]
+            texto = json.dumps(llamada, ensure_ascii=False)
+            if not pedido.get("format"):
+                azar = random.Random(f"{semilla}:{usuario}").random()
+                for probabilidad, desvio in DESVIOS:
+                    if azar < probabilidad:
+                        break
+                    azar -= probabilidad
+                else:
+                    desvio = None
+                if desvio == "prefijo":
+                    texto = f"Claro, esta es la llamada:\n```json\n{texto}\n```"
+                elif desvio == "cola":
+                    texto += "\nCon esta herramienta vas a obtener la información que pediste."
+                elif desvio == "comillas_simples":
+                    texto = str(llamada)
+                elif desvio == "tool_inexistente":
+                    texto = json.dumps({"name": "find_products", "arguments": {"search_term": usuario}},
+                                       ensure_ascii=False)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            base = {"model": pedido["model"], "created_at": datetime.now(timezone.utc).isoformat()}
+            tokens = [texto[i:i + 4] for i in range(0, len(texto), 4)]
+            try:
+                for token in tokens:
+                    time.sleep(ms_token / 1000)
+                    linea = {**base, "message": {"role": "assistant", "content": token}, "done": False}
+                    self.wfile.write((json.dumps(linea) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                    with lock:
+                        estado["generados"] += 1
+                final = {**base, "message": {"role": "assistant", "content": ""}, "done": True,
+                         "done_reason": "stop", "eval_count": len(tokens)}
+                self.wfile.write((json.dumps(final) + "\n").encode("utf-8"))
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # el cliente cortó apenas cerró el JSON
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, estado
+
+
+def fuera_de_schema(llamada):
+    """Motivo por el que la llamada no respeta el schema de las tools, o None."""
+    herramienta = POR_NOMBRE.get(llamada.get("name"))
+    if herramienta is None:
+        return f"tool inexistente {llamada.get('name')!r}"
+    argumentos = llamada.get("arguments", {})
+    campos = herramienta.tool_call_schema.model_fields
+    if not isinstance(argumentos, dict) or set(argumentos) - set(campos):
+        return f"argumentos inválidos {argumentos!r}"
+    try:
+        herramienta.tool_call_schema.model_validate(argumentos)
+    except Exception as e:
+        return f"argumentos inválidos: {e}"
+    return None
+
+
+def medir(modelo, ejemplos, prompt):
+    fallas_parseo = fallas_schema = correctas = fragmentos = 0
+    inicio = time.perf_counter()
+    for texto, tool, argumentos in ejemplos:
+        _, llamada, leidos = leer_llamada(modelo, [SystemMessage(content=prompt), HumanMessage(content=texto)])
+        fragmentos += leidos
+        if llamada is None:
+            fallas_parseo += 1
+        elif fuera_de_schema(llamada):
+            fallas_schema += 1
+        elif llamada.get("name") == tool and llamada.get("arguments", {}) == argumentos:
+            correctas += 1
+    return {
+        "fallas de parseo": fallas_parseo,
+        "fuera de schema": fallas_schema,
+        "exactas": correctas,
+        "tokens leídos/llamada": round(fragmentos / len(ejemplos), 1),
+        "ms/llamada": round((time.perf_counter() - inicio) / len(ejemplos) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=100)
+    parser.add_argument("--ms-token", type=float, default=2.0)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--url", help="Ollama real (si no, servidor simulado)")
+    parser.add_argument("--modelo", default=os.getenv("MODELO", "prueba"))
+    args = parser.parse_args()
+
+    # El prompt del sistema de main2.py, sin importar main2 (arranca el loop)
+    with open(os.path.join(os.path.dirname(tools.__file__), "main2.py"), encoding="utf-8") as f:
+        codigo = f.read()
+    prompt = codigo.split('SYSTEM_PROMPT = """', 1)[1].split('"""', 1)[0]
+
+    # Sin los mensajes que ninguna tool de main2 resuelve en una sola llamada
+    ejemplos = [e for e in leer_ejemplos(tools_validas=set(POR_NOMBRE)) if e[2] is not None][:args.mensajes]
+    url, estado = args.url, None
+    if url is None:
+        esperadas = {texto: {"name": tool, "arguments": argumentos} for texto, tool, argumentos in ejemplos}
+        servidor, estado = servidor_simulado(esperadas, args.ms_token, args.semilla)
+        url = f"http://127.0.0.1:{servidor.server_port}"
+
+    esquema = esquema_llamadas(HERRAMIENTAS)
+    print(f"{len(ejemplos)} mensajes contra {url} (schema: {len(json.dumps(esquema))} bytes)")
+    for modo, formato in [("sin schema", None), ("con schema", esquema)]:
+        modelo = ChatOllama(model=args.modelo, base_url=url, temperature=0.0, format=formato)
+        antes = estado["generados"] if estado else 0
+        resultado = medir(modelo, ejemplos, prompt)
+        if estado:
+            time.sleep(0.05)  # que el servidor registre los cortes
+            resultado["tokens generados/llamada"] = round((estado["generados"] - antes) / len(ejemplos), 1)
+        print(f"{modo:>10}: " + ", ".join(f"{k} {v}" for k, v in resultado.items()))
+
+
+if __name__ == "__main__":
+    main()
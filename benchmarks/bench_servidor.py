@@ -0,0 +1,106 @@
+"""
+Benchmark de concurrencia del servidor MCP: requests/s con 1, 16 y 128 clientes
+simultáneos llamando a find_products, y el retraso máximo del event loop
+(si una consulta bloqueara el loop, se vería acá).
+
+Uso:
+    python benchmarks/bench_servidor.py --filas 200000 --pedidos 2000 [--pool procesos]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import src.negocio as negocio
+from src.servidor_mcp import crear_servidor
+from benchmarks.sintetico import COLORES, PRENDAS, TALLES, generar_catalogo
+
+
+def consulta_al_azar(rng):
+    consulta = {"search_term": rng.choice(PRENDAS)}
+    if rng.random() < 0.5:
+        consulta["color"] = rng.choice(COLORES)
+    if rng.random() < 0.3:
+        consulta["talle"] = rng.choice(TALLES)
+    if rng.random() < 0.6:
+        consulta["sort_by_price"] = rng.choice(["asc", "desc"])
+    return consulta
+
+
+async def medir_loop(detener, retrasos):
+    """Cada 10 ms anota cuánto tarde de más se despertó el loop."""
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(0.01)
+        retrasos.append(time.perf_counter() - inicio - 0.01)
+
+
+async def correr(servidor, clientes, pedidos, semilla):
+    rng = random.Random(semilla)
+    consultas = [consulta_al_azar(rng) for _ in range(pedidos)]
+    pendientes = iter(consultas)
+    latencias, retrasos = [], []
+    detener = asyncio.Event()
+
+    async def cliente():
+        for consulta in pendientes:
+            inicio = time.perf_counter()
+            await servidor.call_tool("find_products", consulta)
+            latencias.append(time.perf_counter() - inicio)
+
+    vigia = asyncio.create_task(medir_loop(detener, retrasos))
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(clientes)))
+    total = time.perf_counter() - inicio
+    detener.set()
+    await vigia
+
+    latencias.sort()
+    return {
+        "req_s": pedidos / total,
+        "p50_ms": latencias[len(latencias) // 2] * 1000,
+        "p99_ms": latencias[int(len(latencias) * 0.99)] * 1000,
+        "retraso_loop_ms": max(retrasos, default=0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--pedidos", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--pool", choices=["hilos", "procesos"], default="hilos")
+    args = parser.parse_args()
+
+    # Desde un CSV, como el servidor real: con procesos, los workers adjuntan su snapshot
+    ruta = os.path.join(tempfile.mkdtemp(), "catalogo.csv")
+    generar_catalogo(args.filas).to_csv(ruta, index=False)
+    negocio.cargar_base_de_datos(ruta)
+
+    servidor = crear_servidor(workers=args.workers, pool=args.pool)
+    salida = sys.stdout
+    print(f"{'clientes':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'loop máx ms':>12}")
+    for clientes in (1, 16, 128):
+        # Caché vacía en cada ronda para que todas midan lo mismo (con
+        # procesos, cada worker tiene la suya y solo se vacía la del padre)
+        negocio.invalidar_cache()
+        # Los print() de depuración de las tools no cuentan para la medición
+        sys.stdout = open(os.devnull, "w")
+        try:
+            r = asyncio.run(correr(servidor, clientes, args.pedidos, semilla=clientes))
+        finally:
+            sys.stdout.close()
+            sys.stdout = salida
+        print(f"{clientes:8} {r['req_s']:9.0f} {r['p50_ms']:8.1f} {r['p99_ms']:8.1f} "
+              f"{r['retraso_loop_ms']:12.1f}")
+    if args.pool == "hilos":
+        print(f"\nCaché: {negocio.estadisticas_cache()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Mide el motor de similitud de get_similar_products (src/similitud.py):
+armado de los vectores (y su memmap en disco), latencia por consulta suelta,
+en lote y desde la tabla de SKUs calientes, y qué tan parecidos son los
+vecinos (misma categoría, mismo color, diferencia de precio) comparados con
+lo que devolvía antes la tool (los 5 primeros de la categoría).
+
+El catálogo sintético tiene pocas palabras distintas; con --vocabulario cada
+descripción suma palabras de un vocabulario de ese tamaño (frecuencias tipo
+Zipf), como en un catálogo real, y se compara la calidad con 128 dimensiones
+(lo que usaba el motor) para ver el efecto de las colisiones del hash.
+
+Uso:
+    python benchmarks/bench_similitud.py [--filas 1000000] [--consultas 64] [--vocabulario 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.sintetico import generar_catalogo
+import src.similitud as similitud
+from src.similitud import MotorSimilitud
+
+
+def parecido(df, consultas, vecinos):
+    """(misma categoría, mismo color, diferencia relativa de precio) promedio."""
+    base = df.iloc[np.repeat(consultas, vecinos.shape[1])]
+    otros = df.iloc[vecinos.ravel()]
+    categoria = (base["category"].to_numpy() == otros["category"].to_numpy()).mean()
+    color = (base["color"].to_numpy() == otros["color"].to_numpy()).mean()
+    precio = np.abs(base["precio"].to_numpy() - otros["precio"].to_numpy()) / base["precio"].to_numpy()
+    return categoria, color, np.median(precio)
+
+
+def agregar_vocabulario(df, tamano, palabras=8, semilla=1):
+    """Suma a cada descripción `palabras` palabras de un vocabulario de `tamano` (Zipf)."""
+    rng = np.random.default_rng(semilla)
+    vocabulario = np.array([f"w{i}x" for i in range(tamano)], dtype=object)
+    pesos = 1.0 / np.arange(1, tamano + 1)
+    elegidas = rng.choice(tamano, (len(df), palabras), p=pesos / pesos.sum())
+    extra = pd.Series([" ".join(fila) for fila in vocabulario[elegidas]], index=df.index)
+    df["description"] = df["description"] + " " + extra
+
+
+def colisiones(df):
+    """(tokens distintos, dimensiones usadas) de los vectores."""
+    tokens = set()
+    for columna in ("nombre", "description"):
+        tokens |= {f"{columna}:{t}" for t in pd.unique(df[columna].str.lower().str.split().explode())}
+    for columna in ("color", "category"):
+        tokens |= {f"{columna}={v}" for v in pd.unique(df[columna].str.lower())}
+    return len(tokens), len({similitud._dimension(t) for t in tokens})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--consultas", type=int, default=64)
+    parser.add_argument("--vocabulario", type=int, default=0)
+    args = parser.parse_args()
+
+    df = generar_catalogo(args.filas)
+    df["precio"] = pd.to_numeric(df["precio"].str.replace(r"[$,]", "", regex=True))
+    if args.vocabulario:
+        agregar_vocabulario(df, args.vocabulario)
+    tokens, usadas = colisiones(df)
+    print(f"{tokens:,} tokens distintos en {usadas:,} de {similitud.DIMENSIONES:,} dimensiones")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "catalogo.csv")
+        df.head(1).to_csv(ruta, index=False)  # solo para la huella del archivo
+
+        inicio = time.perf_counter()
+        motor = MotorSimilitud.desde_catalogo(df, ruta)
+        armado = time.perf_counter() - inicio
+        carpeta_vectores = ruta + ".similitud"
+        tamano = sum(os.path.getsize(os.path.join(carpeta_vectores, a)) for a in os.listdir(carpeta_vectores))
+        inicio = time.perf_counter()
+        motor = MotorSimilitud.desde_catalogo(df, ruta)
+        reapertura = time.perf_counter() - inicio
+        print(f"{args.filas:,} filas: vectores en {armado:.1f} s, {tamano / 2**20:.0f} MB en disco "
+              f"({tamano / args.filas:.0f} bytes/producto), reabrir el memmap {reapertura * 1000:.1f} ms")
+
+        consultas = np.random.default_rng(0).choice(args.filas, args.consultas, replace=False)
+
+        inicio = time.perf_counter()
+        sueltas = np.stack([motor.similares([f], 5)[0] for f in consultas])
+        suelta = (time.perf_counter() - inicio) / len(consultas)
+
+        inicio = time.perf_counter()
+        lote = motor.similares(consultas, 5)
+        en_lote = (time.perf_counter() - inicio) / len(consultas)
+
+        motor.precalcular(consultas)
+        inicio = time.perf_counter()
+        for f in consultas:
+            motor.vecinos(f, 5)
+        tabla = (time.perf_counter() - inicio) / len(consultas)
+
+        print(f"consulta suelta:   {suelta * 1000:9.2f} ms")
+        print(f"en lote de {len(consultas)}:    {en_lote * 1000:9.2f} ms por consulta ({suelta / en_lote:.0f}x)")
+        print(f"tabla de calientes:{tabla * 1000:9.4f} ms")
+        print(f"lote == sueltas: {bool((sueltas == lote).all())}")
+
+        anteriores = np.stack([
+            df.index[df["category"].to_numpy() == df["category"].iat[f]][:6].difference([f])[:5].to_numpy()
+            for f in consultas[:10]
+        ])
+        # Los mismos vecinos con 128 dimensiones: las palabras se pisan en el hash
+        dimensiones = similitud.DIMENSIONES
+        similitud.DIMENSIONES = 128
+        con_128 = MotorSimilitud(similitud.vectorizar_catalogo(df)).similares(consultas, 5)
+        similitud.DIMENSIONES = dimensiones
+        for nombre, vecinos, filas in (("antes (5 primeros de la categoría)", anteriores, consultas[:10]),
+                                       ("con 128 dimensiones", con_128, consultas),
+                                       (f"con {dimensiones:,} dimensiones", lote, consultas)):
+            categoria, color, precio = parecido(df, filas, vecinos)
+            print(f"{nombre:>35}: misma categoría {categoria:.0%}, mismo color {color:.0%}, "
+                  f"diferencia de precio (mediana) {precio:.0%}")
+        del motor
+
+
+if __name__ == "__main__":
+    main()
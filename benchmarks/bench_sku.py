@@ -0,0 +1,79 @@
+"""
+Mide las búsquedas por SKU de tools.py (get_product_by_sku, summarize_product,
+get_similar_products) con el índice SKU -> fila y la agrupación por categoría,
+contra el escaneo completo del DataFrame que hacían antes. También verifica
+que el producto y el resumen sean los mismos, incluyendo SKUs inexistentes
+(los similares ya no son los primeros de la categoría: ver bench_similitud.py).
+
+Uso:
+    python benchmarks/bench_sku.py [--filas 1000000] [--consultas 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.sintetico import generar_catalogo
+import src.tools as tools
+
+
+def por_escaneo(df, sku):
+    """Lo que hacían las tools antes: (producto, similares, resumen) filtrando todo df."""
+    base = df[df["sku"].astype(str) == sku]
+    if base.empty:
+        return "No encontré ese producto", [], "Producto no encontrado"
+    p = base.iloc[0]
+    similares = df[df["category"] == p["category"]].head(5).to_dict(orient="records")
+    resumen = f"{p['nombre']} en color {p['color']}, ideal para uso diario. Precio ${p['precio']}."
+    # El catálogo compartido guarda el SKU como texto, como viene en el CSV
+    return dict(p.to_dict(), sku=str(p["sku"])), similares, resumen
+
+
+def por_indice(sku):
+    return (tools.get_product_by_sku.func.__wrapped__(sku),
+            tools.get_similar_products.func.__wrapped__(sku),
+            tools.summarize_product.func.__wrapped__(sku))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--consultas", type=int, default=200)
+    args = parser.parse_args()
+
+    df = generar_catalogo(args.filas)
+    df["sku"] = df["sku"].astype(int)
+    df["precio"] = pd.to_numeric(df["precio"].str.replace(r"[$,]", "", regex=True))
+
+    inicio = time.perf_counter()
+    tools.indexar_catalogo(df)
+    print(f"{args.filas:,} filas: índices armados en {time.perf_counter() - inicio:.2f} s")
+    tools.motor_similitud()  # los vectores de similitud se arman aparte (bench_similitud.py)
+
+    rng = np.random.default_rng(0)
+    skus = [str(s) for s in rng.choice(df["sku"].to_numpy(), args.consultas)]
+    skus += ["999", "no-existe"]
+
+    # El escaneo es lento: se compara sobre una muestra
+    muestra = skus[:20] + skus[-2:]
+    inicio = time.perf_counter()
+    esperados = [por_escaneo(df, sku) for sku in muestra]
+    escaneo = (time.perf_counter() - inicio) / len(muestra)
+
+    inicio = time.perf_counter()
+    obtenidos = [por_indice(sku) for sku in skus]
+    indice = (time.perf_counter() - inicio) / len(skus)
+
+    distintos = sum((a[0], a[2]) != (b[0], b[2]) for a, b in zip(esperados, obtenidos[:20] + obtenidos[-2:]))
+    print(f"escaneo: {escaneo * 1000:8.2f} ms por SKU (las tres tools)")
+    print(f"índice:  {indice * 1000:8.3f} ms por SKU (las tres tools), {escaneo / indice:.0f}x")
+    print(f"resultados distintos: {distintos} de {len(muestra)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compara, con un modelo simulado, esperar la respuesta completa del LLM
+(invoke + regex, como hacía main2.py) contra leerla en streaming y cortar
+apenas se cierra el JSON de la tool (src/llamada_tool.py).
+
+El modelo simulado emite las respuestas del dataset de a tokens de ~4
+caracteres con una demora fija por token, seguidas de `--cola` tokens de
+texto extra (lo que un modelo suele agregar después del JSON antes de cortar).
+
+Uso:
+    python benchmarks/bench_streaming.py [--ms-token 20] [--cola 30] [--mensajes 40]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.clasificador import DATASETS
+from src.llamada_tool import leer_llamada
+
+COLA = " Listo, con esa herramienta vas a encontrar lo que buscás. ¿Te ayudo con algo más?"
+
+
+class ModeloSimulado:
+    """Devuelve una respuesta fija token a token, con `segundos_token` por token."""
+
+    def __init__(self, respuesta, segundos_token):
+        self.tokens = [respuesta[i:i + 4] for i in range(0, len(respuesta), 4)]
+        self.segundos_token = segundos_token
+        self.generados = 0
+
+    def stream(self, mensajes):
+        for token in self.tokens:
+            time.sleep(self.segundos_token)
+            self.generados += 1
+            yield AIMessageChunk(content=token)
+
+    def invoke(self, mensajes):
+        return AIMessage(content="".join(chunk.content for chunk in self.stream(mensajes)))
+
+
+def respuestas_dataset(n):
+    respuestas = []
+    for ruta in DATASETS:
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                if linea.strip():
+                    mensajes = json.loads(linea)["messages"]
+                    respuestas.append(next(m["content"] for m in mensajes if m["role"] == "assistant"))
+    return respuestas[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ms-token", type=float, default=20.0)
+    parser.add_argument("--cola", type=int, default=30, help="tokens de texto extra después del JSON")
+    parser.add_argument("--mensajes", type=int, default=40)
+    args = parser.parse_args()
+
+    cola = (COLA * 10)[:args.cola * 4]
+    respuestas = respuestas_dataset(args.mensajes)
+    total = {"invoke": [0.0, 0], "streaming": [0.0, 0]}
+    distintas = 0
+    for respuesta in respuestas:
+        modelo = ModeloSimulado(respuesta + cola, args.ms_token / 1000)
+        inicio = time.perf_counter()
+        content = modelo.invoke([]).content.strip()
+        llamada_invoke = json.loads(re.search(r"\{.*\}", content, re.DOTALL).group(0))
+        total["invoke"][0] += time.perf_counter() - inicio
+        total["invoke"][1] += modelo.generados
+
+        modelo = ModeloSimulado(respuesta + cola, args.ms_token / 1000)
+        inicio = time.perf_counter()
+        _, llamada, _ = leer_llamada(modelo, [])
+        total["streaming"][0] += time.perf_counter() - inicio
+        total["streaming"][1] += modelo.generados
+        distintas += llamada != llamada_invoke
+
+    n = len(respuestas)
+    print(f"{n} llamadas, {args.ms_token:.0f} ms/token, {args.cola} tokens de cola")
+    for modo, (segundos, tokens) in total.items():
+        print(f"{modo:>9}: {segundos / n * 1000:7.1f} ms hasta la tool, {tokens / n:5.1f} tokens generados")
+    print(f"ahorro: {1 - total['streaming'][0] / total['invoke'][0]:.0%} de latencia, "
+          f"{1 - total['streaming'][1] / total['invoke'][1]:.0%} de tokens")
+    print(f"llamadas distintas entre ambos modos: {distintas}")
+
+
+if __name__ == "__main__":
+    main()
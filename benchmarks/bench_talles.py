@@ -0,0 +1,61 @@
+"""
+Benchmark: filtro de talle de find_products con máscaras de bits (TallesPorFila)
+vs. el str.lower().str.contains anterior sobre la columna de talles.
+
+Además de los tiempos muestra cuántas filas encuentra cada uno: el contains
+cuenta de más ('S' también encuentra 'XS' y 'XXS').
+
+Uso:
+    python benchmarks/bench_talles.py --filas 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import src.negocio as negocio
+from benchmarks.sintetico import generar_catalogo
+
+TALLES = ["S", "M", "XL", "UK 8", "s, m"]
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    talles = generar_catalogo(args.filas)["talle"]
+
+    inicio = time.perf_counter()
+    bits = negocio.TallesPorFila(talles.to_numpy())
+    print(f"Máscaras armadas en {time.perf_counter() - inicio:.2f}s "
+          f"({len(bits.vocabulario)} talles, {bits.bits.nbytes / len(talles):.0f} bytes por fila)\n")
+
+    # Referencia exacta: el talle pedido está en la lista de la fila
+    listas = [set(negocio.separar_talles(t)) for t in talles]
+
+    print(f"{'talle':8} {'contains ms':>12} {'bits ms':>9} {'x':>6} {'filas contains':>15} {'filas bits':>11} {'exacto':>7}")
+    for talle in TALLES:
+        t_contains, anterior = medir(lambda: talles.str.lower().str.contains(talle.lower().strip(), na=False).to_numpy(),
+                                     args.repeticiones)
+        t_bits, nuevo = medir(lambda: bits.contiene(talle), args.repeticiones)
+        pedidos = set(negocio.separar_talles(talle))
+        esperado = np.fromiter((bool(l & pedidos) for l in listas), dtype=bool, count=len(listas))
+        print(f"{talle!r:8} {t_contains:12.1f} {t_bits:9.2f} {t_contains / t_bits:6.0f} "
+              f"{anterior.sum():15,} {nuevo.sum():11,} {str((nuevo == esperado).all()):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Generador de catálogos sintéticos con la misma forma que products_asos.csv,
+para medir los benchmarks sin depender del CSV real.
+"""
+import numpy as np
+import pandas as pd
+
+PRENDAS = ["T-Shirt", "Jeans", "Jacket", "Coat", "Dress", "Shirt", "Hoodie", "Skirt",
+           "Trench Coat", "Sweatshirt", "Shorts", "Blazer", "Cardigan", "Jumper", "Trousers"]
+COLORES = ["black", "white", "blue", "red", "green", "grey", "beige", "pink",
+           "navy", "brown", "khaki", "cream", "stone", "yellow", "purple"]
+ESTILOS = ["oversized", "slim fit", "relaxed", "cropped", "longline", "skinny", "straight",
+           "organic cotton", "washed", "ribbed", "leather", "denim", "linen", "wool blend"]
+MARCAS = ["ASOS DESIGN", "Topshop", "Monki", "Weekday", "Collusion", "Reclaimed Vintage",
+          "New Look", "River Island", "Bershka", "Pull&Bear"]
+TALLES = ["XXS", "XS", "S", "M", "L", "XL", "XXL", "UK 4", "UK 6", "UK 8", "UK 10", "UK 12"]
+CATEGORIAS = ["Tops", "Jeans", "Coats & Jackets", "Dresses", "Shirts", "Hoodies & Sweatshirts",
+              "Skirts", "Trousers & Leggings", "Shorts", "Knitwear"]
+
+
+def generar_catalogo(n, semilla=0):
+    """Devuelve un DataFrame de `n` productos con las columnas del CSV original."""
+    rng = np.random.default_rng(semilla)
+    marcas = rng.choice(MARCAS, n)
+    estilos = rng.choice(ESTILOS, n)
+    colores = rng.choice(COLORES, n)
+    prendas = rng.choice(PRENDAS, n)
+    nombres = (pd.Series(marcas) + " " + estilos + " " + prendas + " in " + colores).to_numpy()
+
+    # Cada producto trae entre 1 y 5 talles consecutivos
+    inicio = rng.integers(0, len(TALLES) - 1, n)
+    largo = rng.integers(1, 6, n)
+    talles = [",".join(TALLES[i:i + l]) for i, l in zip(inicio, largo)]
+
+    precios = np.round(rng.gamma(2.0, 20.0, n) + 5, 2)
+    return pd.DataFrame({
+        "sku": np.arange(100000, 100000 + n).astype(str),
+        "nombre": nombres,
+        "precio": ["$" + format(p, ",.2f") for p in precios],
+        "talle": talles,
+        "color": colores,
+        "category": rng.choice(CATEGORIAS, n),
+        "description": (pd.Series(estilos) + " " + prendas + " by " + marcas).to_numpy(),
+    })
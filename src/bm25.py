@@ -0,0 +1,275 @@
+"""
+Búsqueda de texto libre con ranking BM25 para search_products (tools.py).
+
+Cada producto es un documento con su nombre, descripción y categoría. Los
+términos se pliegan (minúsculas, sin acentos) y se reducen con un stemming
+liviano de plurales en español e inglés ('pantalones' -> 'pantalon',
+'dresses' -> 'dress'), así la consulta no tiene que coincidir letra por letra.
+
+Las posting lists guardan el puntaje BM25 ya calculado de cada (término,
+producto) y están ordenadas de mayor a menor. Una consulta de un término es
+leer sus primeros k; con varios términos se recorren las listas en paralelo
+por bloques y se corta apenas el top-k no puede cambiar (algoritmo NRA).
+
+El índice se guarda en '<csv>.bm25/', junto al snapshot del catálogo, y se
+reutiliza mientras el CSV no cambie.
+"""
+import functools
+import json
+import os
+import shutil
+
+import numpy as np
+
+try:
+    from src.intenciones import plegar
+    from src.negocio import PATRON_TOKEN, _guardar_textos, _leer_textos, huella_csv, tokens_por_fila
+except ImportError:
+    from intenciones import plegar
+    from negocio import PATRON_TOKEN, _guardar_textos, _leer_textos, huella_csv, tokens_por_fila
+
+VERSION_BM25 = 2
+K1 = 1.2
+B = 0.75
+COLUMNAS_BM25 = ("nombre", "description", "category")
+VOCALES = set("aeiou")
+
+
+@functools.lru_cache(maxsize=65536)
+def raiz(palabra):
+    """
+    Stemming liviano de plurales. Singular y plural terminan en la misma raíz:
+    'hoodies' -> 'hoodie', 'accessories'/'accessory' -> 'accessorie',
+    'blouses'/'blouse' -> 'blous', 'pantalones' -> 'pantalon', 'jeans' -> 'jean'.
+    """
+    if len(palabra) <= 3 or palabra.isdigit():
+        return palabra
+    if palabra.endswith("ies") and len(palabra) > 4:
+        return palabra[:-1]
+    if palabra.endswith("y") and palabra[-2] not in VOCALES:
+        return palabra[:-1] + "ie"
+    if palabra.endswith("s") and not palabra.endswith("ss"):
+        palabra = palabra[:-1]
+    # La -e final después de consonante se saca siempre, en singular y en plural
+    # ('traje'/'trajes', 'dress'/'dresses', 'pantalon'/'pantalones')
+    if palabra.endswith("e") and len(palabra) > 3 and palabra[-2] not in VOCALES:
+        return palabra[:-1]
+    return palabra
+
+
+def terminos(texto):
+    return [raiz(palabra) for palabra in PATRON_TOKEN.findall(plegar(texto))]
+
+
+def texto_documentos(df):
+    """Nombre, descripción y categoría de cada producto, en un solo texto."""
+    columnas = [df[c].fillna("").astype(str) for c in COLUMNAS_BM25 if c in df]
+    texto = columnas[0]
+    for columna in columnas[1:]:
+        texto = texto + " " + columna
+    return texto
+
+
+class IndiceBM25:
+    """
+    Posting lists con puntajes BM25 precalculados.
+    - vocabulario: término -> id.
+    - cortes: la posting del término t es docs/impactos[cortes[t]:cortes[t + 1]].
+    - docs / impactos: ordenados por término, puntaje descendente y posición.
+    """
+
+    def __init__(self, vocabulario, cortes, docs, impactos, documentos):
+        self.documentos = documentos
+        self.terminos = vocabulario
+        self.vocabulario = {t: i for i, t in enumerate(vocabulario)}
+        self.cortes = cortes
+        self.docs = docs
+        self.impactos = impactos
+
+    @classmethod
+    def construir(cls, df):
+        n = len(df)
+        filas, codigos, vocabulario = tokens_por_fila(texto_documentos(df), terminos)
+        v = max(len(vocabulario), 1)
+
+        # Frecuencia de cada término en cada documento
+        pares, tf = np.unique(filas * v + codigos, return_counts=True)
+        docs, ids = pares // v, pares % v
+        largos = np.bincount(filas, minlength=n).astype(np.float32)
+        promedio = largos.mean() if n and largos.any() else 1.0
+        df_termino = np.bincount(ids, minlength=len(vocabulario))
+        idf = np.log1p((n - df_termino + 0.5) / (df_termino + 0.5)).astype(np.float32)
+
+        normal = K1 * (1 - B + B * largos[docs] / promedio)
+        impactos = (idf[ids] * tf * (K1 + 1) / (tf + normal)).astype(np.float32)
+
+        orden = np.lexsort((docs, -impactos, ids))
+        cortes = np.searchsorted(ids[orden], np.arange(len(vocabulario) + 1))
+        return cls(vocabulario, cortes.astype(np.int64), docs[orden].astype(np.int32), impactos[orden], n)
+
+    # --- Persistencia ---
+
+    def guardar(self, carpeta, meta):
+        # Con el pid: varios procesos pueden estar guardando el mismo catálogo a la vez
+        temporal = f"{carpeta}.tmp-{os.getpid()}"
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(temporal)
+        _guardar_textos(os.path.join(temporal, "vocabulario.txt"), self.terminos)
+        np.save(os.path.join(temporal, "cortes.npy"), self.cortes)
+        np.save(os.path.join(temporal, "docs.npy"), self.docs)
+        np.save(os.path.join(temporal, "impactos.npy"), self.impactos)
+        with open(os.path.join(temporal, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({**meta, "terminos": len(self.terminos)}, f)
+        shutil.rmtree(carpeta, ignore_errors=True)
+        os.replace(temporal, carpeta)
+
+    @classmethod
+    def leer(cls, carpeta):
+        with open(os.path.join(carpeta, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        vocabulario = _leer_textos(os.path.join(carpeta, "vocabulario.txt"), meta["terminos"])
+        abrir = lambda nombre: np.load(os.path.join(carpeta, nombre), mmap_mode="r")
+        indice = cls(list(vocabulario), abrir("cortes.npy"), abrir("docs.npy"), abrir("impactos.npy"), meta["filas"])
+        return indice, meta
+
+    @classmethod
+    def desde_catalogo(cls, df, ruta_csv=None):
+        """
+        Arma el índice para `df`. Con `ruta_csv`, se guarda en '<ruta_csv>.bm25/'
+        y se reutiliza mientras el CSV no cambie.
+        """
+        if ruta_csv is None:
+            return cls.construir(df)
+
+        carpeta = ruta_csv + ".bm25"
+        huella = huella_csv(ruta_csv, con_hash=False)
+        try:
+            indice, meta = cls.leer(carpeta)
+            if meta["version"] == VERSION_BM25 and meta["huella"] == huella and meta["filas"] == len(df):
+                return indice
+        except (OSError, ValueError, KeyError):
+            pass
+
+        indice = cls.construir(df)
+        try:
+            indice.guardar(carpeta, {"version": VERSION_BM25, "huella": huella, "filas": len(df)})
+            print(f"🔎 Índice BM25 guardado en {carpeta}")
+        except OSError as e:
+            # Se sigue con el índice en memoria
+            print(f"No se pudo guardar el índice BM25: {e}")
+        return indice
+
+    # --- Consultas ---
+
+    def _postings(self, consulta):
+        ids = {self.vocabulario[t] for t in terminos(consulta) if t in self.vocabulario}
+        return [(self.docs[self.cortes[i]:self.cortes[i + 1]], self.impactos[self.cortes[i]:self.cortes[i + 1]])
+                for i in sorted(ids)]
+
+    def puntajes(self, consulta, listas=None):
+        """Puntaje BM25 de todos los documentos (recorre las postings completas)."""
+        total = np.zeros(self.documentos, dtype=np.float64)
+        for docs, impactos in self._postings(consulta) if listas is None else listas:
+            total += np.bincount(docs, weights=impactos, minlength=self.documentos)
+        return total
+
+    def coincidencias(self, consulta, todas=False):
+        """
+        (posiciones, puntajes) de todos los documentos con algún término de la
+        consulta (con todas=True, con todos los que están en el vocabulario),
+        por posición. Cuesta lo que sus postings, no lo que el catálogo.
+        """
+        listas = self._postings(consulta)
+        if not listas:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        docs = np.concatenate([np.asarray(d) for d, _ in listas])
+        filas, inversa, cuantos = np.unique(docs, return_inverse=True, return_counts=True)
+        puntajes = np.bincount(inversa, weights=np.concatenate([np.asarray(i) for _, i in listas]))
+        if todas:
+            # Cada término aparece una sola vez en las postings de un documento
+            completas = cuantos == len(listas)
+            filas, puntajes = filas[completas], puntajes[completas]
+        return filas.astype(np.int32), puntajes.astype(np.float32)
+
+    @staticmethod
+    def mejores(puntajes, k):
+        """(posiciones, puntajes) de los k mayores puntajes positivos; empates por posición."""
+        if k < len(puntajes):
+            umbral = max(np.partition(puntajes, len(puntajes) - k)[len(puntajes) - k], np.finfo(float).tiny)
+        else:
+            umbral = np.finfo(float).tiny
+        # Todos los que superan el umbral entran; de los empatados, los primeros
+        arriba = np.flatnonzero(puntajes > umbral)
+        empatados = np.flatnonzero(puntajes == umbral)[:k - len(arriba)]
+        candidatos = np.concatenate([arriba, empatados])
+        orden = np.lexsort((candidatos, -puntajes[candidatos]))
+        return candidatos[orden], puntajes[candidatos[orden]].astype(np.float32)
+
+    def buscar(self, consulta, k=5):
+        """
+        (posiciones, puntajes) de los k mejores documentos, de mayor a menor
+        puntaje y, a igual puntaje, por posición en el catálogo.
+        """
+        listas = self._postings(consulta)
+        if not listas:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if len(listas) == 1:
+            docs, impactos = listas[0]
+            return np.asarray(docs[:k], dtype=np.int64), np.asarray(impactos[:k])
+
+        m = len(listas)
+        largos = np.array([len(docs) for docs, _ in listas])
+        leidos = np.zeros(m, dtype=np.int64)
+        vistos_docs, vistos_terminos, vistos_impactos = [], [], []
+        bloque = max(4 * k, 256)
+        while True:
+            for i, (docs, impactos) in enumerate(listas):
+                fin = min(leidos[i] + bloque, len(docs))
+                if fin > leidos[i]:
+                    vistos_docs.append(np.asarray(docs[leidos[i]:fin]))
+                    vistos_impactos.append(np.asarray(impactos[leidos[i]:fin]))
+                    vistos_terminos.append(np.full(fin - leidos[i], 1 << i, dtype=np.int64))
+                    leidos[i] = fin
+            bloque *= 2
+
+            # Si hay que leer buena parte de las listas (ej: muchos empates), sale
+            # más barato sumarlas completas
+            if leidos.sum() * 8 > largos.sum():
+                return self.mejores(self.puntajes(consulta, listas), k)
+
+            unicos, inversa = np.unique(np.concatenate(vistos_docs), return_inverse=True)
+            parcial = np.bincount(inversa, weights=np.concatenate(vistos_impactos))
+            agotadas = leidos >= largos
+            if len(unicos) < k:
+                continue
+
+            # Lo máximo que le puede faltar a cada documento: el próximo puntaje
+            # de cada lista en la que todavía no apareció
+            siguientes = np.array([0.0 if agotadas[i] else float(impactos[leidos[i]])
+                                   for i, (_, impactos) in enumerate(listas)])
+            mascara = np.bincount(inversa, weights=np.concatenate(vistos_terminos)).astype(np.int64)
+            faltante = np.zeros(len(unicos))
+            for i in range(m):
+                faltante += siguientes[i] * ((mascara >> i) & 1 == 0)
+            mejores = np.argpartition(-parcial, k - 1)[:k]
+            umbral = parcial[mejores].min()
+            superior = parcial + faltante
+            superior[mejores] = -np.inf
+            if umbral >= siguientes.sum() and umbral >= superior.max():
+                break
+
+        docs_mejores = unicos[mejores]
+        puntajes = parcial[mejores]
+
+        # Completa el puntaje exacto de los elegidos con lo que quedó sin leer
+        for i, (docs, impactos) in enumerate(listas):
+            if leidos[i] < len(docs):
+                resto = np.asarray(docs[leidos[i]:])
+                coinciden = np.flatnonzero(np.isin(resto, docs_mejores))
+                if len(coinciden):
+                    posicion = np.searchsorted(docs_mejores, resto[coinciden], sorter=np.argsort(docs_mejores))
+                    np.add.at(puntajes, np.argsort(docs_mejores)[posicion],
+                              np.asarray(impactos[leidos[i]:])[coinciden])
+
+        orden = np.lexsort((docs_mejores, -puntajes))
+        return docs_mejores[orden].astype(np.int64), puntajes[orden].astype(np.float32)
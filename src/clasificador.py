@@ -0,0 +1,163 @@
+"""
+Clasificador local (CPU) para elegir la tool en main2.py sin llamar al LLM.
+
+Cada mensaje se representa con n-gramas de caracteres hasheados en un vector
+fijo, y la tool se elige por el centroide más parecido (coseno), entrenado con
+los pares usuario -> tool de data/dataset.jsonl y data/dataset2.jsonl. Solo se
+decide sin el modelo cuando la predicción es clara y además se pueden armar
+los argumentos de la tool; si no, devuelve None y main2 sigue con el LLM.
+"""
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DATASETS = [os.path.join(RAIZ, "data", "dataset.jsonl"), os.path.join(RAIZ, "data", "dataset2.jsonl")]
+
+DIMENSIONES = 1 << 14
+NGRAMAS = (2, 3, 4)
+
+# El dataset de main.py usa otros nombres de tool; estas son las equivalentes en tools.py.
+# search_products solo lleva el texto: si la llamada original traía color, talle
+# u orden de precio, el ejemplo queda sin argumentos (None) y pasa por el LLM.
+ALIAS_TOOLS = {"find_products": "search_products"}
+
+# Cómo se arman los argumentos cuando se decide sin el LLM:
+# - "vacio": la tool no lleva argumentos.
+# - "vecino": se copian los del ejemplo de entrenamiento más parecido, solo si
+#   ese ejemplo tiene argumentos copiables y su texto cubre todas las palabras
+#   del mensaje (salvo PALABRAS_VACIAS); si no, decide el LLM.
+# - "sku": se toma el número de SKU escrito en el mensaje.
+# Las tools que no están acá (ej: refine_products) siempre pasan por el LLM.
+ARGUMENTOS = {
+    "recommend_products": "vacio",
+    "chat_response": "vecino",
+    "business_info": "vecino",
+    "search_products": "vecino",
+    "get_product_by_sku": "sku",
+    "summarize_product": "sku",
+    "get_similar_products": "sku",
+}
+PATRON_SKU = re.compile(r"\b\d{6,}\b")
+PATRON_PALABRA = re.compile(r"\w+")
+# Palabras que no cambian lo que se pide: no hace falta que el vecino las tenga
+PALABRAS_VACIAS = frozenset("""
+    busco buscar buscando quiero quisiera queria quería necesito tenes tenés tienen tienes tendrias tendrías
+    hay mostrame mostrá mostra muestrame muéstrame dame ver veo vendes vendés venden
+    hola che me te un una unos unas el la los las lo de del al a en y o para por favor porfa que qué
+    algo alguna algunas alguno algunos algun algún
+    i want need show me some the an do you have any looking for please
+""".split())
+
+
+def vectorizar(texto):
+    """Vector L2-normalizado de n-gramas de caracteres hasheados."""
+    texto = f" {' '.join(texto.lower().split())} "
+    vector = np.zeros(DIMENSIONES, dtype=np.float32)
+    for n in NGRAMAS:
+        for i in range(len(texto) - n + 1):
+            vector[zlib.crc32(texto[i:i + n].encode("utf-8")) & (DIMENSIONES - 1)] += 1.0
+    norma = np.linalg.norm(vector)
+    return vector / norma if norma else vector
+
+
+def leer_ejemplos(rutas=DATASETS, tools_validas=None):
+    """
+    Pares (mensaje, tool, argumentos) de los datasets de entrenamiento.
+    `argumentos` es None cuando la llamada no se puede expresar con la tool
+    equivalente (ver ALIAS_TOOLS).
+    """
+    ejemplos = []
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                if not linea.strip():
+                    continue
+                mensajes = json.loads(linea)["messages"]
+                usuario = next(m["content"] for m in mensajes if m["role"] == "user")
+                llamada = json.loads(next(m["content"] for m in mensajes if m["role"] == "assistant"))
+                tool = ALIAS_TOOLS.get(llamada["name"], llamada["name"])
+                argumentos = llamada.get("arguments", {})
+                if llamada["name"] in ALIAS_TOOLS:
+                    perdidos = set(argumentos) - {"search_term"}
+                    argumentos = None if perdidos else {"query": argumentos.get("search_term", "")}
+                if tools_validas is None or tool in tools_validas:
+                    ejemplos.append((usuario, tool, argumentos))
+    return ejemplos
+
+
+class ClasificadorTools:
+    """
+    Centroide más cercano sobre n-gramas hasheados.
+    - min_similitud: coseno mínimo con el centroide ganador.
+    - min_margen: diferencia mínima con el segundo centroide.
+    - min_similitud_vecino: coseno mínimo con el ejemplo del que se copian argumentos.
+    Los argumentos de un vecino se copian solo si su texto tiene todas las
+    palabras del mensaje (ver cubierto): si no, copiarlos perdería lo que el
+    mensaje agrega ('de lana', 'rojas', 'baratas'...) y decide el LLM.
+    """
+
+    def __init__(self, ejemplos, min_similitud=0.45, min_margen=0.08, min_similitud_vecino=0.75):
+        self.min_similitud = min_similitud
+        self.min_margen = min_margen
+        self.min_similitud_vecino = min_similitud_vecino
+
+        self.tools = sorted({tool for _, tool, _ in ejemplos})
+        self.ejemplos = ejemplos
+        self.vectores = np.stack([vectorizar(texto) for texto, _, _ in ejemplos])
+        etiquetas = np.array([self.tools.index(tool) for _, tool, _ in ejemplos])
+        self.etiquetas = etiquetas
+
+        centroides = np.stack([self.vectores[etiquetas == i].mean(axis=0) for i in range(len(self.tools))])
+        self.centroides = centroides / np.linalg.norm(centroides, axis=1, keepdims=True)
+
+
+    @classmethod
+    def desde_datasets(cls, tools_validas=None, **umbrales):
+        return cls(leer_ejemplos(tools_validas=tools_validas), **umbrales)
+
+    @staticmethod
+    def cubierto(texto, vecino):
+        """¿Toda palabra de `texto` (salvo las vacías) aparece en `vecino`?"""
+        palabras = set(PATRON_PALABRA.findall(texto.lower())) - PALABRAS_VACIAS
+        return palabras <= set(PATRON_PALABRA.findall(vecino.lower()))
+
+    def clasificar(self, texto):
+        """(tool, similitud, margen) del centroide más parecido."""
+        similitudes = self.centroides @ vectorizar(texto)
+        orden = np.argsort(similitudes)[::-1]
+        primero = similitudes[orden[0]]
+        segundo = similitudes[orden[1]] if len(orden) > 1 else 0.0
+        return self.tools[orden[0]], float(primero), float(primero - segundo)
+
+    def decidir(self, texto, especulativo=False):
+        """
+        (tool, argumentos) si la decisión es confiable sin el LLM; si no, None.
+        Con especulativo=True no se exige confianza: devuelve la mejor apuesta
+        siempre que se puedan armar los argumentos (para adelantar la tool).
+        """
+        tool, similitud, margen = self.clasificar(texto)
+        if not especulativo and (similitud < self.min_similitud or margen < self.min_margen):
+            return None
+
+        forma = ARGUMENTOS.get(tool)
+        if forma == "vacio":
+            return tool, {}
+        if forma == "sku":
+            sku = PATRON_SKU.search(texto)
+            return (tool, {"sku": sku.group(0)}) if sku else None
+        if forma == "vecino":
+            vector = vectorizar(texto)
+            de_la_tool = np.flatnonzero(self.etiquetas == self.tools.index(tool))
+            similitudes = self.vectores[de_la_tool] @ vector
+            mejor = int(np.argmax(similitudes))
+            vecino, _, argumentos = self.ejemplos[de_la_tool[mejor]]
+            if argumentos is None or (not especulativo and similitudes[mejor] < self.min_similitud_vecino):
+                return None
+            if not self.cubierto(texto, vecino):
+                return None
+            return tool, dict(argumentos)
+        return None
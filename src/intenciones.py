@@ -0,0 +1,155 @@
+"""
+Router de intenciones para main.py.
+
+Las intenciones y sus sinónimos están en data/intenciones.json. Se compilan una
+sola vez en una única expresión regular (las palabras armadas como un trie, con
+límites de palabra), así cada mensaje se clasifica en una pasada y "jean" ya no
+coincide dentro de otras palabras.
+"""
+import json
+import os
+import re
+import unicodedata
+
+RUTA_INTENCIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "intenciones.json")
+
+
+# Marcas diacríticas combinables (las que deja la normalización NFD)
+SIN_DIACRITICOS = {c: None for c in range(0x300, 0x370)}
+
+
+def plegar(texto):
+    """Minúsculas y sin acentos ('Pantalón' -> 'pantalon')."""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    return unicodedata.normalize("NFD", texto).translate(SIN_DIACRITICOS)
+
+
+def patron_trie(palabras):
+    """Alternativa regex con los prefijos comunes factorizados: ['ab', 'abc'] -> 'ab(?:c)?'."""
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for letra in palabra:
+            nodo = nodo.setdefault(letra, {})
+        nodo[""] = True
+
+    def armar(nodo):
+        final = "" in nodo
+        ramas = [re.escape(letra) + armar(hijo) for letra, hijo in sorted(nodo.items()) if letra]
+        if not ramas:
+            return ""
+        cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+        if final:
+            return "(?:" + cuerpo + ")?"
+        return cuerpo
+
+    return armar(trie)
+
+
+class RouterIntenciones:
+    """
+    Clasifica un mensaje en: saludo, tool informativa, producto y orden de precio.
+    Ante varias coincidencias del mismo tipo gana la que aparece primero en el
+    archivo, salvo en 'orden', donde gana la última (barato pisa a caro).
+    """
+
+    def __init__(self, config):
+        self.respuesta_saludo = config["saludos"]["respuesta"]
+        self.respuesta_desconocido = config["desconocido"]
+        # Términos de búsqueda que puede mandar el router (ej: para precalcular facetas)
+        self.terminos = [grupo["termino"] for grupo in config["productos"]]
+        # Tools que reciben el producto del mensaje (o el último buscado) como search_term
+        self.con_busqueda = {grupo["tool"] for grupo in config["herramientas"] if grupo.get("usa_busqueda")}
+
+        # palabra plegada -> [(tipo, valor, prioridad), ...]
+        self.claves = {}
+        for palabra in config["saludos"]["palabras"]:
+            self._agregar(palabra, "saludo", True, 0)
+        for prioridad, grupo in enumerate(config["herramientas"]):
+            for palabra in grupo["palabras"]:
+                self._agregar(palabra, "herramienta", grupo["tool"], prioridad)
+        for prioridad, grupo in enumerate(config["productos"]):
+            for palabra in grupo["palabras"]:
+                self._agregar(palabra, "producto", grupo["termino"], prioridad)
+        for prioridad, grupo in enumerate(config["orden"]):
+            for palabra in grupo["palabras"]:
+                self._agregar(palabra, "orden", grupo["orden"], -prioridad)
+
+        self.patron = re.compile(r"\b" + patron_trie(self.claves) + r"\b")
+
+    def _agregar(self, palabra, tipo, valor, prioridad):
+        self.claves.setdefault(plegar(palabra), []).append((tipo, valor, prioridad))
+
+    @classmethod
+    def desde_archivo(cls, ruta=RUTA_INTENCIONES):
+        with open(ruta, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def analizar(self, texto_usuario):
+        """
+        Devuelve {'saludo_inicial', 'saludo', 'palabras', 'herramienta', 'producto', 'orden'}
+        recorriendo el texto una sola vez.
+        """
+        texto = plegar(texto_usuario).strip()
+        encontrado = {}
+        saludo_inicial = False
+        for match in self.patron.finditer(texto):
+            for tipo, valor, prioridad in self.claves[match.group(0)]:
+                if tipo not in encontrado or prioridad < encontrado[tipo][1]:
+                    encontrado[tipo] = (valor, prioridad)
+                if tipo == "saludo" and match.start() == 0:
+                    saludo_inicial = True
+        return {
+            "saludo_inicial": saludo_inicial,
+            "saludo": "saludo" in encontrado,
+            "palabras": len(texto.split()),
+            "herramienta": encontrado.get("herramienta", (None,))[0],
+            "producto": encontrado.get("producto", (None,))[0],
+            "orden": encontrado.get("orden", ("None",))[0],
+        }
+
+
+ROUTER = RouterIntenciones.desde_archivo()
+
+
+def procesar_intencion_con_memoria(texto_usuario, sesion, router=ROUTER):
+    intencion = router.analizar(texto_usuario)
+
+    # A. SALUDOS
+    if intencion["saludo_inicial"] or (intencion["palabras"] < 4 and intencion["saludo"]):
+        return {"tipo": "chat", "respuesta": router.respuesta_saludo}
+
+    # B. HERRAMIENTAS INFORMATIVAS
+    if intencion["herramienta"] in router.con_busqueda:
+        # Ej: "¿qué colores hay de remeras?" o, después de buscar, "¿qué talles hay?"
+        termino = intencion["producto"] or sesion["last_search_term"] or ""
+        if intencion["producto"]:
+            sesion["last_search_term"] = termino
+        return {"tipo": "tool", "json": json.dumps({"name": intencion["herramienta"], "arguments": {"search_term": termino}})}
+    if intencion["herramienta"]:
+        return {"tipo": "tool", "json": f'{{ "name": "{intencion["herramienta"]}", "arguments": {{}} }}'}
+
+    # C/D. PRODUCTO Y ORDEN DE PRECIO
+    prod_encontrado = intencion["producto"]
+    orden = intencion["orden"]
+
+    # CASO 1: BÚSQUEDA
+    if prod_encontrado:
+        sesion["last_search_term"] = prod_encontrado
+        return {
+            "tipo": "tool",
+            "json": f"""{{ "name": "find_products", "arguments": {{ "search_term": "{prod_encontrado}", "sort_by_price": "{orden}" }} }}"""
+        }
+
+    # CASO 2: REFINAMIENTO (Solo precio, usa memoria)
+    if orden != "None" and sesion["last_search_term"]:
+        prod_memoria = sesion["last_search_term"]
+        return {
+            "tipo": "tool",
+            "json": f"""{{ "name": "find_products", "arguments": {{ "search_term": "{prod_memoria}", "sort_by_price": "{orden}" }} }}"""
+        }
+
+    # CASO 3: DESCONOCIDO
+    return {"tipo": "chat", "respuesta": router.respuesta_desconocido}
@@ -0,0 +1,126 @@
+"""
+Lectura en streaming de la llamada a tool que genera el LLM en main2.py.
+
+En vez de esperar la respuesta completa y buscar el JSON con una regex, se
+consumen los tokens de `modelo.stream(...)` y se sigue el balance de llaves
+(respetando strings y escapes). Apenas se cierra el objeto JSON se corta la
+generación: lo que el modelo escriba después no se espera ni se paga.
+
+Además, `esquema_llamadas` arma un JSON Schema con las tools disponibles para
+pasarlo como `format` a Ollama: el modelo queda restringido a generar una
+llamada válida (nombre de tool existente y argumentos con el tipo correcto).
+"""
+import json
+
+
+def esquema_llamadas(herramientas):
+    """
+    JSON Schema de {"name": ..., "arguments": {...}} para un conjunto de @tool:
+    una alternativa por tool, con su nombre fijo y el schema de sus argumentos.
+    """
+    alternativas = []
+    for herramienta in herramientas:
+        argumentos = herramienta.tool_call_schema.model_json_schema()
+        argumentos.pop("title", None)
+        argumentos.pop("description", None)
+        argumentos["additionalProperties"] = False
+        alternativas.append({
+            "type": "object",
+            "properties": {"name": {"const": herramienta.name}, "arguments": argumentos},
+            "required": ["name", "arguments"],
+            "additionalProperties": False,
+        })
+    return {"anyOf": alternativas}
+
+
+class DetectorJSON:
+    """Detecta, de a pedazos, el primer objeto JSON completo de un texto."""
+
+    def __init__(self):
+        self.texto = ""
+        self.inicio = None
+        self.profundidad = 0
+        self.en_string = False
+        self.escape = False
+        self._posicion = 0
+
+    def agregar(self, fragmento):
+        """Suma texto; devuelve el objeto JSON (como string) en cuanto se cierra, o None."""
+        self.texto += fragmento
+        while self._posicion < len(self.texto):
+            c = self.texto[self._posicion]
+            self._posicion += 1
+            if self.inicio is None:
+                if c == "{":
+                    self.inicio = self._posicion - 1
+                    self.profundidad = 1
+                continue
+            if self.en_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.en_string = False
+            elif c == '"':
+                self.en_string = True
+            elif c == "{":
+                self.profundidad += 1
+            elif c == "}":
+                self.profundidad -= 1
+                if self.profundidad == 0:
+                    return self.texto[self.inicio:self._posicion]
+        return None
+
+    def descartar(self):
+        """Descarta el objeto detectado: se vuelve a buscar desde la llave siguiente a la que lo abría."""
+        self._posicion = self.inicio + 1
+        self.inicio = None
+        self.profundidad = 0
+        self.en_string = False
+        self.escape = False
+
+
+def _primera_llamada(detector, candidato):
+    """El primer objeto JSON válido desde `candidato`, o None si no se cerró ninguno."""
+    while candidato is not None:
+        try:
+            return json.loads(candidato)
+        except ValueError:
+            # Llaves balanceadas pero JSON inválido: era texto, se sigue buscando
+            # en lo ya recibido desde la llave siguiente
+            detector.descartar()
+            candidato = detector.agregar("")
+    return None
+
+
+def leer_llamada(modelo, mensajes):
+    """
+    Consume `modelo.stream(mensajes)` hasta tener la llamada a tool completa.
+    Devuelve (contenido, llamada, fragmentos):
+    - contenido: el texto recibido (completo si no había JSON).
+    - llamada: el dict con 'name'/'arguments', o None si no hubo un JSON válido.
+    - fragmentos: cuántos fragmentos (tokens) se leyeron.
+    """
+    detector = DetectorJSON()
+    fragmentos = 0
+    stream = modelo.stream(mensajes)
+    try:
+        for chunk in stream:
+            fragmentos += 1
+            candidato = detector.agregar(chunk.content if isinstance(chunk.content, str) else str(chunk.content))
+            llamada = _primera_llamada(detector, candidato)
+            if llamada is not None:
+                return detector.texto.strip(), llamada, fragmentos
+    finally:
+        # Cerrar el generador corta la generación del lado del modelo
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+    # Una llave que nunca se cerró ('{x {"name": ...}}'): se busca desde la siguiente
+    while detector.inicio is not None:
+        detector.descartar()
+        llamada = _primera_llamada(detector, detector.agregar(""))
+        if llamada is not None:
+            return detector.texto.strip(), llamada, fragmentos
+    return detector.texto.strip(), None, fragmentos
@@ -5,26 +5,27 @@ import ast
 import inspect
 
 from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 
-import src.negocio as negocio 
+from src.intenciones import procesar_intencion_con_memoria
+from src.sesiones import AlmacenSesiones
 from src.negocio import (
     find_products, get_opening_hours, get_location,
     get_general_recommendations, list_sample_products,
-    get_return_policy, chat_response 
+    get_return_policy, get_available_filters, chat_response 
 )
 
-negocio.cargar_base_de_datos()
+# El catálogo no se carga acá: lo carga la primera consulta (negocio.catalogo_actual)
 
 MODEL_NAME = os.getenv("MODELO", "prueba") 
 print(f"🤖 Conectando al modelo: {MODEL_NAME}")
 llm = ChatOllama(model=MODEL_NAME, temperature=0.0)
 
 # --- 1. MEMORIA DE SESIÓN ---
-SESSION_CONTEXT = {
-    "last_search_term": None,
-    "last_product_list": ""
-}
+# Una sesión por usuario (acá hay uno solo: la consola). Con SESIONES_DB se
+# guardan en SQLite y sobreviven a un reinicio.
+SESIONES = AlmacenSesiones(ruta_sqlite=os.getenv("SESIONES_DB"))
+SESION_ID = os.getenv("SESION_ID", "consola")
 
 # --- 2. SANITIZADOR ---
 def forzar_texto_plano(content):
@@ -51,100 +52,133 @@ def forzar_texto_plano(content):
         return clean.strip()
     return content
 
-# --- 3. CEREBRO LÓGICO (DICCIONARIO) ---
-def procesar_intencion_con_memoria(texto_usuario):
-    texto = texto_usuario.lower()
-    
-    # A. SALUDOS
-    saludos = ["hola", "buenas", "qué tal", "hello", "hi", "buenos días", "buenas noches"]
-    if any(texto.startswith(s) for s in saludos) or (len(texto.split()) < 4 and any(s in texto for s in saludos)):
-        return {
-            "tipo": "chat",
-            "respuesta": "¡Hola! Bienvenido. ¿Buscas ropa (remeras, jeans) o necesitas información del local?"
-        }
-
-    # B. HERRAMIENTAS INFORMATIVAS
-    if re.search(r'\b(hora|horarios?|abierto|cerrado|abren|cierran)\b', texto):
-        return { "tipo": "tool", "json": '{ "name": "get_opening_hours", "arguments": {} }' }
-    
-    if re.search(r'\b(ubicacion|donde|direccion|local|queda|calle)\b', texto):
-        return { "tipo": "tool", "json": '{ "name": "get_location", "arguments": {} }' }
-    
-    if re.search(r'\b(devolucion|cambio|politica|reembolso|devolver)\b', texto):
-        return { "tipo": "tool", "json": '{ "name": "get_return_policy", "arguments": {} }' }
-
-    # C. MAPEO DE PRODUCTOS (SOLUCIÓN AQUÍ)
-    # Agregamos plurales, singulares y versiones sin acento
-    mapa = {
-        # Remeras
-        "remera": "T-shirt", "remeras": "T-shirt", 
-        "camiseta": "T-shirt", "camisetas": "T-shirt", 
-        "chomba": "T-shirt", "chombas": "T-shirt",
-        
-        # Pantalones (Clave: 'pantalon' sin acento)
-        "pantalón": "Jeans", "pantalon": "Jeans", "pantalones": "Jeans",
-        "jeans": "Jeans", "jean": "Jeans", "vaquero": "Jeans", "vaqueros": "Jeans",
-        
-        # Abrigos
-        "campera": "Jacket", "camperas": "Jacket",
-        "chaqueta": "Jacket", "chaquetas": "Jacket",
-        "abrigo": "Coat", "abrigos": "Coat",
-        
-        # Otros
-        "vestido": "Dress", "vestidos": "Dress"
-    }
-    
-    # Buscamos coincidencias
-    prod_encontrado = None
-    for k, v in mapa.items():
-        # Usamos regex con \b para asegurar que coincida la palabra exacta
-        if k in texto: 
-            prod_encontrado = v
-            break
-    
-    # D. MAPEO DE PRECIO
-    orden = "None"
-    if "caro" in texto or "cara" in texto: orden = "desc"
-    if "barato" in texto or "barata" in texto: orden = "asc"
-
-    # CASO 1: BÚSQUEDA
-    if prod_encontrado:
-        SESSION_CONTEXT["last_search_term"] = prod_encontrado
-        return {
-            "tipo": "tool",
-            "json": f"""{{ "name": "find_products", "arguments": {{ "search_term": "{prod_encontrado}", "sort_by_price": "{orden}" }} }}"""
-        }
-
-    # CASO 2: REFINAMIENTO (Soloprecio, usa memoria)
-    if orden != "None" and SESSION_CONTEXT["last_search_term"]:
-        prod_memoria = SESSION_CONTEXT["last_search_term"]
-        return {
-            "tipo": "tool",
-            "json": f"""{{ "name": "find_products", "arguments": {{ "search_term": "{prod_memoria}", "sort_by_price": "{orden}" }} }}"""
-        }
-
-    # CASO 3: DESCONOCIDO
-    return {
-        "tipo": "chat",
-        "respuesta": "Disculpa, no entendí bien qué producto buscas. Prueba con: 'remeras', 'jeans'..."
-    }
+# --- 2b. REDACCIÓN EN STREAMING ---
+# Con STREAMING=1 (default) la respuesta se muestra a medida que el modelo la
+# genera, en vez de esperar la respuesta completa.
+STREAMING = os.getenv("STREAMING", "1") != "0"
+MIN_PREFIJO = 12          # caracteres para decidir si el comienzo es texto normal
+COLA = len("arguments")   # lo último recibido se retiene hasta confirmar que no es basura
+CLAVE_JSON = re.compile(r'"\w+":')       # '"name":' en medio del texto: desde ahí es basura
+CLAVE_INCOMPLETA = re.compile(r'"\w*"?$')  # el final podría ser el comienzo de una clave
+
+def redactar_en_streaming(modelo, mensajes, listado_historia):
+    """
+    Genera los fragmentos de la respuesta a medida que llegan del modelo,
+    aplicando el mismo criterio que forzar_texto_plano pero de a pedazos:
+    - Si el comienzo parece JSON, se acumula todo y se limpia al final.
+    - Si es texto normal, se emite enseguida (salvo una cola corta retenida).
+    - Si aparece '{', 'arguments' o una clave JSON ('"name":') más adelante, el
+      resto se acumula y se limpia.
+    Si lo que queda es basura (muy corto o con 'arguments'), se usa listado_historia.
+    """
+    pendiente = ""
+    emitido = False
+    modo = "decidiendo"  # -> "texto" | "acumulando"
+
+    for chunk in modelo.stream(mensajes):
+        pendiente += chunk.content if isinstance(chunk.content, str) else str(chunk.content)
+
+        if modo == "decidiendo":
+            inicio = pendiente.lstrip()
+            if inicio.startswith(("{", '"', "[")) or re.search(r'"\w+":', inicio):
+                modo = "acumulando"
+            elif len(inicio) >= MIN_PREFIJO:
+                modo = "texto"
+                pendiente = inicio
+
+        if modo == "texto":
+            clave = CLAVE_JSON.search(pendiente)
+            cortes = [i for i in (pendiente.find("{"), pendiente.find("arguments"), clave.start() if clave else -1)
+                      if i >= 0]
+            if cortes:
+                # Lo anterior al JSON ya es texto válido; desde ahí se acumula
+                corte = min(cortes)
+                if corte:
+                    emitido = True
+                    yield pendiente[:corte]
+                pendiente = pendiente[corte:]
+                modo = "acumulando"
+                continue
+            # Se retiene la cola y, si el final puede ser una clave a medio llegar, desde su comilla
+            limite = len(pendiente) - COLA
+            incompleta = CLAVE_INCOMPLETA.search(pendiente)
+            if incompleta:
+                limite = min(limite, incompleta.start())
+            listo, pendiente = pendiente[:max(limite, 0)], pendiente[max(limite, 0):]
+            if listo:
+                emitido = True
+                yield listo
+
+    if modo == "texto":
+        if pendiente:
+            yield pendiente
+        return
+
+    resto = forzar_texto_plano(pendiente)
+    if len(resto) < 5 or "arguments" in resto:
+        # Si ya se había mostrado algo, el listado va en un renglón aparte
+        yield ("\n" if emitido else "") + listado_historia
+    else:
+        yield resto
+
+# --- 2c. RESPUESTAS SIN LLM ---
+# Para las tools cuyo resultado el modelo solo copiaría, la respuesta sale de
+# una plantilla y no se llama al LLM. Las tools sin plantilla (o todas, con
+# RENDER_CON_LLM=1) se redactan con el modelo como antes.
+RENDER_CON_LLM = os.getenv("RENDER_CON_LLM", "0") == "1"
+PLANTILLAS = {
+    "find_products": "Estas son las opciones que encontré:\n{listado}",
+    "get_opening_hours": "{listado}",
+    "get_location": "{listado}",
+    "get_return_policy": "{listado}",
+    "get_available_filters": "Esto es lo que tengo disponible:\n{listado}",
+}
+SIN_RESULTADOS = "Lo siento, no encontré productos con esa descripción exacta en stock."
+ESTADISTICAS_RENDER = {"plantilla": 0, "llm": 0}
+
+def armar_listado(res):
+    """Texto con el resultado de la tool (el que se guarda en la sesión)."""
+    if isinstance(res, dict) and "productos" in res:
+        productos = res['productos']
+        if not productos:
+            return SIN_RESULTADOS
+        return "".join(f"• {p['nombre']} -> ${p['precio']}\n" for p in productos)
+    if isinstance(res, dict) and "colores" in res:
+        return "".join(f"• {titulo}: " + ", ".join(f"{valor} ({n})" for valor, n in res[clave].items()) + "\n"
+                       for clave, titulo in (("colores", "Colores"), ("talles", "Talles"), ("categorias", "Categorías"))
+                       if res.get(clave))
+    if isinstance(res, dict) and res.get("status") == "No encontrado":
+        return SIN_RESULTADOS
+    return str(res)
+
+def respuesta_por_plantilla(tool_name, listado_historia):
+    """Respuesta final sin pasar por el LLM, o None si hace falta redactarla."""
+    plantilla = PLANTILLAS.get(tool_name)
+    if RENDER_CON_LLM or plantilla is None:
+        return None
+    if listado_historia == SIN_RESULTADOS:
+        return listado_historia
+    return plantilla.format(listado=listado_historia.strip())
+
+# --- 3. CEREBRO LÓGICO ---
+# El router (intenciones y sinónimos en data/intenciones.json) está en src/intenciones.py
 
 # --- BUCLE PRINCIPAL ---
 
 print("--- SISTEMA LISTO ---")
-chat_history = []
 
 while True:
+    sesion = SESIONES.obtener(SESION_ID)
     try:
         user_input = input("\nTú: ")
         if user_input.lower() == "salir": break
 
-        decision = procesar_intencion_con_memoria(user_input)
+        decision = procesar_intencion_con_memoria(user_input, sesion)
         
         if decision["tipo"] == "chat":
             print(f"Bot: {decision['respuesta']}")
-            chat_history.append(HumanMessage(content=user_input))
-            chat_history.append(AIMessage(content=decision['respuesta']))
+            sesion["historial"].append(["usuario", user_input])
+            sesion["historial"].append(["bot", decision['respuesta']])
             continue 
 
         json_comando = decision["json"]
@@ -160,26 +194,22 @@ while True:
         elif tool_name == "get_opening_hours": func_to_call = get_opening_hours
         elif tool_name == "get_location": func_to_call = get_location
         elif tool_name == "get_return_policy": func_to_call = get_return_policy
-        
-        listado_historia = ""
+        elif tool_name == "get_available_filters": func_to_call = get_available_filters
         
         if func_to_call:
-            res = func_to_call.invoke(args)
-            
-            if isinstance(res, dict) and "productos" in res:
-                productos = res['productos']
-                if not productos:
-                    listado_historia = "Lo siento, no encontré productos con esa descripción exacta en stock."
-                else:
-                    for p in productos:
-                        listado_historia += f"• {p['nombre']} -> ${p['precio']}\n"
-            else:
-                listado_historia = str(res)
+            listado_historia = armar_listado(func_to_call.invoke(args))
         else:
             listado_historia = "Error: Herramienta no encontrada."
 
-        SESSION_CONTEXT["last_product_list"] = listado_historia
+        sesion["last_product_list"] = listado_historia
 
+        texto_final = respuesta_por_plantilla(tool_name, listado_historia)
+        if texto_final is not None:
+            ESTADISTICAS_RENDER["plantilla"] += 1
+            print(f"Bot: {texto_final}")
+            continue
+
+        ESTADISTICAS_RENDER["llm"] += 1
         print("✅ Datos obtenidos. Redactando...")
         
         ctx_limpio = [
@@ -188,14 +218,27 @@ while True:
             SystemMessage(content=f"RESULTADOS DE LA BÚSQUEDA:\n{listado_historia}\n\nINSTRUCCIÓN: Si hay una lista, copiala tal cual. Si hay error, dilo en español. NO uses JSON.")
         ]
         
-        final_res = llm.invoke(ctx_limpio)
-        texto_final = forzar_texto_plano(final_res.content)
-        
-        if len(texto_final) < 5 or "arguments" in texto_final:
-            texto_final = listado_historia
+        if STREAMING:
+            print("Bot: ", end="", flush=True)
+            for fragmento in redactar_en_streaming(llm, ctx_limpio, listado_historia):
+                print(fragmento, end="", flush=True)
+            print()
+        else:
+            final_res = llm.invoke(ctx_limpio)
+            texto_final = forzar_texto_plano(final_res.content)
+            
+            if len(texto_final) < 5 or "arguments" in texto_final:
+                texto_final = listado_historia
 
-        print(f"Bot: {texto_final}")
+            print(f"Bot: {texto_final}")
         
     except Exception as e:
         print(f"❌ Error: {e}")
-        SESSION_CONTEXT["last_search_term"] = None
\ No newline at end of file
+        sesion["last_search_term"] = None
+
+    finally:
+        SESIONES.guardar(SESION_ID, sesion)
+
+total_render = ESTADISTICAS_RENDER["plantilla"] + ESTADISTICAS_RENDER["llm"]
+if total_render:
+    print(f"📊 Llamadas al LLM evitadas: {ESTADISTICAS_RENDER['plantilla']} de {total_render} respuestas.")
\ No newline at end of file
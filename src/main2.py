@@ -1,13 +1,19 @@
 import json
 import os
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_ollama import ChatOllama
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from clasificador import ClasificadorTools
+from llamada_tool import esquema_llamadas, leer_llamada
 from tools import (
+    recordar_busqueda,
+    sesion_actual,
     search_products,
     refine_products,
+    available_filters,
     get_product_by_sku,
     get_similar_products,
     recommend_products,
@@ -23,11 +29,67 @@ from tools import (
 MODEL_NAME = os.getenv("MODELO", "prueba")
 print(f"🤖 Usando modelo afinado: {MODEL_NAME}")
 
+# Con SALIDA_ESTRUCTURADA=1 (default) Ollama restringe la generación al JSON
+# Schema de las tools: el modelo no puede escribir texto suelto ni un JSON roto.
+# La charla normal sale igual, como llamada a chat_response.
+SALIDA_ESTRUCTURADA = os.getenv("SALIDA_ESTRUCTURADA", "1") != "0"
+ESQUEMA_TOOLS = esquema_llamadas([
+    search_products, refine_products, available_filters, get_product_by_sku, get_similar_products,
+    recommend_products, summarize_product, business_info, chat_response,
+])
+
 llm = ChatOllama(
     model=MODEL_NAME,
-    temperature=0.0  # CRÍTICO para que no rompa el JSON
+    temperature=0.0,  # CRÍTICO para que no rompa el JSON
+    format=ESQUEMA_TOOLS if SALIDA_ESTRUCTURADA else None,
 )
 
+# La sesión del usuario: refine_products trabaja sobre su última búsqueda
+SESION_ID = os.getenv("SESION_ID", "consola")
+sesion_actual.set(SESION_ID)
+
+# =========================
+# CLASIFICADOR LOCAL
+# =========================
+# Elige la tool sin llamar al LLM cuando la predicción es confiable.
+# Con CLASIFICADOR=0 todo pasa por el modelo como antes.
+
+USAR_CLASIFICADOR = os.getenv("CLASIFICADOR", "1") != "0"
+TOOLS_DISPONIBLES = {
+    "search_products", "refine_products", "available_filters", "get_product_by_sku", "get_similar_products",
+    "recommend_products", "summarize_product", "business_info", "chat_response",
+}
+clasificador = ClasificadorTools.desde_datasets(tools_validas=TOOLS_DISPONIBLES) if USAR_CLASIFICADOR else None
+
+# ruta -> [mensajes, segundos acumulados]
+METRICAS_RUTAS = {"clasificador": [0, 0.0], "llm": [0, 0.0]}
+# Tools adelantadas mientras el LLM decide (ver EJECUCIÓN ESPECULATIVA)
+METRICAS_ESPECULACION = {"intentos": 0, "aciertos": 0, "ms_ahorrados": 0.0}
+# Tokens que el LLM generó hasta que se cerró el JSON de la tool (ver leer_llamada)
+METRICAS_STREAMING = {"llamadas": 0, "fragmentos": 0}
+
+
+def registrar_ruta(ruta, inicio):
+    METRICAS_RUTAS[ruta][0] += 1
+    METRICAS_RUTAS[ruta][1] += time.perf_counter() - inicio
+
+
+def mostrar_metricas():
+    total = sum(n for n, _ in METRICAS_RUTAS.values())
+    if not total:
+        return
+    for ruta, (n, segundos) in METRICAS_RUTAS.items():
+        if n:
+            print(f"📊 {ruta}: {n} mensajes, {segundos / n * 1000:.1f} ms promedio")
+    print(f"📊 Sin pasar por el LLM: {METRICAS_RUTAS['clasificador'][0] / total:.0%}")
+    intentos = METRICAS_ESPECULACION["intentos"]
+    if intentos:
+        print(f"📊 Especulación: {METRICAS_ESPECULACION['aciertos']}/{intentos} aciertos, "
+              f"{METRICAS_ESPECULACION['ms_ahorrados']:.0f} ms ahorrados")
+    llamadas = METRICAS_STREAMING["llamadas"]
+    if llamadas:
+        print(f"📊 Streaming: {METRICAS_STREAMING['fragmentos'] / llamadas:.1f} tokens leídos por llamada a tool")
+
 print("✅ Sistema listo\n")
 
 # =========================
@@ -49,6 +111,7 @@ Formato OBLIGATORIO:
 Tools disponibles:
 - search_products(query)
 - refine_products(color?, talle?, max_precio?, sort_by_price?)
+- available_filters()
 - get_product_by_sku(sku)
 - get_similar_products(sku)
 - recommend_products()
@@ -73,6 +136,9 @@ def ejecutar_tool(name, args):
     if name == "refine_products":
         return refine_products.invoke(args)
 
+    if name == "available_filters":
+        return available_filters.invoke({})
+
     if name == "get_product_by_sku":
         return get_product_by_sku.invoke(args)
 
@@ -93,6 +159,67 @@ def ejecutar_tool(name, args):
 
     return "Tool no reconocida"
 
+# =========================
+# EJECUCIÓN ESPECULATIVA
+# =========================
+# Mientras el LLM decide, la mejor apuesta del clasificador ya se ejecuta en
+# otro hilo. Si el modelo elige la misma tool con los mismos argumentos se usa
+# ese resultado; si no, se descarta. Solo se adelantan las tools de
+# TOOLS_ESPECULABLES, que no cambian ningún estado: recommend_products mueve la
+# rotación, get_similar_products cuenta consultas y SKUs calientes, y
+# refine_products/available_filters dependen de la sesión, que el hilo
+# especulativo no tiene (ver tools.sesion_actual). Así una ejecución descartada
+# no deja rastro. ESPECULAR=0 lo desactiva.
+
+ESPECULAR = os.getenv("ESPECULAR", "1") != "0"
+TOOLS_ESPECULABLES = frozenset({
+    "search_products", "get_product_by_sku", "summarize_product", "business_info", "chat_response",
+})
+pool_especulacion = ThreadPoolExecutor(max_workers=1, thread_name_prefix="especulacion")
+
+
+def ejecutar_medido(name, args):
+    inicio = time.perf_counter()
+    resultado = ejecutar_tool(name, args)
+    return resultado, time.perf_counter() - inicio
+
+
+def iniciar_especulacion(texto):
+    """Lanza la tool que adivina el clasificador; devuelve ((tool, args), futuro) o None."""
+    if not (ESPECULAR and clasificador):
+        return None
+    apuesta = clasificador.decidir(texto, especulativo=True)
+    if apuesta is None or apuesta[0] not in TOOLS_ESPECULABLES:
+        return None
+    METRICAS_ESPECULACION["intentos"] += 1
+    return apuesta, pool_especulacion.submit(ejecutar_medido, *apuesta)
+
+
+def mismos_argumentos(a, b):
+    """Compara argumentos ignorando los None (equivalen a no pasarlos)."""
+    limpiar = lambda args: json.dumps({k: v for k, v in (args or {}).items() if v is not None}, sort_keys=True)
+    return limpiar(a) == limpiar(b)
+
+
+def resultado_especulado(especulacion, name, args):
+    """El resultado adelantado si coincide con lo que eligió el LLM; si no, None."""
+    if especulacion is None:
+        return None
+    (tool, args_apuesta), futuro = especulacion
+    if tool != name or not mismos_argumentos(args_apuesta, args):
+        futuro.cancel()
+        return None
+
+    inicio_espera = time.perf_counter()
+    resultado, duracion = futuro.result()
+    # En el hilo especulativo no hay sesión: la búsqueda se registra recién ahora
+    if name == "search_products":
+        recordar_busqueda(args.get("query", ""))
+    espera = time.perf_counter() - inicio_espera
+    METRICAS_ESPECULACION["aciertos"] += 1
+    METRICAS_ESPECULACION["ms_ahorrados"] += max(duracion - espera, 0.0) * 1000
+    return resultado
+
 # =========================
 # FORMATEO RESULTADOS
 # =========================
@@ -131,29 +258,44 @@ while True:
     if user_input.lower() == "salir":
         break
 
+    inicio = time.perf_counter()
+    decision = clasificador.decidir(user_input) if clasificador else None
+    if decision is not None:
+        tool_name, args = decision
+        print(f"⚡ Tool elegida (clasificador local): {tool_name} {args}")
+        mostrar_resultado(ejecutar_tool(tool_name, args))
+        registrar_ruta("clasificador", inicio)
+        continue
+
     messages = [
         SystemMessage(content=SYSTEM_PROMPT),
         HumanMessage(content=user_input)
     ]
 
-    response = llm.invoke(messages)
-    content = response.content.strip()
+    especulacion = iniciar_especulacion(user_input)
+    # Se lee en streaming y se corta apenas se cierra el JSON de la tool
+    content, data, fragmentos = leer_llamada(llm, messages)
 
     try:
-        # Intentar extraer JSON
-        match = re.search(r"\{.*\}", content, re.DOTALL)
-        if not match:
+        if data is None:
             raise ValueError("No JSON")
 
-        data = json.loads(match.group(0))
+        METRICAS_STREAMING["llamadas"] += 1
+        METRICAS_STREAMING["fragmentos"] += fragmentos
         tool_name = data.get("name")
         args = data.get("arguments", {})
 
         print(f"🛠️ Tool elegida: {tool_name} {args}")
 
-        resultado = ejecutar_tool(tool_name, args)
+        resultado = resultado_especulado(especulacion, tool_name, args)
+        if resultado is None:
+            resultado = ejecutar_tool(tool_name, args)
         mostrar_resultado(resultado)
 
     except Exception:
         # No era JSON → charla normal
         print(f"Bot: {content}")
+
+    registrar_ruta("llm", inicio)
+
+mostrar_metricas()
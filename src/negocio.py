@@ -1,97 +1,1227 @@
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import threading
+import time
+from array import array
+from itertools import chain
+
+import numpy as np
 import pandas as pd
 import re
+from cachetools import TTLCache
 from langchain_core.tools import tool
 
-# Variable global para el DataFrame
+try:
+    from src.intenciones import ROUTER, plegar
+except ImportError:
+    from intenciones import ROUTER, plegar
+
+# Catálogo publicado (tabla + índices). Se reemplaza entero al recargar. Es el
+# mismo para negocio.py y tools.py, y se carga con la primera consulta (ver
+# catalogo_actual): importar este módulo no lee nada del disco.
+catalogo = None
+# Variable global para la tabla (atajo a catalogo.db)
 db = None
 
-def cargar_base_de_datos():
-    """Carga el CSV en un DataFrame de Pandas y prepara los datos."""
-    global db
-    try:
-        df = pd.read_csv("products_asos.csv")
-        # Renombrar columnas para estandarizar
-        df = df.rename(columns={"nombre": "name", "precio": "price", "talle": "size", "color": "color_col"})
-        
-        # 1. Limpieza de Texto
-        df['name'] = df['name'].fillna('').astype(str)
-        df['size'] = df['size'].fillna('').astype(str)
-        
-        # 2. Limpieza de Precio (CRÍTICO para ordenar bien)
-        def limpiar_precio(val):
+# Un token es una corrida máxima de letras/dígitos
+PATRON_TOKEN = re.compile(r"[^\W_]+")
+
+
+# --- TABLA COMPACTA DEL CATÁLOGO ---
+# Los textos no se guardan como un str de Python por fila (con ~50 bytes de
+# overhead cada uno): cada columna es un array de códigos enteros sobre sus
+# valores distintos, y esos valores van todos juntos en un buffer UTF-8. El
+# precio es float64: float32 ya no distingue los centavos por encima de
+# 131.072. Las consultas trabajan con posiciones de filas y arman dicts solo
+# para lo que devuelven.
+
+class ColumnaTexto:
+    """
+    Columna de texto codificada con diccionario:
+    - codigos: un entero por fila (el dtype más chico que alcance).
+    - buffer / cortes: el valor distinto c es buffer[cortes[c]:cortes[c + 1]] en UTF-8.
+    """
+
+    def __init__(self, codigos, buffer, cortes):
+        self.codigos = codigos
+        self.buffer = buffer
+        self.cortes = cortes
+
+    @classmethod
+    def desde_distintos(cls, codigos, distintos):
+        """A partir de los códigos por fila y la lista de valores distintos."""
+        codificados = [str(v).encode("utf-8") for v in distintos]
+        cortes = np.zeros(len(codificados) + 1, dtype=np.int64)
+        cortes[1:] = np.cumsum(np.fromiter(map(len, codificados), dtype=np.int64, count=len(codificados)))
+        buffer = np.frombuffer(b"".join(codificados), dtype=np.uint8)
+        tipo = np.min_scalar_type(max(len(codificados) - 1, 0))
+        return cls(np.asarray(codigos).astype(tipo, copy=False), buffer, cortes)
+
+    @classmethod
+    def desde_valores(cls, valores):
+        if isinstance(valores, ColumnaTexto):
+            return valores
+        return cls.desde_distintos(*pd.factorize(pd.Series(valores, dtype=object).fillna("")))
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def _valor(self, codigo):
+        return self.buffer[self.cortes[codigo]:self.cortes[codigo + 1]].tobytes().decode("utf-8")
+
+    def distintos(self):
+        """Los valores distintos decodificados, en orden de código."""
+        datos = self.buffer.tobytes()
+        return [datos[a:b].decode("utf-8") for a, b in zip(self.cortes[:-1].tolist(), self.cortes[1:].tolist())]
+
+    def __getitem__(self, filas):
+        """El texto de una fila, o un array de textos (objetos) para un array de filas."""
+        if np.isscalar(filas):
+            return self._valor(self.codigos[filas])
+        unicos, inversa = np.unique(self.codigos[filas], return_inverse=True)
+        valores = np.empty(len(unicos), dtype=object)
+        valores[:] = [self._valor(c) for c in unicos]
+        return valores[inversa]
+
+    def mapear(self, funcion):
+        """Otra columna con `funcion` aplicada a cada valor distinto (comparte los códigos)."""
+        return ColumnaTexto.desde_distintos(self.codigos, [funcion(v) for v in self.distintos()])
+
+    @property
+    def nbytes(self):
+        return self.codigos.nbytes + self.buffer.nbytes + self.cortes.nbytes
+
+
+def factorizar(valores):
+    """(códigos, valores distintos) de una columna; una ColumnaTexto ya viene factorizada."""
+    if isinstance(valores, ColumnaTexto):
+        return valores.codigos, valores.distintos()
+    return pd.factorize(pd.Series(valores, dtype=object).fillna(""))
+
+
+class CodificadorTexto:
+    """
+    Arma una ColumnaTexto bloque a bloque con un único diccionario que crece:
+    los valores nuevos de cada bloque pasan a bytes UTF-8 (buffer + cortes) y
+    las filas a códigos apenas llega el bloque, así no queda ningún objeto de
+    Python de los bloques anteriores. Los valores ya vistos se buscan por su
+    hash de 64 bits (ordenados, con searchsorted) y se confirman comparando
+    los bytes.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.cortes = array('q', [0])
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.codigo_de_hash = np.empty(0, dtype=np.int64)
+        self.codigos = []
+
+    def agregar(self, valores):
+        """Codifica un bloque de valores (texto)."""
+        codigos_bloque, distintos = pd.factorize(pd.Series(valores, dtype=object).fillna(""))
+        distintos = np.asarray(distintos, dtype=object)
+        hashes = pd.util.hash_array(distintos)
+        codigos = np.empty(len(distintos), dtype=np.int64)
+
+        nuevos = np.ones(len(distintos), dtype=bool)
+        if len(self.hashes):
+            posiciones = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+            for i in np.flatnonzero(self.hashes[posiciones] == hashes).tolist():
+                c = int(self.codigo_de_hash[posiciones[i]])
+                # Ante una colisión de hash el valor entra como nuevo
+                if self.buffer[self.cortes[c]:self.cortes[c + 1]] == str(distintos[i]).encode("utf-8"):
+                    codigos[i] = c
+                    nuevos[i] = False
+
+        indices = np.flatnonzero(nuevos)
+        primero = len(self.cortes) - 1
+        for i in indices.tolist():
+            self.buffer += str(distintos[i]).encode("utf-8")
+            self.cortes.append(len(self.buffer))
+        codigos[indices] = np.arange(primero, primero + len(indices))
+
+        # Al índice de hashes entran los nuevos cuyo hash no estaba
+        libres = indices[~np.isin(hashes[indices], self.hashes)]
+        libres = libres[np.unique(hashes[libres], return_index=True)[1]]
+        posiciones = np.searchsorted(self.hashes, hashes[libres])
+        self.hashes = np.insert(self.hashes, posiciones, hashes[libres])
+        self.codigo_de_hash = np.insert(self.codigo_de_hash, posiciones, codigos[libres])
+        self.codigos.append(codigos[codigos_bloque].astype(np.int32))
+
+    def columna(self, n=None):
+        """La ColumnaTexto armada (con `n` filas vacías si no llegó ningún bloque)."""
+        if not self.codigos:
+            return ColumnaTexto.desde_distintos(np.zeros(n or 0, dtype=np.int64), [""])
+        cortes = np.frombuffer(self.cortes, dtype=np.int64)
+        codigos = np.concatenate(self.codigos)
+        tipo = np.min_scalar_type(max(len(cortes) - 2, 0))
+        return ColumnaTexto(codigos.astype(tipo, copy=False), np.frombuffer(self.buffer, dtype=np.uint8), cortes)
+
+
+class TablaCompacta:
+    """
+    El catálogo en columnas: `precios` (float64) y una ColumnaTexto por cada
+    columna de texto (name, size, color_col, category, sku, description). Se lee por posiciones
+    de filas y ninguna consulta copia la tabla.
+
+    Memoria por producto, con SKU, descripción y los nombres en minúsculas del
+    índice incluidos (benchmarks/bench_memoria.py): ~137 bytes con nombres
+    únicos, como en el CSV real, contra ~394 del DataFrame de objetos; ~44
+    contra ~320 cuando los nombres se repiten.
+    """
+
+    def __init__(self, precios, textos):
+        self.precios = precios
+        self.textos = textos
+        self.columns = ['name', 'price'] + [c for c in textos if c != 'name']
+
+    @classmethod
+    def desde_df(cls, df):
+        return cls(df['price'].to_numpy(dtype=np.float64),
+                   {c: ColumnaTexto.desde_valores(df[c].to_numpy(dtype=object)) for c in df.columns if c != 'price'})
+
+    def __len__(self):
+        return len(self.precios)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __contains__(self, columna):
+        return columna == 'price' or columna in self.textos
+
+    def __getitem__(self, columna):
+        return self.precios if columna == 'price' else self.textos[columna]
+
+    def filas(self, filas):
+        """Las filas pedidas como dicts, con el precio redondeado a 2 decimales."""
+        filas = np.asarray(filas, dtype=np.int64)
+        textos = {c: columna[filas] for c, columna in self.textos.items()}
+        precios = np.round(self.precios[filas], 2).tolist()
+        return [dict({c: valores[i] for c, valores in textos.items()}, price=precio)
+                for i, precio in enumerate(precios)]
+
+    @property
+    def nbytes(self):
+        return self.precios.nbytes + sum(columna.nbytes for columna in self.textos.values())
+
+
+def tokens_por_fila(textos, tokenizar=PATRON_TOKEN.findall):
+    """
+    Tokeniza una columna de texto: devuelve (filas, codigos, vocabulario), una
+    entrada por token de cada fila, con `vocabulario[codigos[i]]` el token.
+    Cada texto distinto se tokeniza una sola vez (nombres y descripciones se repiten).
+    """
+    por_texto, unicos = factorizar(textos)
+    listas = [tokenizar(t) for t in unicos]
+    largos_texto = np.array([len(l) for l in listas], dtype=np.int64)
+    codigos_texto, vocabulario = pd.factorize(pd.Series(list(chain.from_iterable(listas)), dtype=object))
+
+    # Expande los tokens de cada texto distinto a todas las filas que lo usan
+    largos = largos_texto[por_texto]
+    inicio_texto = (np.cumsum(largos_texto) - largos_texto)[por_texto]
+    inicio_fila = np.cumsum(largos) - largos
+    posiciones = np.arange(largos.sum()) + np.repeat(inicio_texto - inicio_fila, largos)
+    filas = np.repeat(np.arange(len(por_texto)), largos)
+    return filas, codigos_texto[posiciones], list(vocabulario)
+
+
+class IndiceInvertido:
+    """
+    Índice token -> filas (posting lists ordenadas) sobre una columna de texto.
+
+    Responde búsquedas con la misma semántica que `str.lower().str.contains(...)`:
+    cada token de la consulta tiene que ser subcadena de algún token del texto,
+    así que la intersección de posting lists da un superconjunto de candidatos
+    que después se verifica con la subcadena exacta (solo sobre esos candidatos).
+    """
+
+    def __init__(self, textos, postings=None):
+        """
+        - textos: columna de texto original (valores o ColumnaTexto).
+        - postings: (vocabulario, filas, cortes) ya calculados, ej. leídos de un
+          snapshot; en ese caso `textos` tiene que ser una ColumnaTexto ya en minúsculas.
+        """
+        self._expansiones = {}
+        if postings is not None:
+            self.textos = textos
+            self.vocabulario, self.filas, self.cortes = postings
+        else:
+            self.textos = ColumnaTexto.desde_valores(textos).mapear(str.lower)
+            self.vocabulario, self.filas, self.cortes = self._armar_postings(self.textos)
+
+    @staticmethod
+    def _armar_postings(textos):
+        """Devuelve (vocabulario, filas, cortes): las posting lists concatenadas."""
+        filas, codigos, vocabulario = tokens_por_fila(textos)
+        if not len(filas):
+            return [], np.empty(0, dtype=np.int32), np.zeros(1, dtype=np.int64)
+
+        orden = np.lexsort((filas, codigos))
+        codigos, filas = codigos[orden], filas[orden]
+        # Un mismo token repetido en un nombre cuenta una sola vez
+        unicos = np.ones(len(filas), dtype=bool)
+        unicos[1:] = (codigos[1:] != codigos[:-1]) | (filas[1:] != filas[:-1])
+        codigos, filas = codigos[unicos], filas[unicos]
+
+        cortes = np.concatenate(([0], np.flatnonzero(np.diff(codigos)) + 1, [len(filas)]))
+        return list(vocabulario), filas.astype(np.int32), cortes.astype(np.int64)
+
+    def __len__(self):
+        return len(self.textos)
+
+    def _filas_con_token(self, token):
+        """Unión de las posting lists de todo token del vocabulario que contiene `token`."""
+        # Se lee una sola vez: otro hilo puede vaciar el dict en cualquier momento
+        filas = self._expansiones.get(token)
+        if filas is None:
+            # Cada posting list es un tramo de `filas` (no se copia)
+            listas = [self.filas[self.cortes[i]:self.cortes[i + 1]]
+                      for i, t in enumerate(self.vocabulario) if token in t]
+            if not listas:
+                filas = np.empty(0, dtype=np.int64)
+            elif len(listas) == 1:
+                filas = listas[0]
+            else:
+                filas = np.unique(np.concatenate(listas))
+            if len(self._expansiones) >= 1024:
+                self._expansiones.clear()
+            self._expansiones[token] = filas
+        return filas
+
+    def buscar(self, subcadena, filas=None):
+        """
+        Devuelve las filas (ordenadas) cuyo texto contiene `subcadena`.
+        - subcadena: texto ya en minúsculas.
+        - filas: si se pasa, restringe la búsqueda a esas filas (ordenadas).
+        """
+        candidatos = filas
+        # Los tokens largos son los más selectivos: van primero
+        for token in sorted(set(PATRON_TOKEN.findall(subcadena)), key=len, reverse=True):
+            posting = self._filas_con_token(token)
+            if candidatos is None:
+                candidatos = posting
+            elif len(posting) < 8 * len(candidatos):
+                candidatos = np.intersect1d(candidatos, posting, assume_unique=True)
+            # Si la posting es mucho más grande que los candidatos, la
+            # verificación final filtra más barato que la intersección
+            if len(candidatos) == 0:
+                return candidatos
+
+        if candidatos is None:
+            # Consulta sin tokens (ej: '-'): no queda otra que recorrer todo
+            candidatos = np.arange(len(self.textos), dtype=np.int64)
+
+        textos = self.textos[candidatos]
+        coincide = np.fromiter((subcadena in t for t in textos), dtype=bool, count=len(textos))
+        return candidatos[coincide]
+
+
+def top_k_por_precio(precios, k, ascendente=True):
+    """
+    Posiciones de los `k` precios más bajos (o más altos) en tiempo lineal.
+    Equivale a `sort_values(kind='stable').head(k)`: los empates se resuelven
+    por orden de aparición y los NaN van al final en ambos sentidos.
+    """
+    valores = np.asarray(precios)
+    if not np.issubdtype(valores.dtype, np.floating):
+        valores = valores.astype(np.float64)
+    if not ascendente:
+        valores = -valores
+    valores = np.where(np.isnan(valores), np.inf, valores)
+
+    if k < len(valores):
+        umbral = np.partition(valores, k - 1)[k - 1]
+        # Entran todos los empatados con el umbral; el lexsort decide cuáles quedan
+        candidatos = np.flatnonzero(valores <= umbral)
+    else:
+        candidatos = np.arange(len(valores))
+    orden = np.lexsort((candidatos, valores[candidatos]))
+    return candidatos[orden[:k]]
+
+
+def separar_talles(texto):
+    """'xs, S,uk  8' -> ['XS', 'S', 'UK 8']: talles de una fila (o de un pedido), normalizados."""
+    return [" ".join(t.split()).upper() for t in str(texto).split(",") if t.strip()]
+
+
+class TallesPorFila:
+    """
+    Los talles de cada fila como máscara de bits sobre el vocabulario de talles
+    del catálogo (una columna uint64 cada 64 talles distintos). Filtrar por
+    talle es un AND sobre un array de enteros, con coincidencia exacta: 'S' no
+    encuentra 'XS' ni 'XXS'.
+    """
+
+    def __init__(self, talles, calculado=None):
+        """
+        - talles: la columna de talles (valores o ColumnaTexto).
+        - calculado: (vocabulario, bits) ya armados, ej. leídos de un snapshot.
+        """
+        if calculado is not None:
+            vocabulario, self.bits = calculado
+            self.vocabulario = {t: i for i, t in enumerate(vocabulario)}
+            return
+        por_texto, textos = factorizar(talles)
+        listas = [separar_talles(t) for t in textos]
+        self.vocabulario = {t: i for i, t in enumerate(sorted(set(chain.from_iterable(listas))))}
+        palabras = max(1, -(-len(self.vocabulario) // 64))
+
+        mascaras = np.zeros((len(textos), palabras), dtype=np.uint64)
+        for fila, lista in enumerate(listas):
+            for talle in lista:
+                bit = self.vocabulario[talle]
+                mascaras[fila, bit // 64] |= np.uint64(1 << (bit % 64))
+        self.bits = mascaras[por_texto] if len(por_texto) else np.zeros((0, palabras), dtype=np.uint64)
+
+    def consulta(self, talle):
+        """Máscara del pedido (uno o varios talles separados por coma); None si ninguno existe."""
+        pedido = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for t in separar_talles(talle):
+            bit = self.vocabulario.get(t)
+            if bit is not None:
+                pedido[bit // 64] |= np.uint64(1 << (bit % 64))
+        return pedido if pedido.any() else None
+
+    def contiene(self, talle, filas=None):
+        """Booleano por fila (de `filas`, o de todo el catálogo): ¿tiene alguno de los talles pedidos?"""
+        bits = self.bits if filas is None else self.bits[filas]
+        pedido = self.consulta(talle)
+        if pedido is None:
+            return np.zeros(len(bits), dtype=bool)
+        # Casi siempre hay menos de 64 talles: una sola columna
+        usadas = np.flatnonzero(pedido)
+        resultado = (bits[:, usadas[0]] & pedido[usadas[0]]) != 0
+        for palabra in usadas[1:]:
+            resultado |= (bits[:, palabra] & pedido[palabra]) != 0
+        return resultado
+
+
+    def conteos(self, filas=None):
+        """{talle: cantidad de filas (de `filas`, o de todo el catálogo) que lo tienen}, de mayor a menor."""
+        bits = self.bits if filas is None else self.bits[filas]
+        cuenta = {talle: int(np.count_nonzero(bits[:, bit // 64] & np.uint64(1 << (bit % 64))))
+                  for talle, bit in self.vocabulario.items()}
+        return {t: n for t, n in sorted(cuenta.items(), key=lambda par: -par[1]) if n}
+
+
+# --- COLOR Y CATEGORÍA COMO CÓDIGOS ENTEROS ---
+# Colores que se reconocen en el nombre cuando el CSV no trae el color, y
+# sinónimos en español de los colores del catálogo (que están en inglés)
+COLORES_CONOCIDOS = ["black", "white", "blue", "red", "green", "grey", "beige", "pink", "navy",
+                     "brown", "khaki", "cream", "stone", "yellow", "purple", "orange", "burgundy",
+                     "camel", "tan", "silver", "gold", "multi"]
+SINONIMOS_COLOR = {
+    "negro": "black", "negra": "black", "blanco": "white", "blanca": "white", "azul": "blue",
+    "rojo": "red", "roja": "red", "verde": "green", "gris": "grey", "gray": "grey",
+    "rosa": "pink", "rosado": "pink", "rosada": "pink", "azul marino": "navy", "marron": "brown",
+    "caqui": "khaki", "crema": "cream", "amarillo": "yellow", "amarilla": "yellow",
+    "violeta": "purple", "morado": "purple", "naranja": "orange", "bordo": "burgundy",
+    "dorado": "gold", "plateado": "silver",
+}
+
+
+def plegar_valor(valor):
+    """' Coats  &  Jackets ' -> 'coats & jackets'."""
+    return " ".join(plegar(str(valor)).split())
+
+
+def normalizar_color(valor):
+    """'Negro' -> 'black', 'Gray' -> 'grey': plegado y con el nombre en inglés."""
+    color = plegar_valor(valor)
+    return SINONIMOS_COLOR.get(color, color)
+
+
+def inferir_colores(nombres, colores=COLORES_CONOCIDOS):
+    """
+    Color de cada producto según su nombre ('Jeans in black' -> 'black'): el
+    último token que sea uno de `colores` (o un sinónimo); '' si no hay ninguno.
+    """
+    nombres = pd.Series(nombres, dtype=object).fillna("").astype(str)
+    filas, codigos, vocabulario = tokens_por_fila(nombres, lambda t: PATRON_TOKEN.findall(plegar(t)))
+    conocidos = set(colores)
+    color_de_token = np.array([c if c in conocidos else "" for c in map(normalizar_color, vocabulario)] + [""],
+                              dtype=object)
+    con_color = color_de_token[codigos] != ""
+    filas, codigos = filas[con_color], codigos[con_color]
+
+    resultado = np.full(len(nombres), "", dtype=object)
+    # Los tokens de cada fila vienen en orden: se queda el último de cada una
+    ultimos = len(filas) - 1 - np.unique(filas[::-1], return_index=True)[1]
+    resultado[filas[ultimos]] = color_de_token[codigos[ultimos]]
+    return resultado
+
+
+def completar_colores(colores, nombres):
+    """La columna de color con los vacíos deducidos del nombre (toda, si `colores` es None)."""
+    if colores is None:
+        return inferir_colores(nombres)
+    colores = pd.Series(colores, dtype=object).fillna("").astype(str)
+    vacios = np.flatnonzero(colores.str.strip().to_numpy() == "")
+    colores = colores.to_numpy()
+    if len(vacios):
+        # Además de los conocidos, cualquier color que ya figure en el catálogo
+        presentes = {normalizar_color(c) for c in pd.unique(colores) if c.strip()}
+        colores[vacios] = inferir_colores(np.asarray(nombres, dtype=object)[vacios],
+                                          presentes | set(COLORES_CONOCIDOS))
+    return colores
+
+
+class CodigosCategoricos:
+    """
+    Una columna de texto (color, categoría) como códigos enteros sobre sus
+    valores normalizados: filtrar es comparar enteros y contar, un bincount.
+    - codigos: int32 por fila, -1 si la fila no tiene valor.
+    - etiquetas: el texto de cada código, tal como aparece primero en el catálogo.
+    """
+
+    def __init__(self, valores, normalizar=plegar_valor, calculado=None):
+        """
+        - valores: la columna (valores o ColumnaTexto).
+        - calculado: (codigos, etiquetas) ya armados, ej. leídos de un snapshot.
+        """
+        self.normalizar = normalizar
+        if calculado is not None:
+            self.codigos, etiquetas = calculado
+            self.etiquetas = list(etiquetas)
+            self.codigo_de = {normalizar(e): i for i, e in enumerate(self.etiquetas)}
+            return
+        por_texto, textos = factorizar(valores)
+        self.codigo_de = {}
+        self.etiquetas = []
+        codigo_texto = np.empty(len(textos), dtype=np.int32)
+        for i, texto in enumerate(textos):
+            clave = normalizar(texto) if str(texto).strip() else ""
+            if not clave:
+                codigo_texto[i] = -1
+                continue
+            if clave not in self.codigo_de:
+                self.codigo_de[clave] = len(self.etiquetas)
+                self.etiquetas.append(str(texto).strip())
+            codigo_texto[i] = self.codigo_de[clave]
+        self.codigos = codigo_texto[por_texto]
+
+    def codigo(self, valor):
+        """Código de `valor` (normalizado), o None si no está en el catálogo."""
+        return self.codigo_de.get(self.normalizar(valor))
+
+    def coincide(self, valor, filas=None):
+        """Booleano por fila (de `filas`, o de todo el catálogo); None si el valor no está en el catálogo."""
+        codigo = self.codigo(valor)
+        if codigo is None:
+            return None
+        codigos = self.codigos if filas is None else self.codigos[filas]
+        return codigos == codigo
+
+    def conteos(self, filas=None):
+        """{etiqueta: cantidad de filas (de `filas`, o de todo el catálogo)}, de mayor a menor."""
+        codigos = self.codigos if filas is None else self.codigos[filas]
+        cuenta = np.bincount(codigos[codigos >= 0], minlength=len(self.etiquetas))
+        orden = np.argsort(-cuenta, kind="stable")
+        return {self.etiquetas[c]: int(cuenta[c]) for c in orden if cuenta[c]}
+
+
+# --- SKU Y PRECIOS POR CATEGORÍA (para las tools de tools.py) ---
+# Se arman una vez por carga y van en el snapshot: un worker que lo adjunta los
+# busca con searchsorted sobre el mmap, sin armar dicts ni listas propios.
+
+def hash_sku(clave):
+    """Hash de 64 bits (blake2b) de un SKU: el mismo en cualquier proceso."""
+    return int.from_bytes(hashlib.blake2b(clave.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class IndiceSKU:
+    """
+    SKU -> fila: el hash de 64 bits de cada SKU (sin espacios) ordenado, con su
+    primera fila al lado. Se busca el hash con searchsorted y se confirma
+    comparando el SKU de la fila; ante SKUs repetidos gana la primera fila.
+    """
+
+    def __init__(self, skus, calculado=None):
+        """
+        - skus: la columna de SKUs (ColumnaTexto).
+        - calculado: (hashes, filas) ya armados, ej. leídos de un snapshot.
+        """
+        self.skus = skus
+        if calculado is not None:
+            self.hashes, self.filas = calculado
+            return
+        codigos, primeras = np.unique(skus.codigos, return_index=True)
+        distintos = skus.distintos()
+        hashes = np.fromiter((hash_sku(distintos[c].strip()) for c in codigos.tolist()),
+                             dtype=np.uint64, count=len(codigos))
+        orden = np.lexsort((primeras, hashes))
+        self.hashes, self.filas = hashes[orden], primeras[orden].astype(np.int64)
+
+    def fila(self, clave):
+        """Posición de la primera fila con SKU `clave` (ya normalizado), o None."""
+        h = np.uint64(hash_sku(clave))
+        i = int(np.searchsorted(self.hashes, h))
+        while i < len(self.hashes) and self.hashes[i] == h:
+            fila = int(self.filas[i])
+            if self.skus[fila].strip() == clave:
+                return fila
+            i += 1
+        return None
+
+
+class PreciosPorCategoria:
+    """
+    Las filas con precio ordenadas por categoría, precio y fila: las de la
+    categoría c son filas[cortes[c]:cortes[c + 1]], con sus precios (ordenados)
+    en precios[cortes[c]:cortes[c + 1]].
+    """
+
+    def __init__(self, codigos, precios, calculado=None):
+        """
+        - codigos: la categoría de cada fila, como enteros (ej. los códigos de la
+          ColumnaTexto) o valores que se factorizan; los negativos no cuentan.
+        - calculado: (filas, precios, cortes) ya armados, ej. leídos de un snapshot.
+        """
+        codigos = np.asarray(codigos)
+        if codigos.dtype.kind not in "iu":
+            codigos = pd.factorize(pd.Series(codigos))[0]
+        self.codigos = codigos
+        if calculado is not None:
+            self.filas, self.precios, self.cortes = calculado
+            return
+        precios = np.asarray(precios, dtype=np.float64)
+        validas = np.flatnonzero((codigos >= 0) & ~np.isnan(precios))
+        self.filas = validas[np.lexsort((validas, precios[validas], codigos[validas]))]
+        self.precios = precios[self.filas]
+        total = int(codigos.max()) + 1 if len(codigos) else 0
+        self.cortes = np.searchsorted(codigos[self.filas], np.arange(total + 1))
+
+    def __len__(self):
+        return len(self.cortes) - 1
+
+    def tramo(self, c):
+        """(precios, filas) de la categoría `c`, en orden de precio."""
+        desde, hasta = self.cortes[c], self.cortes[c + 1]
+        return self.precios[desde:hasta], self.filas[desde:hasta]
+
+
+# --- CACHÉ DE RESULTADOS DE LAS TOOLS ---
+# El router manda una y otra vez los mismos pocos términos ('T-shirt', 'Jeans'...),
+# así que las consultas al catálogo se guardan en un LRU con vencimiento (TTL).
+# La clave lleva la generación del catálogo: al recargarlo, lo viejo ya no se usa.
+CACHE_MAX = int(os.getenv("CACHE_MAX", "1024"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+
+_cache = TTLCache(maxsize=CACHE_MAX, ttl=CACHE_TTL)
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+generacion_catalogo = 0
+
+
+def normalizar_texto(valor):
+    """Filtros que la tool usa como `valor.lower().strip()` y solo si no son vacíos."""
+    if isinstance(valor, str):
+        valor = valor.lower().strip()
+    return valor or None
+
+
+def normalizar_orden(valor):
+    """sort_by_price: 'asc' es ascendente, cualquier otro valor no vacío es descendente."""
+    if not valor:
+        return None
+    return 'asc' if str(valor).lower() == 'asc' else 'desc'
+
+
+def cachear_consulta(**normalizadores):
+    """
+    Decorador que cachea el resultado de una tool de catálogo.
+    Cada argumento se normaliza con la función indicada en `normalizadores`
+    (los demás se usan tal cual), de modo que dos llamadas que la tool resuelve
+    igual comparten la misma entrada. Va debajo de `@tool`.
+    """
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            ligados = firma.bind(*args, **kwargs)
+            ligados.apply_defaults()
+            clave = (funcion.__name__, generacion_catalogo) + tuple(
+                (nombre, normalizadores.get(nombre, lambda v: v)(valor))
+                for nombre, valor in ligados.arguments.items()
+            )
             try:
-                if isinstance(val, str):
-                    val = val.replace('$', '').replace(',', '').strip()
-                    match = re.search(r"(\d+\.?\d*)", val)
-                    if match:
-                        return float(match.group(1))
-                return float(val)
-            except:
-                return 0.0
-
-        df['price'] = df['price'].apply(limpiar_precio)
-
-        db = df
-        print(f"Base de datos cargada con {len(db)} productos.")
-        
+                with _cache_lock:
+                    resultado = _cache[clave]
+                    _cache_stats["hits"] += 1
+                return copy.deepcopy(resultado)
+            except KeyError:
+                pass
+            except TypeError:
+                # Argumento no hasheable: no se cachea
+                return funcion(*args, **kwargs)
+
+            resultado = funcion(*args, **kwargs)
+            with _cache_lock:
+                _cache_stats["misses"] += 1
+                _cache[clave] = copy.deepcopy(resultado)
+            return resultado
+        return envoltura
+    return decorador
+
+
+def invalidar_cache():
+    """Vacía la caché y pasa a una nueva generación de catálogo."""
+    global generacion_catalogo
+    with _cache_lock:
+        generacion_catalogo += 1
+        _cache.clear()
+
+
+def estadisticas_cache():
+    """Contadores de la caché: hits, misses, entradas y tasa de aciertos."""
+    with _cache_lock:
+        total = _cache_stats["hits"] + _cache_stats["misses"]
+        return dict(_cache_stats, entradas=len(_cache),
+                    tasa_aciertos=_cache_stats["hits"] / total if total else 0.0)
+
+
+# --- SNAPSHOT BINARIO DEL CATÁLOGO ---
+# Al lado del CSV se guarda una carpeta `<csv>.snapshot/` con la tabla compacta
+# (precio y cada ColumnaTexto en .npy) y el índice invertido. Si el CSV no
+# cambió, el arranque se saltea el parseo y las columnas se abren con mmap.
+VERSION_SNAPSHOT = 8
+COLUMNAS_TEXTO = ['name', 'size', 'color_col', 'category', 'sku', 'description']
+SEPARADOR = '\x00'
+
+
+def huella_csv(ruta, con_hash=True):
+    """Tamaño, mtime y (opcionalmente) SHA-1 del CSV."""
+    info = os.stat(ruta)
+    huella = {"tamano": info.st_size, "mtime_ns": info.st_mtime_ns}
+    if con_hash:
+        sha1 = hashlib.sha1()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(bloque)
+        huella["sha1"] = sha1.hexdigest()
+    return huella
+
+
+def _guardar_textos(ruta, valores):
+    with open(ruta, 'wb') as f:
+        f.write(SEPARADOR.join(valores).encode('utf-8'))
+
+
+def _leer_textos(ruta, n):
+    with open(ruta, 'rb') as f:
+        valores = f.read().decode('utf-8').split(SEPARADOR) if n else []
+    return np.array(valores, dtype=object)
+
+
+def _guardar_columna(carpeta, nombre, columna):
+    for parte in ("codigos", "buffer", "cortes"):
+        np.save(os.path.join(carpeta, f"{nombre}.{parte}.npy"), getattr(columna, parte))
+
+
+def _leer_columna(carpeta, nombre):
+    return ColumnaTexto(*(np.load(os.path.join(carpeta, f"{nombre}.{parte}.npy"), mmap_mode='r')
+                          for parte in ("codigos", "buffer", "cortes")))
+
+
+def guardar_snapshot(ruta_csv, catalogo, huella):
+    """
+    Escribe el snapshot de `catalogo` (tabla, índice, talles, códigos y
+    facetas) en una carpeta temporal y la renombra al terminar.
+    """
+    destino = ruta_csv + ".snapshot"
+    temporal = f"{destino}.tmp-{os.getpid()}"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+    tabla, indice = catalogo.db, catalogo.indice_nombres
+    guardar = lambda nombre, array: np.save(os.path.join(temporal, f"{nombre}.npy"), array)
+
+    columnas = [c for c in COLUMNAS_TEXTO if c in tabla]
+    guardar("price", tabla.precios)
+    for col in columnas:
+        _guardar_columna(temporal, col, tabla[col])
+
+    _guardar_columna(temporal, "indice.textos", indice.textos)
+    _guardar_textos(os.path.join(temporal, "indice.vocabulario.txt"), indice.vocabulario)
+    guardar("indice.filas", indice.filas)
+    guardar("indice.cortes", indice.cortes)
+
+    # Lo derivado también, así quien adjunta el snapshot no recalcula nada
+    guardar("talles.bits", catalogo.talles.bits)
+    _guardar_textos(os.path.join(temporal, "talles.vocabulario.txt"), list(catalogo.talles.vocabulario))
+    codigos = {"colores": catalogo.colores, "categorias": catalogo.categorias}
+    for nombre, columna in codigos.items():
+        if columna is not None:
+            guardar(f"{nombre}.codigos", columna.codigos)
+            _guardar_textos(os.path.join(temporal, f"{nombre}.etiquetas.txt"), columna.etiquetas)
+    with open(os.path.join(temporal, "facetas.json"), 'w', encoding='utf-8') as f:
+        json.dump(catalogo._facetas, f, ensure_ascii=False)
+    if catalogo.skus is not None:
+        guardar("skus.hashes", catalogo.skus.hashes)
+        guardar("skus.filas", catalogo.skus.filas)
+    for parte in ("filas", "precios", "cortes"):
+        guardar(f"por_categoria.{parte}", getattr(catalogo.precios_por_categoria, parte))
+
+    meta = dict(huella, version=VERSION_SNAPSHOT, filas=len(tabla), columnas=columnas,
+                tokens=len(indice.vocabulario), talles=len(catalogo.talles.vocabulario),
+                etiquetas={nombre: len(columna.etiquetas) for nombre, columna in codigos.items() if columna is not None})
+    with open(os.path.join(temporal, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporal, destino)
+
+
+def cargar_snapshot(ruta_csv, verificar=True):
+    """
+    Devuelve el Catalogo del snapshot si sigue siendo válido, o None. Todos los
+    arrays se abren con mmap: no se copian a la memoria del proceso, y varios
+    procesos que abren el mismo snapshot comparten las mismas páginas.
+    Se considera válido si coinciden versión y tamaño del CSV y además el mtime
+    o, si el mtime cambió (ej: un checkout), el SHA-1 del contenido. Con
+    `verificar=False` no se mira el CSV (ver adjuntar_catalogo).
+    """
+    carpeta = ruta_csv + ".snapshot"
+    try:
+        with open(os.path.join(carpeta, "meta.json"), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != VERSION_SNAPSHOT:
+        return None
+
+    if verificar:
+        actual = huella_csv(ruta_csv, con_hash=False)
+        if meta.get("tamano") != actual["tamano"]:
+            return None
+        if meta.get("mtime_ns") != actual["mtime_ns"]:
+            if meta.get("sha1") != huella_csv(ruta_csv)["sha1"]:
+                return None
+            # Mismo contenido con otro mtime: actualizamos la huella y seguimos
+            meta["mtime_ns"] = actual["mtime_ns"]
+            with open(os.path.join(carpeta, "meta.json"), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+
+    abrir = lambda nombre: np.load(os.path.join(carpeta, f"{nombre}.npy"), mmap_mode='r')
+    textos = lambda nombre, n: _leer_textos(os.path.join(carpeta, f"{nombre}.txt"), n).tolist()
+
+    tabla = TablaCompacta(abrir("price"), {col: _leer_columna(carpeta, col) for col in meta["columnas"]})
+    postings = (textos("indice.vocabulario", meta["tokens"]), abrir("indice.filas"), abrir("indice.cortes"))
+    indice = IndiceInvertido(_leer_columna(carpeta, "indice.textos"), postings)
+
+    talles = TallesPorFila(None, calculado=(textos("talles.vocabulario", meta["talles"]), abrir("talles.bits")))
+    codigos = {
+        nombre: CodigosCategoricos(None, normalizar, calculado=(abrir(f"{nombre}.codigos"),
+                                                                textos(f"{nombre}.etiquetas", meta["etiquetas"][nombre])))
+        if nombre in meta["etiquetas"] else None
+        for nombre, normalizar in (("colores", normalizar_color), ("categorias", plegar_valor))
+    }
+    with open(os.path.join(carpeta, "facetas.json"), encoding='utf-8') as f:
+        facetas = json.load(f)
+
+    skus = IndiceSKU(tabla['sku'], calculado=(abrir("skus.hashes"), abrir("skus.filas"))) if 'sku' in tabla else None
+    por_categoria = tabla['category'].codigos if 'category' in tabla else np.zeros(len(tabla), dtype=np.int8)
+    precios_por_categoria = PreciosPorCategoria(
+        por_categoria, None, calculado=tuple(abrir(f"por_categoria.{parte}") for parte in ("filas", "precios", "cortes")))
+
+    huella = {"tamano": meta["tamano"], "mtime_ns": meta["mtime_ns"]}
+    return Catalogo(tabla, indice, ruta_csv, huella,
+                    derivados=(talles, codigos["colores"], codigos["categorias"], facetas,
+                               skus, precios_por_categoria))
+
+
+# --- INGESTA DEL CSV POR BLOQUES ---
+# Columnas del CSV que usa el bot y su nombre estandarizado
+# (sku y description solo las usan las tools de tools.py)
+COLUMNAS_CSV = {"sku": "sku", "nombre": "name", "precio": "price", "talle": "size", "color": "color_col",
+                "category": "category", "description": "description"}
+TAMANO_CHUNK = 100_000
+
+
+def limpiar_precios(precios):
+    """
+    Limpieza vectorizada de precios ('$1,234.50' -> 1234.5).
+    Lo que no se puede interpretar como precio queda en NaN.
+    """
+    if pd.api.types.is_numeric_dtype(precios):
+        return precios.astype(np.float64)
+    texto = precios.astype(str).str.replace('$', '', regex=False).str.replace(',', '', regex=False)
+    return pd.to_numeric(texto.str.extract(r"(\d+\.?\d*)", expand=False), errors='coerce')
+
+
+def leer_csv(ruta, tamano_chunk=TAMANO_CHUNK):
+    """
+    Lee el CSV por bloques de `tamano_chunk` filas, solo con las columnas que usa
+    el bot, y limpia cada bloque con operaciones vectorizadas. Las filas sin un
+    precio válido se descartan y se informan. Cada bloque se codifica apenas se
+    lee, sobre un diccionario por columna que crece (ver CodificadorTexto), y
+    se descarta antes de leer el siguiente: el pico de memoria queda acotado
+    al bloque en curso más lo que ocupa la TablaCompacta. El color que falta
+    se deduce del nombre.
+    """
+    precios_validos = []
+    codificadores = {}
+    total = rechazadas = 0
+    ejemplos = []
+    inicio = time.perf_counter()
+
+    bloques = pd.read_csv(ruta, usecols=lambda c: c in COLUMNAS_CSV, dtype=str,
+                          keep_default_na=False, chunksize=tamano_chunk)
+    for numero, bloque in enumerate(bloques, start=1):
+        t_bloque = time.perf_counter()
+        bloque = bloque.rename(columns=COLUMNAS_CSV)
+
+        # 1. Limpieza de Precio (CRÍTICO para ordenar bien)
+        precios = limpiar_precios(bloque['price'])
+        validos = precios.notna().to_numpy()
+        if not validos.all():
+            invalidas = np.flatnonzero(~validos)
+            rechazadas += len(invalidas)
+            # Número de línea en el CSV (la 1 es el encabezado)
+            ejemplos.extend((total + invalidas[:5 - len(ejemplos)] + 2).tolist())
+
+        # 2. Limpieza de Texto (se usa str aunque falte la columna de talle/color)
+        precios_validos.append(precios.to_numpy(dtype=np.float64)[validos])
+        textos = {col: bloque[col].to_numpy(dtype=object)[validos] for col in COLUMNAS_TEXTO if col in bloque.columns}
+        textos['color_col'] = completar_colores(textos.get('color_col'), textos['name'])
+        for col, valores in textos.items():
+            codificadores.setdefault(col, CodificadorTexto()).agregar(valores)
+
+        filas = len(bloque)
+        total += filas
+        # Del bloque no queda nada antes de leer el siguiente
+        del bloque, precios, textos, valores
+        segundos = time.perf_counter() - t_bloque
+        print(f"  bloque {numero}: {filas} filas en {segundos:.2f}s "
+              f"({filas / max(segundos, 1e-9):,.0f} filas/s)")
+
+    if rechazadas:
+        print(f"  {rechazadas} filas descartadas por precio inválido (líneas {ejemplos}...)")
+    print(f"  Ingesta: {total} filas en {time.perf_counter() - inicio:.2f}s")
+
+    n = total - rechazadas
+    codificadores.setdefault('size', CodificadorTexto())
+    precios = np.concatenate(precios_validos) if precios_validos else np.empty(0, dtype=np.float64)
+    return TablaCompacta(precios, {col: codificadores.pop(col, CodificadorTexto()).columna(n)
+                                   for col in COLUMNAS_TEXTO if col in codificadores or col == 'name'})
+
+
+# --- CATÁLOGO Y RECARGA EN CALIENTE ---
+# Términos cuyas facetas se precalculan: todo el catálogo y los productos del router
+TERMINOS_FACETAS = [""] + ROUTER.terminos
+FACETAS_MAX = 1024
+
+class Catalogo:
+    """
+    Foto inmutable del catálogo: la tabla, sus índices y la huella del CSV del
+    que salió. Nunca se modifica; para actualizar se arma otra y se publica.
+    """
+
+    def __init__(self, db, indice_nombres, ruta=None, huella=None, derivados=None):
+        """
+        - derivados: (talles, colores, categorias, facetas, skus,
+          precios_por_categoria) ya calculados, ej. leídos de un snapshot; si
+          no, se arman acá.
+        """
+        # Un DataFrame (ej: armado a mano) se pasa a la tabla compacta
+        self.db = db = db if isinstance(db, TablaCompacta) else TablaCompacta.desde_df(db)
+        self.indice_nombres = indice_nombres
+        self.ruta = ruta
+        self.huella = huella
+        if derivados is not None:
+            (self.talles, self.colores, self.categorias, self._facetas,
+             self.skus, self.precios_por_categoria) = derivados
+            return
+
+        # Talles, colores y categorías codificados una vez por carga
+        self.talles = TallesPorFila(db['size'])
+        if 'color_col' in db:
+            colores = db['color_col']
+        else:
+            colores = ColumnaTexto.desde_distintos(db['name'].codigos, inferir_colores(db['name'].distintos()))
+        self.colores = CodigosCategoricos(colores, normalizar_color)
+        self.categorias = CodigosCategoricos(db['category']) if 'category' in db else None
+        # Para get_product_by_sku y recommend_products (tools.py)
+        self.skus = IndiceSKU(db['sku']) if 'sku' in db else None
+        por_categoria = db['category'].codigos if 'category' in db else np.zeros(len(db), dtype=np.int8)
+        self.precios_por_categoria = PreciosPorCategoria(por_categoria, db.precios)
+        # Facetas por término: las de los productos del router se calculan al cargar
+        self._facetas = {}
+        for termino in TERMINOS_FACETAS:
+            self.facetas(termino)
+
+    def facetas(self, search_term=""):
+        """
+        Colores, talles y categorías disponibles (con cuántos productos tiene
+        cada uno) entre los que coinciden con `search_term`. Se calculan una vez
+        por término.
+        """
+        clave = normalizar_texto(search_term) or ""
+        resultado = self._facetas.get(clave)
+        if resultado is None:
+            filas = self.indice_nombres.buscar(clave) if clave else None
+            resultado = {"colores": self.colores.conteos(filas), "talles": self.talles.conteos(filas)}
+            if self.categorias is not None:
+                resultado["categorias"] = self.categorias.conteos(filas)
+            if len(self._facetas) >= FACETAS_MAX:
+                self._facetas.clear()
+            self._facetas[clave] = resultado
+        return resultado
+
+
+_recarga_lock = threading.Lock()
+_carga_lock = threading.Lock()
+# Funciones que recargar_catalogo llama con el catálogo nuevo antes de
+# publicarlo, para que la primera consulta no pague lo que se arma sobre él
+# (ej: tools.py arma ahí su BM25 y sus vectores de similitud)
+preparadores_de_catalogo = []
+# CSV que carga catalogo_actual la primera vez (None: ruta_por_defecto)
+_ruta_configurada = None
+NOMBRE_CSV = "products_asos.csv"
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def ruta_por_defecto():
+    """
+    El CSV del catálogo: el de la variable CATALOGO_CSV o, si no está, el
+    primero que exista entre products_asos.csv y data/products_asos.csv
+    (en la carpeta actual y en la raíz del repo).
+    """
+    ruta = os.getenv("CATALOGO_CSV")
+    if ruta:
+        return ruta
+    candidatos = [os.path.join(base, *partes) for base in ("", RAIZ_REPO)
+                  for partes in ((NOMBRE_CSV,), ("data", NOMBRE_CSV))]
+    return next((c for c in candidatos if os.path.exists(c)), NOMBRE_CSV)
+
+
+def configurar_catalogo(ruta):
+    """Fija el CSV que se carga con la primera consulta, sin cargarlo todavía."""
+    global _ruta_configurada
+    _ruta_configurada = ruta
+
+
+def catalogo_actual():
+    """
+    El catálogo publicado. Si todavía no hay ninguno lo carga (del snapshot o
+    del CSV configurado): el costo se paga una sola vez por proceso, aunque
+    lleguen varias consultas a la vez, y lo comparten todas las tools.
+    """
+    actual = catalogo
+    if actual is None:
+        with _carga_lock:
+            if catalogo is None:
+                cargar_base_de_datos(_ruta_configurada)
+            actual = catalogo
+    return actual
+
+
+def construir_catalogo(ruta=None, usar_snapshot=True):
+    """
+    Arma un Catalogo desde el snapshot (si sigue valiendo) o desde el CSV,
+    sin tocar el que está publicado.
+    """
+    ruta = ruta or ruta_por_defecto()
+    huella = huella_csv(ruta, con_hash=False)
+    cargado = cargar_snapshot(ruta) if usar_snapshot else None
+    if cargado is not None:
+        print(f"Base de datos cargada desde snapshot con {len(cargado.db)} productos.")
+        cargado.huella = huella
+        return cargado
+
+    huella_completa = huella_csv(ruta) if usar_snapshot else None
+    tabla = leer_csv(ruta)
+    # Índice invertido de nombres para search_term y color
+    indice = IndiceInvertido(tabla['name'])
+    print(f"Base de datos cargada con {len(tabla)} productos "
+          f"({tabla.nbytes / max(len(tabla), 1):.0f} bytes por producto).")
+
+    nuevo = Catalogo(tabla, indice, ruta, huella)
+    if usar_snapshot:
+        try:
+            guardar_snapshot(ruta, nuevo, huella_completa)
+        except OSError as e:
+            print(f"No se pudo guardar el snapshot: {e}")
+    return nuevo
+
+
+def publicar_catalogo(nuevo):
+    """
+    Reemplaza el catálogo publicado con una sola asignación (atómica): las
+    consultas en curso terminan con la foto que ya tenían tomada.
+    """
+    global catalogo, db
+    catalogo = nuevo
+    db = nuevo.db
+    # Lo cacheado corresponde al catálogo anterior
+    invalidar_cache()
+
+
+def cargar_base_de_datos(ruta=None, usar_snapshot=True):
+    """
+    Carga el catálogo en una TablaCompacta y prepara los datos.
+    Si hay un snapshot válido al lado del CSV lo usa; si no, parsea el CSV y
+    deja escrito el snapshot para el próximo arranque.
+    """
+    ruta = ruta or ruta_por_defecto()
+    try:
+        publicar_catalogo(construir_catalogo(ruta, usar_snapshot))
     except Exception as e:
         print(f"Error fatal cargando DB: {e}")
         # Creamos una DB vacía para no romper el programa
-        db = pd.DataFrame(columns=['name', 'price', 'size'])
+        vacia = pd.DataFrame(columns=['name', 'price', 'size'])
+        publicar_catalogo(Catalogo(vacia, IndiceInvertido(vacia['name']), ruta))
+
+
+def adjuntar_catalogo(ruta=None):
+    """
+    Publica el catálogo desde el snapshot que dejó otro proceso (el que llamó
+    a cargar_base_de_datos), sin leer el CSV ni escribir nada. Todo queda
+    mapeado en memoria, así varios workers comparten una sola copia física
+    del catálogo. Si no hay snapshot lanza FileNotFoundError.
+    """
+    inicio = time.perf_counter()
+    ruta = ruta or ruta_por_defecto()
+    nuevo = cargar_snapshot(ruta, verificar=False)
+    if nuevo is None:
+        raise FileNotFoundError(f"No hay snapshot de {ruta}: primero hay que cargarlo con cargar_base_de_datos")
+    publicar_catalogo(nuevo)
+    print(f"Catálogo adjuntado en {(time.perf_counter() - inicio) * 1000:.1f} ms ({len(nuevo.db)} productos).")
+    return nuevo
+
+
+def recargar_catalogo(ruta=None, usar_snapshot=True, en_segundo_plano=True):
+    """
+    Vuelve a cargar el catálogo y lo publica recién cuando está completo (y
+    pasó por los preparadores_de_catalogo). Si algo falla se sigue sirviendo
+    el catálogo anterior.
+    - ruta: CSV a cargar (por defecto, el del catálogo publicado).
+    - en_segundo_plano: si es True, la carga corre en un hilo y se devuelve ese hilo.
+    """
+    if ruta is None:
+        ruta = catalogo.ruta if catalogo is not None and catalogo.ruta else ruta_por_defecto()
+
+    def recargar():
+        # Dos recargas simultáneas no tienen sentido: la segunda espera
+        with _recarga_lock:
+            inicio = time.perf_counter()
+            try:
+                nuevo = construir_catalogo(ruta, usar_snapshot)
+            except Exception as e:
+                print(f"Error recargando el catálogo (se mantiene el anterior): {e}")
+                return
+            for preparar in preparadores_de_catalogo:
+                try:
+                    preparar(nuevo)
+                except Exception as e:
+                    # Se publica igual: lo que falte se arma con la primera consulta
+                    print(f"No se pudo preparar el catálogo recargado: {e}")
+            publicar_catalogo(nuevo)
+            print(f"Catálogo recargado en {time.perf_counter() - inicio:.2f}s.")
+
+    if not en_segundo_plano:
+        recargar()
+        return None
+    hilo = threading.Thread(target=recargar, name="recarga-catalogo", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def vigilar_catalogo(intervalo=5.0):
+    """
+    Revisa cada `intervalo` segundos si el CSV del catálogo publicado cambió
+    (tamaño o mtime) y en ese caso lo recarga. Devuelve un Event: con `.set()`
+    se detiene la vigilancia.
+    """
+    detener = threading.Event()
+
+    def vigilar():
+        while not detener.wait(intervalo):
+            actual = catalogo
+            if actual is None or not actual.ruta:
+                continue
+            try:
+                huella = huella_csv(actual.ruta, con_hash=False)
+            except OSError:
+                # El archivo puede no existir un instante mientras se reemplaza
+                continue
+            if huella != actual.huella:
+                print("El CSV del catálogo cambió, recargando...")
+                recargar_catalogo(actual.ruta, en_segundo_plano=False)
+
+    threading.Thread(target=vigilar, name="vigilancia-catalogo", daemon=True).start()
+    return detener
 
 @tool
+@cachear_consulta(search_term=normalizar_texto, talle=normalizar_texto,
+                  color=normalizar_texto, sort_by_price=normalizar_orden)
 def find_products(search_term: str = "", talle: str = None, color: str = None, sort_by_price: str = None) -> dict:
     """
     Busca productos en la base de datos.
     - search_term: Nombre del producto en inglés (ej: 'T-shirt').
     - talle: Filtro exacto de talle (ej: 'S', 'L').
-    - color: Filtro de color (busca la palabra en el nombre).
+    - color: Filtro de color (ej: 'black' o 'negro').
     - sort_by_price: 'asc' (barato) o 'desc' (caro).
     """
 
     print(f"[Debug: find_products(search='{search_term}', talle='{talle}', color='{color}', sort='{sort_by_price}')]")
 
-    global db
-    if db is None or db.empty: 
+    # Una sola lectura del catálogo (la primera consulta lo carga): si se
+    # recarga a mitad de la consulta, esta sigue con la foto que tomó acá
+    actual = catalogo_actual()
+    if actual is None or actual.db.empty: 
         return {"status": "Error", "productos": [], "mensaje": "Base de datos vacía."}
+    db, indice_nombres, talles = actual.db, actual.indice_nombres, actual.talles
 
     try:
-        # Trabajamos sobre una copia
-        results = db.copy()
+        # Los filtros de texto se resuelven con el índice invertido (sin copiar la tabla)
+        filas = None
 
         # 1. FILTRO: Búsqueda de Texto
         if search_term:
             term_limpio = search_term.lower().strip()
-            results = results[results['name'].str.lower().str.contains(term_limpio, na=False)]
+            filas = indice_nombres.buscar(term_limpio, filas)
 
-        # 2. FILTRO: Color
+        # 2. FILTRO: Color (por código; si no es un color del catálogo, en el nombre)
         if color:
-            color_limpio = color.lower().strip()
-            results = results[results['name'].str.lower().str.contains(color_limpio, na=False)]
+            coincide = actual.colores.coincide(color, filas)
+            if coincide is None:
+                filas = indice_nombres.buscar(color.lower().strip(), filas)
+            else:
+                filas = np.flatnonzero(coincide) if filas is None else filas[coincide]
 
-        # 3. FILTRO: Talle
+        # 3. FILTRO: Talle (exacto, sobre las máscaras de bits)
         if talle:
-            talle_limpio = talle.lower().strip()
-            results = results[results['size'].str.lower().str.contains(talle_limpio, na=False)]
+            coincide = talles.contiene(talle, filas)
+            filas = np.flatnonzero(coincide) if filas is None else filas[coincide]
 
-        # 4. ORDENAMIENTO (Sorting)
-        if sort_by_price:
-            es_ascendente = (sort_by_price.lower() == 'asc')
-            results = results.sort_values(by='price', ascending=es_ascendente)
-        
-        # 5. RESULTADO FINAL
-        if results.empty:
+        # 4. RESULTADO FINAL (posiciones de filas: la tabla no se copia)
+        cantidad = len(db) if filas is None else len(filas)
+        if cantidad == 0:
             return {
                 "status": "No encontrado", 
                 "productos": [], 
                 "mensaje": f"No encontré productos con: {search_term} {color if color else ''} {talle if talle else ''}"
             }
 
-        # Tomamos los top 5 resultados
-        top_results = results.head(5)
+        # 5. Tomamos los top 5 resultados (por precio, sin ordenar todo)
+        if sort_by_price:
+            es_ascendente = (sort_by_price.lower() == 'asc')
+            precios = db.precios if filas is None else db.precios[filas]
+            elegidas = top_k_por_precio(precios, 5, es_ascendente)
+            if filas is not None:
+                elegidas = filas[elegidas]
+        else:
+            elegidas = np.arange(min(cantidad, 5)) if filas is None else filas[:5]
         
         lista_productos = []
-        for _, row in top_results.iterrows():
+        for row in db.filas(elegidas):
             lista_productos.append({
                 "nombre": row['name'],
                 "precio": row['price'],
@@ -103,6 +1233,22 @@ def find_products(search_term: str = "", talle: str = None, color: str = None, s
     except Exception as e:
         return {"status": "Error", "productos": [], "mensaje": f"Error técnico: {str(e)}"}
 
+@tool
+def get_available_filters(search_term: str = "", max_valores: int = 10) -> dict:
+    """
+    Colores, talles y categorías disponibles, con la cantidad de productos de cada uno.
+    - search_term: Nombre del producto en inglés (ej: 'T-shirt'); vacío es todo el catálogo.
+    - max_valores: Cuántos valores mostrar de cada filtro (los más frecuentes).
+    """
+    actual = catalogo_actual()
+    if actual is None or actual.db.empty:
+        return {"status": "Error", "mensaje": "Base de datos vacía."}
+    facetas = actual.facetas(search_term)
+    if not facetas["colores"] and not facetas["talles"]:
+        return {"status": "No encontrado", "mensaje": f"No encontré productos con: {search_term}"}
+    n = max(int(max_valores), 1)
+    return {"status": "Encontrado", **{nombre: dict(list(valores.items())[:n]) for nombre, valores in facetas.items()}}
+
 @tool
 def get_opening_hours() -> str:
     """Devuelve los horarios de atención de la tienda física."""
@@ -132,14 +1278,15 @@ def list_sample_products(count: int = 5) -> dict:
     Lista productos al azar para inspirar al usuario.
     count: Cantidad de productos a mostrar (max 10).
     """
-    global db
+    actual = catalogo_actual()
+    db = actual.db if actual is not None else None
     if db is None: return {"error": "DB off"}
     
     try:
         n = min(int(count), 10)
-        sample = db.sample(n)
+        sample = db.filas(np.random.default_rng().choice(len(db), n, replace=False))
         lista = []
-        for _, row in sample.iterrows():
+        for row in sample:
             lista.append({"nombre": row['name'], "precio": row['price']})
         return {"status": "Muestra", "productos": lista}
     except:
@@ -0,0 +1,128 @@
+"""
+Vista materializada de recomendaciones para recommend_products (tools.py).
+
+Por cada categoría se usan sus productos ordenados por precio (el
+PreciosPorCategoria del catálogo, que viene mapeado del snapshot) y la suma de
+precios. La franja recomendable (entre 80% y 120% del precio medio de la
+categoría) es siempre un tramo contiguo de ese orden, así que se ubica con dos
+búsquedas binarias. Cada pedido toma un producto de categorías distintas y va
+rotando dentro de cada franja, así la respuesta cambia de una llamada a otra.
+Por dónde va la rotación lo guarda un CursorRecomendaciones: tools.py lleva
+uno por sesión, así las llamadas de un usuario no mueven la de otro.
+
+Un cambio de precio copia a listas solo la categoría del producto, lo mueve
+dentro de ella y actualiza la suma: no hace falta recalcular la vista.
+"""
+import bisect
+import math
+import threading
+
+import numpy as np
+
+try:
+    from src.negocio import PreciosPorCategoria
+except ImportError:
+    from negocio import PreciosPorCategoria
+
+# La franja recomendable, relativa al precio medio de la categoría
+FRANJA = (0.8, 1.2)
+# Salto entre productos consecutivos de una misma franja (primo: recorre toda la franja)
+PASO = 7919
+
+
+class CursorRecomendaciones:
+    """La próxima categoría de la rotación y cuántos productos se tomaron de cada una."""
+
+    def __init__(self):
+        self.categoria = 0
+        self.tomados = {}
+
+
+class VistaRecomendaciones:
+    """
+    - ordenado: el PreciosPorCategoria de los precios originales (arrays, sin copiar).
+    - cambiadas[c]: [precios ordenados, filas en ese orden] como listas, solo
+      para las categorías que tuvieron cambios de precio.
+    - sumas[c]: la suma de los precios vigentes de la categoría c.
+    - cambiados: fila -> precio vigente, para las filas que cambiaron.
+    """
+
+    def __init__(self, categorias, precios, ordenado=None):
+        self.ordenado = ordenado or PreciosPorCategoria(categorias, precios)
+        self.precios = precios
+        self._lock = threading.Lock()
+        self.cambiadas = {}
+        self.cambiados = {}
+        self.sumas = [float(self.ordenado.tramo(c)[0].sum()) for c in range(len(self.ordenado))]
+        # La rotación de quien no pasa un cursor propio
+        self._cursor = CursorRecomendaciones()
+
+    def tramo(self, c):
+        """(precios, filas) vigentes de la categoría `c`, en orden de precio."""
+        cambiada = self.cambiadas.get(c)
+        return cambiada if cambiada is not None else self.ordenado.tramo(c)
+
+    def franja(self, c):
+        """(desde, hasta): el tramo de la categoría `c` que está en la franja recomendable."""
+        valores, _ = self.tramo(c)
+        if not len(valores):
+            return 0, 0
+        media = self.sumas[c] / len(valores)
+        return bisect.bisect_left(valores, media * FRANJA[0]), bisect.bisect_right(valores, media * FRANJA[1])
+
+    def recomendar(self, k=5, cursor=None):
+        """
+        Hasta k filas de la franja media, de categorías distintas mientras
+        alcancen. Avanza `cursor` (o el compartido de la vista si no se pasa).
+        """
+        cursor = cursor or self._cursor
+        elegidas = []
+        with self._lock:
+            total = len(self.sumas)
+            vacias = 0
+            while len(elegidas) < k and vacias < total:
+                c = cursor.categoria
+                cursor.categoria = (c + 1) % total
+                desde, hasta = self.franja(c)
+                if hasta <= desde:
+                    vacias += 1
+                    continue
+                vacias = 0
+                tamano = hasta - desde
+                paso = PASO if math.gcd(PASO, tamano) == 1 else 1
+                tomados = cursor.tomados.get(c, 0)
+                fila = int(self.tramo(c)[1][desde + (tomados * paso) % tamano])
+                cursor.tomados[c] = tomados + 1
+                if fila in elegidas:
+                    # Franjas más chicas que las vueltas necesarias: no se repite
+                    vacias += 1
+                    continue
+                elegidas.append(fila)
+        return elegidas
+
+    def actualizar_precio(self, fila, precio):
+        """Mueve `fila` a su nuevo precio dentro de su categoría."""
+        with self._lock:
+            anterior = self.cambiados.get(fila, self.precios[fila])
+            self.cambiados[fila] = precio
+            c = int(self.ordenado.codigos[fila])
+            if c < 0:
+                return
+            if c not in self.cambiadas:
+                valores, filas = self.ordenado.tramo(c)
+                self.cambiadas[c] = [valores.tolist(), filas.tolist()]
+            valores, filas = self.cambiadas[c]
+            if not np.isnan(anterior):
+                # Entre los de igual precio las filas van en orden: se busca la exacta
+                i = bisect.bisect_left(valores, anterior)
+                while filas[i] != fila:
+                    i += 1
+                del valores[i], filas[i]
+                self.sumas[c] -= anterior
+            if not np.isnan(precio):
+                i = bisect.bisect_left(valores, precio)
+                while i < len(valores) and valores[i] == precio and filas[i] < fila:
+                    i += 1
+                valores.insert(i, precio)
+                filas.insert(i, fila)
+                self.sumas[c] += precio
@@ -0,0 +1,233 @@
+"""
+Servidor MCP concurrente con las tools de negocio.py y tools.py.
+
+Cada llamada a una tool corre en un pool de workers, así el event loop queda
+libre para seguir atendiendo a los demás clientes mientras se consulta el
+catálogo. Con hilos, el catálogo se carga con la primera consulta. Con
+`--pool procesos` los workers son procesos y las consultas dejan de competir
+por el GIL: este proceso carga el catálogo y deja su snapshot, y cada worker
+lo adjunta con mmap (negocio.adjuntar_catalogo) en milisegundos. Lo mismo con
+el índice BM25 y los vectores de similitud, que este proceso arma y guarda
+antes de lanzar los workers. Todos mapean los mismos archivos: hay una sola
+copia física del catálogo y sus índices. La última
+búsqueda de cada sesión (para refine_products) vive en el worker que la
+atendió, así que las llamadas de una sesión van siempre al mismo proceso.
+
+Uso (desde la raíz del repo):
+    python -m src.servidor_mcp                          # stdio
+    python -m src.servidor_mcp --transporte http --puerto 8000
+"""
+import argparse
+import asyncio
+import functools
+import io
+import os
+import itertools
+import sys
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import anyio
+from mcp.server.fastmcp import FastMCP
+from mcp.server.stdio import stdio_server
+
+import src.negocio as negocio
+
+MCP_WORKERS = int(os.getenv("MCP_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+
+# Tools registradas, por nombre (los procesos worker las buscan acá)
+HERRAMIENTAS = {}
+# ContextVar de la sesión de tools.py (None si no se pudo importar)
+SESION_ACTUAL = None
+
+
+def herramientas_disponibles():
+    """
+    Tools a exponer: las de negocio.py y, si se pueden importar, las de tools.py.
+    Si un nombre se repite (ej: chat_response) queda la primera.
+    """
+    herramientas = [
+        negocio.find_products, negocio.get_opening_hours, negocio.get_location,
+        negocio.get_return_policy, negocio.get_available_filters, negocio.get_general_recommendations,
+        negocio.list_sample_products, negocio.chat_response,
+    ]
+    global SESION_ACTUAL
+    try:
+        import src.tools as tools
+        SESION_ACTUAL = tools.sesion_actual
+        herramientas += [
+            tools.search_products, tools.refine_products, tools.available_filters, tools.get_product_by_sku,
+            tools.get_similar_products, tools.recommend_products, tools.summarize_product,
+            tools.business_info, tools.chat_response,
+        ]
+    except Exception as e:
+        print(f"⚠️  No se pudieron cargar las tools de tools.py: {e}")
+
+    unicas = {}
+    for herramienta in herramientas:
+        unicas.setdefault(herramienta.name, herramienta)
+    return list(unicas.values())
+
+
+def preparar_indices():
+    """Arma y guarda (o mapea, si ya están en disco) los índices de tools.py, si se puede importar."""
+    try:
+        import src.tools as tools
+    except Exception:
+        return
+    tools.preparar_indices()
+
+
+def inicializar_worker(ruta_catalogo):
+    """
+    Arranque de cada proceso worker: adjunta el catálogo compartido y sus
+    índices y registra las tools.
+    """
+    # stdout puede ser el canal del protocolo (stdio): los print() van a stderr
+    sys.stdout = sys.stderr
+    try:
+        negocio.adjuntar_catalogo(ruta_catalogo)
+    except FileNotFoundError as e:
+        # Sin snapshot (ej: no se pudo escribir) cada worker lee el CSV
+        print(f"⚠️  {e}")
+        negocio.cargar_base_de_datos(ruta_catalogo)
+    for herramienta in herramientas_disponibles():
+        HERRAMIENTAS[herramienta.name] = herramienta
+    preparar_indices()
+
+
+def ejecutar_herramienta(nombre, argumentos, sesion=None):
+    """
+    Corre una tool registrada como parte de la sesión MCP `sesion`; es lo que
+    ejecuta cada worker del pool. run_in_executor no lleva los contextvars al
+    worker: la sesión se fija acá y se deshace al terminar (el hilo se reusa).
+    """
+    if sesion is None or SESION_ACTUAL is None:
+        return HERRAMIENTAS[nombre].invoke(argumentos)
+    token = SESION_ACTUAL.set(sesion)
+    try:
+        return HERRAMIENTAS[nombre].invoke(argumentos)
+    finally:
+        SESION_ACTUAL.reset(token)
+
+
+def sesion_mcp(servidor):
+    """
+    Id de la sesión MCP de la llamada en curso: el header mcp-session-id con
+    HTTP, o la conexión con stdio. None fuera de una llamada.
+    """
+    try:
+        contexto = servidor._mcp_server.request_context
+    except LookupError:
+        return None
+    encabezados = getattr(contexto.request, "headers", None)
+    if encabezados is not None and encabezados.get("mcp-session-id"):
+        return encabezados["mcp-session-id"]
+    return f"conexion-{id(contexto.session)}"
+
+
+class PoolPorSesion:
+    """
+    Pool de procesos en el que cada sesión cae siempre en el mismo worker (un
+    ProcessPoolExecutor de un proceso por worker). Las llamadas sin sesión se
+    reparten en ronda.
+    """
+
+    def __init__(self, workers, **opciones):
+        self.pools = [ProcessPoolExecutor(max_workers=1, **opciones) for _ in range(workers)]
+        self._ronda = itertools.count()
+
+    def elegir(self, sesion):
+        if sesion is None:
+            return self.pools[next(self._ronda) % len(self.pools)]
+        return self.pools[zlib.crc32(sesion.encode()) % len(self.pools)]
+
+    def shutdown(self, wait=True):
+        for pool in self.pools:
+            pool.shutdown(wait=wait)
+
+
+def registrar_herramienta(servidor, herramienta, pool):
+    """Registra una tool de LangChain en el servidor, ejecutándola en `pool`."""
+    funcion = herramienta.func
+    HERRAMIENTAS[herramienta.name] = herramienta
+
+    # functools.wraps deja la firma original: de ahí sale el schema de la tool
+    @functools.wraps(funcion)
+    async def ejecutar(**argumentos):
+        # Los opcionales que no vinieron llegan como None: la tool usa su default
+        argumentos = {k: v for k, v in argumentos.items() if v is not None}
+        sesion = sesion_mcp(servidor)
+        ejecutor = pool.elegir(sesion) if isinstance(pool, PoolPorSesion) else pool
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(ejecutor, ejecutar_herramienta, herramienta.name, argumentos, sesion)
+
+    servidor.add_tool(ejecutar, name=herramienta.name, description=herramienta.description)
+
+
+def crear_servidor(workers=MCP_WORKERS, host="127.0.0.1", puerto=8000, pool="hilos"):
+    """
+    Arma el servidor MCP con todas las tools registradas.
+    - pool: 'hilos' o 'procesos'. Con procesos, el catálogo ya tiene que estar
+      cargado: acá se guardan sus índices y cada worker adjunta el snapshot y
+      los índices del que había al crearse el servidor.
+    """
+    servidor = FastMCP("tienda-ropa", host=host, port=puerto)
+    if pool == "procesos":
+        if negocio.catalogo is None or not negocio.catalogo.ruta:
+            raise ValueError("Con pool='procesos' primero hay que cargar el catálogo desde un CSV")
+        preparar_indices()
+        ejecutor = PoolPorSesion(workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=inicializar_worker, initargs=(negocio.catalogo.ruta,))
+    else:
+        ejecutor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool")
+    for herramienta in herramientas_disponibles():
+        registrar_herramienta(servidor, herramienta, ejecutor)
+    return servidor
+
+
+async def servir_stdio(servidor, salida):
+    """Como FastMCP.run_stdio_async, pero escribiendo el protocolo en `salida`."""
+    stdout_async = anyio.wrap_file(io.TextIOWrapper(salida.buffer, encoding="utf-8"))
+    async with stdio_server(stdout=stdout_async) as (lectura, escritura):
+        await servidor._mcp_server.run(
+            lectura, escritura, servidor._mcp_server.create_initialization_options()
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor MCP de la tienda")
+    parser.add_argument("--transporte", choices=["stdio", "http"], default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=MCP_WORKERS)
+    parser.add_argument("--pool", choices=["hilos", "procesos"], default="hilos")
+    parser.add_argument("--catalogo", default=None,
+                        help="CSV del catálogo (por defecto, CATALOGO_CSV o products_asos.csv)")
+    parser.add_argument("--vigilar", type=float, default=0,
+                        help="segundos entre chequeos del CSV para recargarlo (0 = no vigilar)")
+    args = parser.parse_args()
+
+    salida_protocolo = sys.stdout
+    if args.transporte == "stdio":
+        # stdout es el canal del protocolo: los print() de depuración van a stderr
+        sys.stdout = sys.stderr
+
+    # Con hilos el catálogo se carga con la primera consulta; los procesos
+    # adjuntan el snapshot, que tiene que existir antes de lanzarlos
+    negocio.configurar_catalogo(args.catalogo)
+    if args.pool == "procesos":
+        negocio.catalogo_actual()
+    if args.vigilar and args.pool == "hilos":
+        negocio.vigilar_catalogo(args.vigilar)
+
+    servidor = crear_servidor(args.workers, args.host, args.puerto, args.pool)
+    if args.transporte == "stdio":
+        anyio.run(servir_stdio, servidor, salida_protocolo)
+    else:
+        servidor.run("streamable-http")
+
+
+if __name__ == "__main__":
+    main()
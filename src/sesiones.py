@@ -0,0 +1,129 @@
+"""
+Memoria de sesión por usuario: último término buscado, último listado y
+el historial de la charla.
+
+Las sesiones viven en RAM con un tope de cantidad (se desaloja la menos usada),
+un presupuesto de bytes por sesión (se recorta el historial más viejo) y un
+vencimiento por inactividad. Opcionalmente se guardan en SQLite: así
+sobreviven a un reinicio y las desalojadas de RAM se recuperan al volver.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def sesion_nueva():
+    return {
+        "last_search_term": None,
+        "last_product_list": "",
+        "historial": [],
+    }
+
+
+def tamano_sesion(sesion):
+    """Tamaño aproximado en bytes (el de su JSON, que es lo que se guarda en disco)."""
+    return len(json.dumps(sesion, ensure_ascii=False).encode("utf-8"))
+
+
+class AlmacenSesiones:
+    """
+    Sesiones indexadas por id.
+    - max_sesiones: cuántas se mantienen en RAM como máximo.
+    - max_bytes: presupuesto de memoria por sesión.
+    - ttl: segundos de inactividad tras los que una sesión sale de RAM.
+    - ruta_sqlite: si se indica, las sesiones también se guardan en ese archivo.
+    - ttl_disco: segundos de inactividad tras los que se borran del disco.
+    """
+
+    def __init__(self, max_sesiones=1000, max_bytes=64 * 1024, ttl=30 * 60,
+                 ruta_sqlite=None, ttl_disco=7 * 24 * 3600):
+        self.max_sesiones = max_sesiones
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.ttl_disco = ttl_disco
+        # id -> (último acceso, sesión), del menos al más usado
+        self._sesiones = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if ruta_sqlite:
+            self._db = sqlite3.connect(ruta_sqlite, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sesiones ("
+                "id TEXT PRIMARY KEY, datos TEXT NOT NULL, ultimo_acceso REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM sesiones WHERE ultimo_acceso < ?",
+                             (time.time() - self.ttl_disco,))
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._sesiones)
+
+    def obtener(self, id_sesion):
+        """Devuelve la sesión (la crea si no existe). Hay que llamar a guardar() al modificarla."""
+        with self._lock:
+            ahora = time.time()
+            self._vencer(ahora)
+            if id_sesion in self._sesiones:
+                self._sesiones.move_to_end(id_sesion)
+                sesion = self._sesiones[id_sesion][1]
+            else:
+                sesion = self._leer_disco(id_sesion) or sesion_nueva()
+            self._sesiones[id_sesion] = (ahora, sesion)
+            self._desalojar()
+            return sesion
+
+    def guardar(self, id_sesion, sesion):
+        """Aplica el presupuesto de memoria y registra la sesión (y la escribe a disco si hay SQLite)."""
+        with self._lock:
+            self._recortar(sesion)
+            ahora = time.time()
+            self._sesiones[id_sesion] = (ahora, sesion)
+            self._sesiones.move_to_end(id_sesion)
+            self._desalojar()
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sesiones (id, datos, ultimo_acceso) VALUES (?, ?, ?)",
+                    (id_sesion, json.dumps(sesion, ensure_ascii=False), ahora),
+                )
+                self._db.commit()
+
+    def borrar(self, id_sesion):
+        with self._lock:
+            self._sesiones.pop(id_sesion, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM sesiones WHERE id = ?", (id_sesion,))
+                self._db.commit()
+
+    def _recortar(self, sesion):
+        """Saca mensajes viejos del historial hasta entrar en el presupuesto."""
+        limite = self.max_bytes // 2
+        if len(sesion["last_product_list"]) > limite:
+            sesion["last_product_list"] = sesion["last_product_list"][:limite]
+        historial = sesion["historial"]
+        exceso = tamano_sesion(sesion) - self.max_bytes
+        quitar = 0
+        while exceso > 0 and quitar < len(historial):
+            exceso -= len(json.dumps(historial[quitar], ensure_ascii=False).encode("utf-8")) + 2
+            quitar += 1
+        if quitar:
+            del historial[:quitar]
+
+    def _vencer(self, ahora):
+        """Saca de RAM las sesiones inactivas hace más de `ttl` (en disco siguen)."""
+        while self._sesiones:
+            id_sesion, (ultimo_acceso, _) = next(iter(self._sesiones.items()))
+            if ahora - ultimo_acceso <= self.ttl:
+                break
+            del self._sesiones[id_sesion]
+
+    def _desalojar(self):
+        while len(self._sesiones) > self.max_sesiones:
+            self._sesiones.popitem(last=False)
+
+    def _leer_disco(self, id_sesion):
+        if self._db is None:
+            return None
+        fila = self._db.execute("SELECT datos FROM sesiones WHERE id = ?", (id_sesion,)).fetchone()
+        return json.loads(fila[0]) if fila else None
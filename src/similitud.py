@@ -0,0 +1,257 @@
+"""
+Motor de productos similares para get_similar_products (tools.py).
+
+Cada producto es un vector TF-IDF hasheado de DIMENSIONES columnas, armado con
+las palabras del nombre y la descripción, el color, la categoría y la franja de
+precio, normalizado a largo 1. Con un vocabulario real (miles de palabras) hacen
+falta muchas dimensiones para que no caigan palabras distintas en la misma, así
+que los vectores son dispersos: cada producto guarda solo sus ~20 dimensiones
+usadas, y además se guarda la matriz por dimensión (la lista de productos que
+usan cada una). Todo va en '<csv>.similitud/' y se abre como memmap, así no
+hace falta tenerlo en RAM ni volver a calcularlo al reiniciar si el CSV no cambió.
+
+Los vecinos de un producto se buscan por coseno (producto punto): se suman las
+listas de las dimensiones que usa, como en un índice invertido. Para los SKUs
+más pedidos se guarda una tabla de vecinos precalculados.
+"""
+import json
+import math
+import os
+import shutil
+import threading
+import zlib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.negocio import huella_csv, tokens_por_fila
+except ImportError:
+    from negocio import huella_csv, tokens_por_fila
+
+VERSION_SIMILITUD = 2
+DIMENSIONES = 1 << 18
+# Peso de cada grupo de características en el vector
+PESOS = {"nombre": 1.0, "description": 0.5, "color": 1.5, "category": 1.5, "precio": 1.0}
+# Ancho de las franjas de precio (escala logarítmica: cada franja es un 25% más cara)
+PASO_PRECIO = math.log(1.25)
+# Consultas a partir de las que un SKU se considera "caliente" y sus vecinos se guardan
+UMBRAL_CALIENTE = 3
+VECINOS_TABLA = 10
+
+
+def _dimension(token):
+    return zlib.crc32(token.encode("utf-8")) & (DIMENSIONES - 1)
+
+
+def _caracteristicas(df):
+    """(filas, dimensiones, pesos) de todas las características del catálogo."""
+    n = len(df)
+    filas, dimensiones, pesos = [], [], []
+
+    for columna in ("nombre", "description"):
+        if columna not in df:
+            continue
+        filas_columna, codigos, vocabulario = tokens_por_fila(df[columna].fillna("").astype(str).str.lower())
+        dims = np.array([_dimension(f"{columna}:{t}") for t in vocabulario], dtype=np.int64)
+        filas.append(filas_columna)
+        dimensiones.append(dims[codigos])
+        pesos.append(np.full(len(codigos), PESOS[columna], dtype=np.float32))
+
+    for columna in ("color", "category"):
+        if columna not in df:
+            continue
+        codigos, valores = pd.factorize(df[columna].astype(str).str.lower())
+        dims = np.array([_dimension(f"{columna}={v}") for v in valores], dtype=np.int64)
+        filas.append(np.arange(n))
+        dimensiones.append(dims[codigos])
+        pesos.append(np.full(n, PESOS[columna], dtype=np.float32))
+
+    if "precio" in df:
+        precios = pd.to_numeric(df["precio"], errors="coerce").to_numpy(dtype=np.float64)
+        validos = np.flatnonzero(precios > 0)
+        if len(validos):
+            franjas = np.floor(np.log(precios[validos]) / PASO_PRECIO).astype(np.int64)
+            minima = franjas.min() - 1
+            dims = np.array([_dimension(f"precio={f}") for f in range(minima, franjas.max() + 2)], dtype=np.int64)
+            # La franja propia pesa completo y las vecinas la mitad: precios parecidos se acercan
+            for corrimiento, factor in ((0, 1.0), (-1, 0.5), (1, 0.5)):
+                filas.append(validos)
+                dimensiones.append(dims[franjas + corrimiento - minima])
+                pesos.append(np.full(len(validos), PESOS["precio"] * factor, dtype=np.float32))
+
+    return np.concatenate(filas), np.concatenate(dimensiones), np.concatenate(pesos)
+
+
+class VectoresDispersos:
+    """
+    Los vectores normalizados del catálogo, en dos órdenes:
+    - por fila: los de la fila f son dims/pesos[cortes[f]:cortes[f + 1]].
+    - por dimensión: los productos que usan la dimensión d son
+      filas_dim/pesos_dim[cortes_dim[d]:cortes_dim[d + 1]].
+    """
+
+    PARTES = ("cortes", "dims", "pesos", "cortes_dim", "filas_dim", "pesos_dim")
+
+    def __init__(self, cortes, dims, pesos, cortes_dim, filas_dim, pesos_dim):
+        self.cortes, self.dims, self.pesos = cortes, dims, pesos
+        self.cortes_dim, self.filas_dim, self.pesos_dim = cortes_dim, filas_dim, pesos_dim
+
+    def __len__(self):
+        return len(self.cortes) - 1
+
+    def fila(self, f):
+        """(dimensiones, pesos) del vector de la fila `f`."""
+        desde, hasta = self.cortes[f], self.cortes[f + 1]
+        return self.dims[desde:hasta], self.pesos[desde:hasta]
+
+    def puntajes(self, f):
+        """Coseno de la fila `f` con todas las filas (float64, uno por fila)."""
+        dims, pesos = self.fila(f)
+        filas, valores = [], []
+        for d, peso in zip(dims.tolist(), pesos.tolist()):
+            desde, hasta = self.cortes_dim[d], self.cortes_dim[d + 1]
+            filas.append(self.filas_dim[desde:hasta])
+            valores.append(self.pesos_dim[desde:hasta] * np.float32(peso))
+        if not filas:
+            return np.zeros(len(self))
+        return np.bincount(np.concatenate(filas), weights=np.concatenate(valores), minlength=len(self))
+
+    def guardar(self, carpeta, meta):
+        # Con el pid: varios procesos pueden estar guardando el mismo catálogo a la vez
+        temporal = f"{carpeta}.tmp-{os.getpid()}"
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(temporal)
+        for parte in self.PARTES:
+            np.save(os.path.join(temporal, f"{parte}.npy"), getattr(self, parte))
+        with open(os.path.join(temporal, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        shutil.rmtree(carpeta, ignore_errors=True)
+        os.replace(temporal, carpeta)
+
+    @classmethod
+    def leer(cls, carpeta):
+        with open(os.path.join(carpeta, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        partes = [np.load(os.path.join(carpeta, f"{parte}.npy"), mmap_mode="r") for parte in cls.PARTES]
+        return cls(*partes), meta
+
+
+def vectorizar_catalogo(df):
+    """VectoresDispersos con los vectores TF-IDF normalizados de cada fila de `df`."""
+    n = len(df)
+    filas, dimensiones, pesos = _caracteristicas(df)
+
+    # Una entrada por (fila, dimensión), sumando las repetidas
+    claves, inversa = np.unique(filas.astype(np.int64) * DIMENSIONES + dimensiones, return_inverse=True)
+    pesos = np.bincount(inversa, weights=pesos, minlength=len(claves))
+    filas, dimensiones = claves // DIMENSIONES, claves % DIMENSIONES
+
+    # IDF por dimensión: en cuántos productos aparece
+    frecuencia = np.bincount(dimensiones, minlength=DIMENSIONES)
+    pesos = pesos * (np.log((1 + n) / (1 + frecuencia[dimensiones])) + 1)
+    normas = np.sqrt(np.bincount(filas, weights=pesos * pesos, minlength=n))
+    pesos = (pesos / normas[filas]).astype(np.float32)
+
+    cortes = np.searchsorted(filas, np.arange(n + 1))
+    por_dimension = np.argsort(dimensiones, kind="stable")
+    cortes_dim = np.searchsorted(dimensiones[por_dimension], np.arange(DIMENSIONES + 1))
+    return VectoresDispersos(cortes, dimensiones.astype(np.int32), pesos,
+                             cortes_dim, filas[por_dimension].astype(np.int32), pesos[por_dimension])
+
+
+class MotorSimilitud:
+    """
+    Vecinos más parecidos (coseno) sobre los vectores dispersos del catálogo.
+    - tabla: fila -> vecinos precalculados (los SKUs calientes).
+    - consultas: cuántas veces se pidió cada fila.
+    """
+
+    def __init__(self, vectores):
+        self.vectores = vectores
+        self.tabla = {}
+        self.consultas = Counter()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.vectores)
+
+    @classmethod
+    def desde_catalogo(cls, df, ruta_csv=None):
+        """
+        Arma el motor para `df`. Con `ruta_csv`, los vectores se guardan en
+        '<ruta_csv>.similitud/' y se reutilizan mientras el CSV no cambie.
+        """
+        if ruta_csv is None:
+            return cls(vectorizar_catalogo(df))
+
+        carpeta = ruta_csv + ".similitud"
+        huella = huella_csv(ruta_csv, con_hash=False)
+        meta = {"version": VERSION_SIMILITUD, "huella": huella, "filas": len(df), "dimensiones": DIMENSIONES}
+        try:
+            vectores, guardado = VectoresDispersos.leer(carpeta)
+            if guardado == meta:
+                return cls(vectores)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        vectores = vectorizar_catalogo(df)
+        try:
+            vectores.guardar(carpeta, meta)
+            print(f"🧭 Vectores de similitud guardados en {carpeta}")
+        except OSError as e:
+            # Se sigue con los vectores en memoria
+            print(f"No se pudieron guardar los vectores de similitud: {e}")
+        return cls(vectores)
+
+    def similares(self, filas, k=5):
+        """
+        Para cada fila de `filas`, las k filas más parecidas (sin contarse a sí
+        misma), de mayor a menor similitud; empates por posición en el catálogo.
+        Devuelve una matriz (len(filas), k), con -1 si no hay suficientes productos.
+        """
+        filas = np.asarray(filas, dtype=np.int64)
+        resultado = np.full((len(filas), k), -1, dtype=np.int64)
+        n = len(self.vectores)
+        for i, fila in enumerate(filas.tolist()):
+            puntajes = self.vectores.puntajes(fila)
+            puntajes[fila] = -np.inf
+            if n - 1 > k:
+                # El k-ésimo puntaje y todos los que lo igualan: los empates se resuelven por posición
+                umbral = np.partition(puntajes, n - k)[n - k]
+                candidatos = np.flatnonzero(puntajes >= umbral)
+            else:
+                candidatos = np.flatnonzero(~np.isneginf(puntajes))
+            orden = np.lexsort((candidatos, -puntajes[candidatos]))[:k]
+            resultado[i, :len(orden)] = candidatos[orden]
+        return resultado
+
+    def vecinos(self, fila, k=5):
+        """Las k filas más parecidas a `fila`; usa la tabla si está precalculada."""
+        with self._lock:
+            self.consultas[fila] += 1
+            veces = self.consultas[fila]
+            guardados = self.tabla.get(fila)
+        if guardados is not None and len(guardados) >= k:
+            return guardados[:k]
+
+        resultado = self.similares([fila], max(k, VECINOS_TABLA if veces >= UMBRAL_CALIENTE else k))[0]
+        resultado = resultado[resultado >= 0]
+        if veces >= UMBRAL_CALIENTE:
+            with self._lock:
+                self.tabla[fila] = resultado
+        return resultado[:k]
+
+    def precalcular(self, filas, k=VECINOS_TABLA, lote=256):
+        """Llena la tabla para `filas`, resolviendo de a `lote` consultas por pasada."""
+        filas = list(filas)
+        for i in range(0, len(filas), lote):
+            parte = filas[i:i + lote]
+            for fila, vecinas in zip(parte, self.similares(parte, k)):
+                with self._lock:
+                    self.tabla[fila] = vecinas[vecinas >= 0]
+
+    def mas_consultadas(self, n):
+        with self._lock:
+            return [fila for fila, _ in self.consultas.most_common(n)]
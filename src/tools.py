@@ -1,21 +1,376 @@
+import contextvars
+import threading
+
+import numpy as np
 import pandas as pd
+from cachetools import TTLCache
 from langchain.tools import tool
 
-df = pd.read_csv("data\products_asos.csv")
+try:
+    from src.negocio import (COLUMNAS_CSV, Catalogo, IndiceInvertido, TablaCompacta, cachear_consulta,
+                         catalogo_actual, completar_colores, invalidar_cache, limpiar_precios,
+                         preparadores_de_catalogo, publicar_catalogo, top_k_por_precio)
+    from src.similitud import MotorSimilitud
+    from src.bm25 import IndiceBM25
+    from src.recomendaciones import CursorRecomendaciones, VistaRecomendaciones
+except ImportError:
+    from negocio import (COLUMNAS_CSV, Catalogo, IndiceInvertido, TablaCompacta, cachear_consulta,
+                         catalogo_actual, completar_colores, invalidar_cache, limpiar_precios,
+                         preparadores_de_catalogo, publicar_catalogo, top_k_por_precio)
+    from similitud import MotorSimilitud
+    from bm25 import IndiceBM25
+    from recomendaciones import CursorRecomendaciones, VistaRecomendaciones
+
+# El catálogo es el de negocio.py (catalogo_actual): se carga con la primera
+# consulta y lo comparten las dos tandas de tools. Sobre cada catálogo
+# publicado tools.py arma un EstadoTools (ver sincronizar). Cada tool toma el
+# estado una sola vez al empezar y trabaja solo con él: si el catálogo se
+# recarga a mitad de la llamada, las filas siguen siendo las de su foto.
+_estado = None
+_estado_lock = threading.Lock()
+# El EstadoTools que preparar_catalogo dejó armado para un catálogo que se
+# está por publicar (una recarga): sincronizar lo adopta en vez de armar otro
+_preparado = None
+# Cuántos SKUs calientes se precalculan al rearmar el motor tras una recarga
+SIMILARES_CALIENTES = 1000
+# Nombre de columna en el catálogo -> nombre en el CSV (el que devuelven las tools)
+COLUMNAS_SALIDA = {estandar: crudo for crudo, estandar in COLUMNAS_CSV.items()}
+
+
+class ColumnasCSV:
+    """
+    La tabla compartida vista con los nombres de columna del CSV (sku, nombre,
+    precio, ...). Cada columna se decodifica como pd.Series recién cuando se
+    pide: solo hace falta para armar el BM25 y los vectores de similitud, que
+    después se guardan en disco.
+    """
+
+    def __init__(self, tabla):
+        self.tabla = tabla
+
+    def __len__(self):
+        return len(self.tabla)
+
+    def __contains__(self, columna):
+        return COLUMNAS_CSV.get(columna) in self.tabla
+
+    def __getitem__(self, columna):
+        valores = self.tabla[COLUMNAS_CSV[columna]]
+        if columna == "precio":
+            return pd.Series(valores, dtype=np.float64)
+        return pd.Series(valores[np.arange(len(valores))], dtype=object)
+
+
+def clave_sku(sku):
+    """SKU normalizado a texto: 123, 123.0 y ' 123 ' son la misma clave."""
+    if isinstance(sku, float) and sku.is_integer():
+        sku = int(sku)
+    return str(sku).strip()
+
+
+class EstadoTools:
+    """
+    Lo que tools.py arma sobre un catálogo publicado:
+    - db, colores, categorias, talles: los del catálogo.
+    - precios: los del catálogo hasta el primer actualizar_precio, que los
+      copia (el compartido puede ser un mmap de solo lectura).
+    - índice BM25 de search_products, motor de get_similar_products y vista de
+      recommend_products: se arman (o se leen de disco) la primera vez que se
+      usan. SKU -> fila y el orden de la vista vienen con el catálogo.
+    """
+
+    def __init__(self, catalogo, calientes=()):
+        self.catalogo = catalogo
+        self.db = catalogo.db
+        self.colores, self.categorias, self.talles = catalogo.colores, catalogo.categorias, catalogo.talles
+        self.precios = catalogo.db.precios
+        self.precios_cambiados = {}
+        self._bm25 = self._motor = self._vista = None
+        # Los SKUs más pedidos del catálogo anterior, para precalcularlos en este
+        self._calientes = list(calientes)
+        self._lock = threading.RLock()
+
+    def indice_bm25(self):
+        with self._lock:
+            if self._bm25 is None:
+                self._bm25 = IndiceBM25.desde_catalogo(ColumnasCSV(self.db), self.catalogo.ruta)
+            return self._bm25
+
+    def vista_recomendaciones(self):
+        with self._lock:
+            if self._vista is None:
+                # El orden por categoría y precio viene armado con el catálogo (y mapeado del snapshot)
+                ordenado = self.catalogo.precios_por_categoria
+                self._vista = VistaRecomendaciones(ordenado.codigos, self.db.precios, ordenado)
+                for fila, precio in self.precios_cambiados.items():
+                    self._vista.actualizar_precio(fila, precio)
+            return self._vista
+
+    def motor_similitud(self):
+        with self._lock:
+            if self._motor is None:
+                self._motor = MotorSimilitud.desde_catalogo(ColumnasCSV(self.db), self.catalogo.ruta)
+                filas = [f for f in map(self.fila_por_sku, self._calientes) if f is not None]
+                if filas:
+                    self._motor.precalcular(filas)
+                self._calientes = []
+            return self._motor
+
+    def preparar(self):
+        """Arma (o lee de disco) el BM25 y el motor de similitud, si no estaban."""
+        self.indice_bm25()
+        self.motor_similitud()
+        return self
+
+    def skus_calientes(self, n=SIMILARES_CALIENTES):
+        """Los SKUs más pedidos a get_similar_products sobre este catálogo."""
+        with self._lock:
+            if self._motor is None or "sku" not in self.db:
+                return []
+            return [clave_sku(self.db["sku"][f]) for f in self._motor.mas_consultadas(n)]
+
+    def fila_por_sku(self, sku):
+        """Posición de la fila del SKU, o None si no existe (ver negocio.IndiceSKU)."""
+        skus = self.catalogo.skus
+        return skus.fila(clave_sku(sku)) if skus is not None else None
+
+    def registros(self, filas):
+        """Las filas pedidas como dicts con las columnas del CSV (sku, nombre, precio, ...)."""
+        filas = np.asarray(filas, dtype=np.int64)
+        cambiados = self.precios_cambiados
+        resultado = []
+        for fila, valores in zip(filas.tolist(), self.db.filas(filas)):
+            registro = {COLUMNAS_SALIDA[c]: valores[c] for c in COLUMNAS_SALIDA if c in valores}
+            if fila in cambiados:
+                registro["precio"] = cambiados[fila]
+            resultado.append(registro)
+        return resultado
+
+    def filtrar_filas(self, filas, filtros):
+        """Las filas de `filas` que cumplen todos los filtros (color, talle, max_precio)."""
+        if "color" in filtros:
+            coincide = self.colores.coincide(filtros["color"], filas)
+            filas = filas[coincide] if coincide is not None else filas[:0]
+        if "talle" in filtros:
+            filas = filas[self.talles.contiene(filtros["talle"], filas)]
+        if "max_precio" in filtros:
+            filas = filas[self.precios[filas] <= filtros["max_precio"]]
+        return filas
+
+    def actualizar_precio(self, fila, precio):
+        with self._lock:
+            if self.precios is self.db.precios:
+                self.precios = self.precios.copy()
+            self.precios[fila] = precio
+            self.precios_cambiados[fila] = precio
+            if self._vista is not None:
+                self._vista.actualizar_precio(fila, precio)
+
+
+def sincronizar():
+    """
+    El EstadoTools del catálogo compartido (lo carga si hace falta). Si se
+    publicó otro desde la última vez, se arma uno nuevo sobre ese.
+    """
+    global _estado, _preparado
+    actual = catalogo_actual()
+    estado = _estado
+    if estado is not None and estado.catalogo is actual:
+        return estado
+    with _estado_lock:
+        if _estado is None or _estado.catalogo is not actual:
+            if _preparado is not None and _preparado.catalogo is actual:
+                _estado, _preparado = _preparado, None
+            else:
+                calientes = _estado.skus_calientes() if _estado is not None else []
+                _estado = EstadoTools(actual, calientes)
+        return _estado
+
+
+def preparar_catalogo(nuevo):
+    """
+    Arma el EstadoTools de `nuevo` con sus índices antes de que se publique
+    (negocio.recargar_catalogo lo llama en el hilo de la recarga), así la
+    primera búsqueda sobre el catálogo recargado no los arma.
+    """
+    global _preparado
+    anterior = _estado
+    calientes = anterior.skus_calientes() if anterior is not None else []
+    estado = EstadoTools(nuevo, calientes).preparar()
+    with _estado_lock:
+        _preparado = estado
+
+
+preparadores_de_catalogo.append(preparar_catalogo)
+
+
+def indexar_catalogo(nuevo, ruta=None):
+    """
+    Publica un DataFrame con las columnas del CSV (ej: uno sintético) como el
+    catálogo compartido. `ruta` es el CSV de origen: al lado se guardan el
+    BM25 y los vectores de similitud.
+    """
+    tabla = nuevo[[c for c in COLUMNAS_CSV if c in nuevo]].rename(columns=COLUMNAS_CSV)
+    tabla["price"] = limpiar_precios(tabla["price"])
+    # Todo lo demás como texto, igual que al leer el CSV (un SKU 123.0 queda '123')
+    for columna in tabla.columns.drop("price"):
+        valores = tabla[columna]
+        if pd.api.types.is_float_dtype(valores):
+            valores = valores.astype("Int64")
+        tabla[columna] = valores.astype(object).where(valores.notna(), "").astype(str)
+    if "color_col" in tabla:
+        tabla["color_col"] = completar_colores(tabla["color_col"], tabla["name"].to_numpy())
+    tabla = TablaCompacta.desde_df(tabla)
+    publicar_catalogo(Catalogo(tabla, IndiceInvertido(tabla["name"]), ruta))
+    sincronizar()
+
+
+def indice_bm25():
+    """El índice BM25 del catálogo actual (lo arma o lo lee de disco la primera vez)."""
+    return sincronizar().indice_bm25()
+
+
+def vista_recomendaciones():
+    """La vista de recomendaciones del catálogo actual (la arma la primera vez)."""
+    return sincronizar().vista_recomendaciones()
+
+
+def motor_similitud():
+    """El motor de similitud del catálogo actual (lo arma la primera vez)."""
+    return sincronizar().motor_similitud()
+
+
+def preparar_indices():
+    """
+    Arma (o lee de disco) el BM25 y los vectores de similitud del catálogo
+    actual. Con un CSV de origen quedan guardados al lado: si esto corre antes
+    de lanzar los procesos worker, cada uno solo los mapea.
+    """
+    return sincronizar().preparar()
+
+
+def fila_por_sku(sku):
+    """Posición de la fila del SKU en el catálogo actual, o None si no existe."""
+    return sincronizar().fila_por_sku(sku)
+
+
+def actualizar_precio(sku, precio):
+    """
+    Cambia el precio de un producto sin recargar el catálogo: actualiza los
+    precios de tools.py y mueve el producto en la vista de recomendaciones.
+    Devuelve False si el SKU no existe.
+    """
+    estado = sincronizar()
+    fila = estado.fila_por_sku(sku)
+    if fila is None:
+        return False
+    estado.actualizar_precio(fila, precio)
+    invalidar_cache()
+    return True
+
+
+# --- ESTADO DE CADA SESIÓN (última búsqueda para refine_products, rotación de recommend_products) ---
+# Quien atiende al usuario fija la sesión con sesion_actual.set(id) (ver main2.py).
+# Sin sesión (ej: los hilos de ejecución especulativa) no se registra nada, así
+# una búsqueda adelantada que después se descarta no pisa la del usuario.
+
+sesion_actual = contextvars.ContextVar("sesion_actual", default=None)
+busquedas_por_sesion = TTLCache(maxsize=1000, ttl=30 * 60)
+cursores_por_sesion = TTLCache(maxsize=1000, ttl=30 * 60)
+_busquedas_lock = threading.Lock()
+
+
+class BusquedaSesion:
+    """
+    La última búsqueda de una sesión y su último refinamiento:
+    - filas / puntajes: lo que coincidió con la consulta (se calcula al primer refine).
+    - filtros / filtradas: los filtros acumulados y las filas que los cumplen.
+    """
+
+    def __init__(self, query, estado):
+        self.query = query
+        self.estado = estado
+        self.filas = None
+        self.puntajes = None
+        self.filtros = {}
+        self.filtradas = None
+
+
+def recordar_busqueda(query):
+    """Registra `query` como la última búsqueda de la sesión actual (si hay una)."""
+    sesion = sesion_actual.get()
+    if sesion is not None:
+        with _busquedas_lock:
+            busquedas_por_sesion[sesion] = BusquedaSesion(query, sincronizar())
+
+
+def busqueda_de_sesion(estado):
+    """
+    La última búsqueda de la sesión actual sobre `estado`, o None (sin sesión,
+    sin búsqueda o hecha sobre otro catálogo).
+    """
+    sesion = sesion_actual.get()
+    if sesion is None:
+        return None
+    with _busquedas_lock:
+        busqueda = busquedas_por_sesion.get(sesion)
+    if busqueda is None or busqueda.estado is not estado:
+        return None
+    if busqueda.filas is None:
+        if busqueda.query.strip():
+            busqueda.filas, busqueda.puntajes = coincidencias_de_busqueda(estado, busqueda.query)
+        else:
+            busqueda.filas = np.arange(len(estado.db), dtype=np.int32)
+            busqueda.puntajes = np.zeros(len(estado.db), dtype=np.float32)
+    return busqueda
+
+
+def coincidencias_de_busqueda(estado, query):
+    """
+    (filas, puntajes) de lo que encontró la búsqueda `query`: las filas con
+    todos sus términos, como los primeros resultados de search_products. Si
+    ninguna los tiene todos, las que tienen alguno (la búsqueda igual mostró algo).
+    """
+    indice = estado.indice_bm25()
+    filas, puntajes = indice.coincidencias(query, todas=True)
+    if not len(filas):
+        filas, puntajes = indice.coincidencias(query)
+    return filas, puntajes
+
+
+def cursor_de_sesion(estado):
+    """
+    El cursor de recommend_products de la sesión actual sobre `estado` (uno
+    nuevo si no tenía o era de otro catálogo), o None sin sesión.
+    """
+    sesion = sesion_actual.get()
+    if sesion is None:
+        return None
+    with _busquedas_lock:
+        guardado = cursores_por_sesion.get(sesion)
+        if guardado is None or guardado[0] is not estado:
+            guardado = cursores_por_sesion[sesion] = (estado, CursorRecomendaciones())
+    return guardado[1]
+
+
+@cachear_consulta(query=lambda q: q.lower() if isinstance(q, str) else q)
+def buscar_productos(query):
+    """Los 5 productos más relevantes para `query` (BM25)."""
+    estado = sincronizar()
+    if not query.strip():
+        return estado.registros(np.arange(min(len(estado.db), 5)))
+    filas, _ = estado.indice_bm25().buscar(query, 5)
+    return estado.registros(filas)
 
 @tool
 def search_products(query: str):
     """
     Busca productos por texto libre (nombre, descripción o categoría)
     """
-    q = query.lower()
-    results = df[
-        df["nombre"].str.lower().str.contains(q, na=False) |
-        df["description"].str.lower().str.contains(q, na=False) |
-        df["category"].str.lower().str.contains(q, na=False)
-    ]
-    return results.head(5).to_dict(orient="records")
+    recordar_busqueda(query)
+    return buscar_productos(query)
 
+# Sin caché: el resultado depende de la última búsqueda de la sesión
 @tool
 def refine_products(
     color: str = None,
@@ -24,69 +379,101 @@ def refine_products(
     sort_by_price: str = None
 ) -> dict:
     """Refina la última búsqueda del usuario."""
-    results = df.copy()
-
-    if color:
-        results = results[results["color"] == color]
-    if talle:
-        results = results[results["talle"] == talle]
-    if max_precio:
-        results = results[results["precio"] <= max_precio]
+    nuevos = {k: v for k, v in (("color", color), ("talle", talle), ("max_precio", max_precio)) if v}
+    estado = sincronizar()
+    busqueda = busqueda_de_sesion(estado)
+
+    if busqueda is None:
+        # Sin búsqueda previa: se refina sobre todo el catálogo
+        filas = estado.filtrar_filas(np.arange(len(estado.db)), nuevos)
+        puntajes = np.zeros(len(filas), dtype=np.float32)
+    else:
+        filtros = {**busqueda.filtros, **nuevos}
+        if busqueda.filtradas is not None and busqueda.filtros.items() <= filtros.items():
+            # Solo se agregaron filtros: se parte de lo ya filtrado
+            filas = estado.filtrar_filas(busqueda.filtradas,
+                                         {k: v for k, v in filtros.items() if k not in busqueda.filtros})
+        else:
+            filas = estado.filtrar_filas(busqueda.filas, filtros)
+        busqueda.filtros, busqueda.filtradas = filtros, filas
+        puntajes = busqueda.puntajes[np.searchsorted(busqueda.filas, filas)]
+
     if sort_by_price:
-        results = results.sort_values(
-            by="precio",
-            ascending=(sort_by_price == "asc")
-        )
+        elegidas = filas[top_k_por_precio(estado.precios[filas], 5, sort_by_price == "asc")]
+    else:
+        # Por relevancia y, a igual puntaje, en el orden del catálogo
+        elegidas = filas[np.lexsort((filas, -puntajes))[:5]]
 
     return {
-        "productos": results.head(5).to_dict(orient="records")
+        "productos": estado.registros(elegidas)
     }
 
+@cachear_consulta(query=lambda q: q.lower().strip() if isinstance(q, str) else q)
+def facetas(query):
+    """Colores, talles y categorías (con cuántos productos) entre lo que encuentra la búsqueda `query`."""
+    estado = sincronizar()
+    filas = coincidencias_de_busqueda(estado, query)[0] if query.strip() else None
+    categorias = estado.categorias
+    return {"colores": estado.colores.conteos(filas), "talles": estado.talles.conteos(filas),
+            "categorias": categorias.conteos(filas) if categorias is not None else {}}
+
+@tool
+def available_filters():
+    """
+    Colores, talles y categorías disponibles en la última búsqueda del usuario
+    """
+    busqueda = busqueda_de_sesion(sincronizar())
+    resultado = facetas(busqueda.query if busqueda is not None else "")
+    return {nombre: dict(list(valores.items())[:10]) for nombre, valores in resultado.items()}
+
 @tool
+@cachear_consulta()
 def get_product_by_sku(sku: str):
     """
     Devuelve un producto exacto por SKU
     """
-    product = df[df["sku"] == sku]
-    if product.empty:
+    estado = sincronizar()
+    fila = estado.fila_por_sku(sku)
+    if fila is None:
         return "No encontré ese producto"
-    return product.iloc[0].to_dict()
+    return estado.registros([fila])[0]
 
 @tool
+@cachear_consulta()
 def get_similar_products(sku: str):
     """
-    Devuelve productos similares por categoría
+    Devuelve productos similares (nombre, descripción, color, categoría y precio)
     """
-    base = df[df["sku"] == sku]
-    if base.empty:
+    estado = sincronizar()
+    fila = estado.fila_por_sku(sku)
+    if fila is None:
         return []
 
-    category = base.iloc[0]["category"]
-    results = df[df["category"] == category].head(5)
-    return results.to_dict(orient="records")
+    filas = estado.motor_similitud().vecinos(fila, 5)
+    return estado.registros(filas)
 
+# Sin caché: la vista rota los productos de la sesión en cada llamada
 @tool
 def recommend_products():
     """
     Recomienda productos populares (precio medio)
     """
-    avg_price = df["precio"].mean()
-    results = df[
-        (df["precio"] >= avg_price * 0.8) &
-        (df["precio"] <= avg_price * 1.2)
-    ]
-    return results.head(5).to_dict(orient="records")
+    estado = sincronizar()
+    filas = estado.vista_recomendaciones().recomendar(5, cursor_de_sesion(estado))
+    return estado.registros(filas)
 
 @tool
+@cachear_consulta()
 def summarize_product(sku: str):
     """
     Resume la descripción de un producto
     """
-    product = df[df["sku"] == sku]
-    if product.empty:
+    estado = sincronizar()
+    fila = estado.fila_por_sku(sku)
+    if fila is None:
         return "Producto no encontrado"
 
-    p = product.iloc[0]
+    p = estado.registros([fila])[0]
     return f"{p['nombre']} en color {p['color']}, ideal para uso diario. Precio ${p['precio']}."
 
 @tool